@@ -0,0 +1,157 @@
+"""
+Materialized answer counts for the admin dashboard.
+
+The feedback_aggregate table holds one row per (respondent type, question,
+answer) with a running count. Submissions, imports and the sentiment
+workers update it in the same transaction as the feedback rows, so the
+dashboard reads a handful of small rows instead of scanning both tables.
+`flask rebuild-aggregates` recomputes everything from scratch.
+"""
+from collections import Counter
+
+from sqlalchemy import select, update, delete, insert, func
+
+import normalized
+from db_config import UPSERT_INSERTS
+from models import db, FEEDBACK_MODELS, CLOSED_FIELDS, FeedbackAggregate
+
+# Questions counted for every respondent type
+AGGREGATED_FIELDS = CLOSED_FIELDS + ('sentiment_label',)
+
+# Pseudo-question holding the number of responses
+TOTAL_QUESTION = 'responses'
+TOTAL_ANSWER = 'total'
+
+
+def count_record(values, counter=None):
+    """Add one feedback row (a dict of column values) to a Counter of (question, answer)."""
+    if counter is None:
+        counter = Counter()
+    counter[(TOTAL_QUESTION, TOTAL_ANSWER)] += 1
+    for field in AGGREGATED_FIELDS:
+        answer = values.get(field)
+        if answer:
+            counter[(field, answer)] += 1
+    return counter
+
+
+def feedback_values(feedback):
+    return {field: getattr(feedback, field) for field in AGGREGATED_FIELDS}
+
+
+# Rows per upsert statement, well under SQLite's bound parameter limit
+UPSERT_BATCH_SIZE = 500
+
+
+def increment(table, key_columns, deltas):
+    """Add amounts to the counter columns of rows keyed by key_columns.
+
+    deltas maps a key tuple to {column name: amount}; missing rows are
+    inserted. Runs in the caller's transaction; the caller commits.
+    """
+    # Sorted so concurrent transactions lock rows in the same order
+    items = sorted(((key, values) for key, values in deltas.items() if any(values.values())),
+                   key=lambda item: item[0])
+    if not items:
+        return
+    value_columns = sorted({column for _, values in items for column in values})
+
+    upsert_insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if upsert_insert is not None:
+        # No race between two nodes inserting the same new key
+        for start in range(0, len(items), UPSERT_BATCH_SIZE):
+            statement = upsert_insert(table).values([
+                dict(zip(key_columns, key), **{column: values.get(column, 0) for column in value_columns})
+                for key, values in items[start:start + UPSERT_BATCH_SIZE]
+            ])
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[table.c[column] for column in key_columns],
+                set_={column: table.c[column] + statement.excluded[column] for column in value_columns},
+            ))
+        return
+
+    for key, values in items:
+        where = [table.c[column] == value for column, value in zip(key_columns, key)]
+        updated = db.session.execute(
+            update(table).where(*where).values({column: table.c[column] + amount for column, amount in values.items()})
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(table).values({**dict(zip(key_columns, key)), **values}))
+
+
+def apply_counts(respondent_type, counter):
+    """Add a Counter of (question, answer) deltas to the aggregate table.
+
+    Runs in the caller's transaction; the caller commits.
+    """
+    increment(FeedbackAggregate.__table__, ('respondent_type', 'question', 'answer'), {
+        (respondent_type, question, answer): {'count': delta}
+        for (question, answer), delta in counter.items()
+    })
+
+
+def record_feedback(respondent_type, feedback):
+    apply_counts(respondent_type, count_record(feedback_values(feedback)))
+
+
+def count_sentiment_change(old_label, new_label, counter=None):
+    """Add a change of one row's sentiment label to a Counter of (question, answer)."""
+    if counter is None:
+        counter = Counter()
+    if old_label != new_label:
+        if old_label:
+            counter[('sentiment_label', old_label)] -= 1
+        if new_label:
+            counter[('sentiment_label', new_label)] += 1
+    return counter
+
+
+def record_sentiment_change(respondent_type, old_label, new_label):
+    apply_counts(respondent_type, count_sentiment_change(old_label, new_label))
+
+
+def answer_counts(respondent_type, question):
+    """Return {answer: count} for one question, skipping answers that dropped to zero."""
+    rows = db.session.execute(
+        select(FeedbackAggregate.answer, FeedbackAggregate.count)
+        .where(FeedbackAggregate.respondent_type == respondent_type,
+               FeedbackAggregate.question == question,
+               FeedbackAggregate.count > 0)
+        .order_by(FeedbackAggregate.answer)
+    ).all()
+    return dict(rows)
+
+
+def response_count(respondent_type):
+    return answer_counts(respondent_type, TOTAL_QUESTION).get(TOTAL_ANSWER, 0)
+
+
+def rebuild():
+    """Recompute every aggregate from the feedback tables."""
+    db.session.execute(delete(FeedbackAggregate))
+    for respondent_type, model in FEEDBACK_MODELS.items():
+        counter = Counter()
+        total = db.session.execute(select(func.count()).select_from(model)).scalar()
+        if total:
+            counter[(TOTAL_QUESTION, TOTAL_ANSWER)] = total
+        for field in AGGREGATED_FIELDS:
+            if field in CLOSED_FIELDS and normalized.is_enabled():
+                # Integer GROUP BY over the narrow closed_answer table
+                for answer, count in normalized.answer_tallies(respondent_type, field).items():
+                    counter[(field, answer)] = count
+                continue
+            column = getattr(model, field)
+            for answer, count in db.session.execute(
+                select(column, func.count()).where(column.isnot(None), column != '').group_by(column)
+            ):
+                counter[(field, answer)] = count
+        apply_counts(respondent_type, counter)
+    db.session.commit()
+
+
+def ensure_built():
+    # Existing databases start with an empty aggregate table
+    if db.session.execute(select(FeedbackAggregate.question).limit(1)).first() is not None:
+        return
+    if any(db.session.execute(select(model.id).limit(1)).first() for model in FEEDBACK_MODELS.values()):
+        rebuild()
@@ -0,0 +1,166 @@
+"""
+Vectorized statistics over the feedback tables.
+
+Each respondent type is loaded with a single read_sql call into a typed
+DataFrame: categorical dtypes for the class/subject, q1-q10 and the
+sentiment label, float32 for the sentiment scores. Distributions,
+cross-tabs, per-group means and the satisfaction-vs-sentiment correlation
+are then computed with pandas/NumPy instead of Python loops over ORM rows.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models import db, FEEDBACK_MODELS, CLOSED_FIELDS
+from rollups import GROUP_FIELDS
+from sentiment_queue import PENDING_LABEL
+from trends import SENTIMENT_LABELS, normalize_label
+
+# q1 answers from worst to best, scored 1-5 for means and correlations
+Q1_SCALES = {
+    'student': ('Very Dissatisfied', 'Dissatisfied', 'Neutral', 'Satisfied', 'Very Satisfied'),
+    'teacher': ('Very Ineffective', 'Ineffective', 'Neutral', 'Effective', 'Very Effective'),
+}
+
+POLARITY_BINS = 10
+
+
+def load_frame(respondent_type):
+    """All feedback rows of one type as a typed DataFrame (one query)."""
+    model = FEEDBACK_MODELS[respondent_type]
+    query = select(
+        model.id,
+        getattr(model, GROUP_FIELDS[respondent_type]).label('group'),
+        *[getattr(model, field) for field in CLOSED_FIELDS],
+        model.sentiment_polarity,
+        model.sentiment_subjectivity,
+        model.sentiment_label,
+        model.created_at,
+    )
+    with db.engine.connect() as connection:
+        frame = pd.read_sql(query, connection, parse_dates=['created_at'])
+
+    frame['sentiment_label'] = frame['sentiment_label'].map(normalize_label)
+    frame['sentiment_polarity'] = frame['sentiment_polarity'].astype('float32')
+    frame['sentiment_subjectivity'] = frame['sentiment_subjectivity'].astype('float32')
+    for column in ('group',) + CLOSED_FIELDS + ('sentiment_label',):
+        # Blank answers become missing values rather than a '' category
+        values = frame[column]
+        frame[column] = values.where(values != '').astype('category')
+
+    # Ordinal score for q1 (NaN for answers off the scale)
+    scores = {answer: float(score) for score, answer in enumerate(Q1_SCALES[respondent_type], start=1)}
+    frame['q1_score'] = frame['q1'].map(scores).astype('float32')
+    return frame
+
+
+def _number(value):
+    # NumPy scalars and NaN are not JSON serializable
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else round(value, 4)
+
+
+def _scored(frame):
+    """Rows whose sentiment has been analyzed."""
+    return frame[frame['sentiment_polarity'].notna() & (frame['sentiment_label'] != PENDING_LABEL)]
+
+
+def answer_distributions(frame):
+    return {
+        field: {str(answer): int(count) for answer, count in frame[field].value_counts(sort=False).items() if count}
+        for field in CLOSED_FIELDS
+    }
+
+
+def sentiment_distribution(frame):
+    scored = _scored(frame)
+    labels = scored['sentiment_label'].value_counts()
+    total = int(labels.sum())
+    polarity = scored['sentiment_polarity'].to_numpy(dtype=np.float64)
+    histogram, edges = np.histogram(polarity, bins=POLARITY_BINS, range=(-1.0, 1.0))
+    return {
+        'scored': total,
+        'pending': int((frame['sentiment_label'] == PENDING_LABEL).sum()),
+        'labels': {label: int(labels.get(label, 0)) for label in SENTIMENT_LABELS},
+        'shares': {label: _number(labels.get(label, 0) / total) if total else None for label in SENTIMENT_LABELS},
+        'polarity': {
+            'mean': _number(polarity.mean()) if total else None,
+            'std': _number(polarity.std(ddof=1)) if total > 1 else None,
+            'quartiles': [_number(q) for q in np.percentile(polarity, [25, 50, 75])] if total else None,
+            'histogram': {
+                'edges': [round(float(edge), 2) for edge in edges],
+                'counts': [int(count) for count in histogram],
+            },
+        },
+    }
+
+
+def group_means(frame):
+    """Per class/subject response counts and mean scores."""
+    grouped = frame.groupby('group', observed=True).agg(
+        responses=('id', 'size'),
+        mean_polarity=('sentiment_polarity', 'mean'),
+        mean_subjectivity=('sentiment_subjectivity', 'mean'),
+        mean_q1_score=('q1_score', 'mean'),
+    )
+    return {
+        str(group): {
+            'responses': int(row.responses),
+            'mean_polarity': _number(row.mean_polarity),
+            'mean_subjectivity': _number(row.mean_subjectivity),
+            'mean_q1_score': _number(row.mean_q1_score),
+        }
+        for group, row in grouped.iterrows()
+    }
+
+
+def crosstab(frame, rows, columns):
+    """{row value: {column value: count}} for two categorical columns."""
+    table = pd.crosstab(frame[rows], frame[columns])
+    return {
+        str(row): {str(column): int(count) for column, count in counts.items() if count}
+        for row, counts in table.iterrows()
+        if counts.any()
+    }
+
+
+def satisfaction_sentiment_correlation(frame):
+    """Correlation between the q1 score and sentiment polarity."""
+    scored = _scored(frame)
+    pairs = scored[['q1_score', 'sentiment_polarity']].dropna().astype('float64')
+    n = len(pairs)
+    if n < 3 or pairs['q1_score'].nunique() < 2 or pairs['sentiment_polarity'].nunique() < 2:
+        return {'n': n, 'pearson': None, 'spearman': None}
+    # Spearman is Pearson over average ranks (pandas' own method needs SciPy)
+    ranks = pairs.rank()
+    return {
+        'n': n,
+        'pearson': _number(pairs['q1_score'].corr(pairs['sentiment_polarity'])),
+        'spearman': _number(ranks['q1_score'].corr(ranks['sentiment_polarity'])),
+    }
+
+
+def summarize(frame):
+    scored = _scored(frame)
+    return {
+        'responses': len(frame),
+        'answers': answer_distributions(frame),
+        'sentiment': sentiment_distribution(frame),
+        'by_group': group_means(frame),
+        'crosstabs': {
+            'q1_by_group': crosstab(frame, 'group', 'q1'),
+            'q1_by_sentiment': crosstab(scored, 'q1', 'sentiment_label'),
+        },
+        'q1_sentiment_correlation': satisfaction_sentiment_correlation(frame),
+    }
+
+
+def summary(respondent_type):
+    """Everything the analytics API reports for one respondent type."""
+    result = summarize(load_frame(respondent_type))
+    result['group_field'] = GROUP_FIELDS[respondent_type]
+    return result
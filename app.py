@@ -1,101 +1,100 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, make_response
-from flask_sqlalchemy import SQLAlchemy
-from textblob import TextBlob
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import os
-import io
-import base64
-import csv
+import time
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import re
-import pandas as pd
+import click
+
+from db_config import database_url_from_env, engine_options_from_env, sqlite_pragmas_from_env, configure_engine
+from models import db, FEEDBACK_MODELS, StudentFeedback, TeacherFeedback, ImportJob, create_schema
+from sentiment_queue import SentimentWorkerPool
+from submission_buffer import SubmissionBuffer
+from import_jobs import ImportJobRunner, job_status
+from exports import iter_in_batches, csv_download, json_download
+import aggregates
+import browse
+import normalized
+import question_sentiment
+import rescore
+import rollups
+import sentiment
+import trends
+from charts import ChartService, CHART_SPECS
+from chart_renderer import FORMATS as CHART_FORMATS
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key_here_change_in_production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///db.sqlite3'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url_from_env()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection pool for server databases (DB_POOL_SIZE, DB_MAX_OVERFLOW, ...), see db_config.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
 
-db = SQLAlchemy(app)
+# SQLite connection PRAGMAs (WAL, busy timeout, cache sizes), see db_config.py
+app.config['SQLITE_PRAGMAS'] = sqlite_pragmas_from_env()
 
-# Database Models
-class StudentFeedback(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    student_name = db.Column(db.String(100), nullable=False)
-    student_class = db.Column(db.String(50), nullable=False)
-    student_email = db.Column(db.String(120), nullable=False)
-    student_phone = db.Column(db.String(20), nullable=False)
-    
-    # Closed-ended questions
-    q1 = db.Column(db.String(50), nullable=False)  # satisfaction
-    q2 = db.Column(db.String(10), nullable=False)  # internet access
-    q3 = db.Column(db.String(50), nullable=False)  # technical issues
-    q4 = db.Column(db.String(10), nullable=False)  # interactive
-    q5 = db.Column(db.String(10), nullable=False)  # comfortable asking
-    q6 = db.Column(db.String(50), nullable=False)  # teaching materials
-    q7 = db.Column(db.String(10), nullable=False)  # assignments manageable
-    q8 = db.Column(db.String(50), nullable=False)  # preference
-    q9 = db.Column(db.String(50), nullable=False)  # timely feedback
-    q10 = db.Column(db.String(10), nullable=False) # recommend
-    
-    # Open-ended questions
-    open_q1 = db.Column(db.Text, nullable=False)
-    open_q2 = db.Column(db.Text, nullable=False)
-    open_q3 = db.Column(db.Text, nullable=False)
-    open_q4 = db.Column(db.Text, nullable=False)
-    open_q5 = db.Column(db.Text, nullable=False)
-    open_q6 = db.Column(db.Text, nullable=False)
-    open_q7 = db.Column(db.Text, nullable=False)
-    open_q8 = db.Column(db.Text, nullable=False)
-    open_q9 = db.Column(db.Text, nullable=False)
-    open_q10 = db.Column(db.Text, nullable=False)
-    
-    # Sentiment analysis results
-    sentiment_polarity = db.Column(db.Float, nullable=True)
-    sentiment_subjectivity = db.Column(db.Float, nullable=True)
-    sentiment_label = db.Column(db.String(20), nullable=True)
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# Sentiment analysis runs in background worker threads ('async') or inline on the request ('sync')
+app.config['SENTIMENT_MODE'] = os.environ.get('SENTIMENT_MODE', 'async')
+app.config['SENTIMENT_WORKERS'] = int(os.environ.get('SENTIMENT_WORKERS', 2))
+# Scoring engine: 'textblob', or 'lexicon' for the same lexicon compiled into a faster scorer, see sentiment_engines.py
+app.config['SENTIMENT_ENGINE'] = os.environ.get('SENTIMENT_ENGINE', 'textblob')
+# Polarity above/below which a response is labelled positive/negative (`flask rescore` applies changes)
+app.config['SENTIMENT_POSITIVE_THRESHOLD'] = float(os.environ.get('SENTIMENT_POSITIVE_THRESHOLD', 0.1))
+app.config['SENTIMENT_NEGATIVE_THRESHOLD'] = float(os.environ.get('SENTIMENT_NEGATIVE_THRESHOLD', -0.1))
+# Scores of individual answers kept in memory per process, plus an optional shared SQLite file
+app.config['SENTIMENT_CACHE_SIZE'] = int(os.environ.get('SENTIMENT_CACHE_SIZE', 10000))
+app.config['SENTIMENT_CACHE_PATH'] = os.environ.get('SENTIMENT_CACHE_PATH')
 
-class TeacherFeedback(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    teacher_name = db.Column(db.String(100), nullable=False)
-    teacher_subject = db.Column(db.String(50), nullable=False)
-    teacher_email = db.Column(db.String(120), nullable=False)
-    teacher_phone = db.Column(db.String(20), nullable=False)
-    
-    # Closed-ended questions
-    q1 = db.Column(db.String(50), nullable=False)  # effectiveness
-    q2 = db.Column(db.String(10), nullable=False)  # resources access
-    q3 = db.Column(db.String(50), nullable=False)  # technical issues
-    q4 = db.Column(db.String(10), nullable=False)  # student engagement
-    q5 = db.Column(db.String(10), nullable=False)  # comfortable with tools
-    q6 = db.Column(db.String(50), nullable=False)  # student participation
-    q7 = db.Column(db.String(10), nullable=False)  # assessments manageable
-    q8 = db.Column(db.String(50), nullable=False)  # preference
-    q9 = db.Column(db.String(50), nullable=False)  # provide feedback
-    q10 = db.Column(db.String(10), nullable=False) # recommend
-    
-    # Open-ended questions
-    open_q1 = db.Column(db.Text, nullable=False)
-    open_q2 = db.Column(db.Text, nullable=False)
-    open_q3 = db.Column(db.Text, nullable=False)
-    open_q4 = db.Column(db.Text, nullable=False)
-    open_q5 = db.Column(db.Text, nullable=False)
-    open_q6 = db.Column(db.Text, nullable=False)
-    open_q7 = db.Column(db.Text, nullable=False)
-    open_q8 = db.Column(db.Text, nullable=False)
-    open_q9 = db.Column(db.Text, nullable=False)
-    open_q10 = db.Column(db.Text, nullable=False)
-    
-    # Sentiment analysis results
-    sentiment_polarity = db.Column(db.Float, nullable=True)
-    sentiment_subjectivity = db.Column(db.Float, nullable=True)
-    sentiment_label = db.Column(db.String(20), nullable=True)
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# Rows per transaction for CSV uploads
+app.config['IMPORT_CHUNK_SIZE'] = int(os.environ.get('IMPORT_CHUNK_SIZE', 1000))
+# Directory uploads are saved to before import (default: instance/import_spool)
+app.config['IMPORT_SPOOL_DIR'] = os.environ.get('IMPORT_SPOOL_DIR')
+# Background import threads per process (0 = import inside the request)
+app.config['IMPORT_JOB_WORKERS'] = int(os.environ.get('IMPORT_JOB_WORKERS', 1))
+
+# Rows fetched per query when streaming downloads
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+# Rendered charts are cached per data version; set a directory to share them between workers
+app.config['CHART_CACHE_SIZE'] = int(os.environ.get('CHART_CACHE_SIZE', 32))
+app.config['CHART_CACHE_DIR'] = os.environ.get('CHART_CACHE_DIR')
+# 'image' serves server-rendered PNG charts; 'client' sends chart data as JSON for static/charts.js to draw
+app.config['DASHBOARD_CHART_MODE'] = os.environ.get('DASHBOARD_CHART_MODE', 'image')
+# Processes that draw charts for this app process (0 = draw in the request thread), see chart_renderer.py
+app.config['CHART_RENDER_WORKERS'] = int(os.environ.get('CHART_RENDER_WORKERS', 1))
+
+# Also keep answers in narrow question/answer-code tables, see normalized.py
+app.config['NORMALIZED_RESPONSES'] = os.environ.get('NORMALIZED_RESPONSES', '').lower() in ('1', 'true', 'yes', 'on')
+
+# Group commit: buffer form submissions and write them in batches, see submission_buffer.py
+app.config['GROUP_COMMIT'] = os.environ.get('GROUP_COMMIT', '').lower() in ('1', 'true', 'yes', 'on')
+app.config['GROUP_COMMIT_MAX_ROWS'] = int(os.environ.get('GROUP_COMMIT_MAX_ROWS', 100))
+app.config['GROUP_COMMIT_INTERVAL_MS'] = int(os.environ.get('GROUP_COMMIT_INTERVAL_MS', 10))
+app.config['GROUP_COMMIT_QUEUE_SIZE'] = int(os.environ.get('GROUP_COMMIT_QUEUE_SIZE', 1000))
+app.config['GROUP_COMMIT_DURABILITY'] = os.environ.get('GROUP_COMMIT_DURABILITY', 'commit')
+app.config['GROUP_COMMIT_TIMEOUT'] = float(os.environ.get('GROUP_COMMIT_TIMEOUT', 30))
+
+db.init_app(app)
+configure_engine(app, db)
+sentiment.configure_engine(app.config['SENTIMENT_ENGINE'])
+sentiment.configure_cache(app.config['SENTIMENT_CACHE_SIZE'], app.config['SENTIMENT_CACHE_PATH'])
+sentiment.configure_thresholds(app.config['SENTIMENT_POSITIVE_THRESHOLD'], app.config['SENTIMENT_NEGATIVE_THRESHOLD'])
+
+# Under `python app.py` the chart and sentiment process pools re-import this
+# file as __mp_main__ in every process they spawn; those only run the
+# functions they are sent, so they skip the database setup
+if __name__ != '__mp_main__':
+    with app.app_context():
+        create_schema()
+        normalized.ensure_built()
+        # Before the answer counts are built from the labels (and after the
+        # normalized tables they may be counted from)
+        rescore.lowercase_labels()
+        aggregates.ensure_built()
+        rollups.ensure_built()
+        trends.ensure_built()
+        # Don't hand pooled connections opened at import time to forked workers
+        db.engine.dispose()
 
 # Helper function to sanitize input
 def sanitize_input(text):
@@ -108,24 +107,21 @@ def sanitize_input(text):
 
 # Helper function to perform sentiment analysis
 def analyze_sentiment(open_responses):
-    combined_text = " ".join([response for response in open_responses if response])
-    combined_text = sanitize_input(combined_text)
-    
-    if not combined_text:
-        return 0.0, 0.0, "neutral"
-    
-    blob = TextBlob(combined_text)
-    polarity = blob.sentiment.polarity
-    subjectivity = blob.sentiment.subjectivity
-    
-    if polarity > 0.1:
-        label = "positive"
-    elif polarity < -0.1:
-        label = "negative"
-    else:
-        label = "neutral"
-    
-    return polarity, subjectivity, label
+    # Each answer is scored separately (and cached), then combined
+    answers = [sanitize_input(response) for response in open_responses if response]
+    return sentiment.score_answers(answers)
+
+sentiment_pool = SentimentWorkerPool(app, score_func=analyze_sentiment)
+import_jobs = ImportJobRunner(app)
+submission_buffer = SubmissionBuffer(app, sentiment_pool=sentiment_pool)
+chart_service = ChartService(app)
+
+@app.before_request
+def start_background_workers():
+    # Picks up anything left in the queues from a previous run
+    sentiment_pool.ensure_started()
+    import_jobs.ensure_started()
+    submission_buffer.ensure_started()
 
 # Routes
 @app.route('/')
@@ -161,9 +157,6 @@ def student_feedback():
             for i in range(1, 11):
                 open_responses.append(sanitize_input(request.form.get(f'open_q{i}')))
             
-            # Perform sentiment analysis
-            polarity, subjectivity, sentiment_label = analyze_sentiment(open_responses)
-            
             # Create new student feedback record
             feedback = StudentFeedback(
                 student_name=name,
@@ -174,18 +167,17 @@ def student_feedback():
                 q6=q_responses[5], q7=q_responses[6], q8=q_responses[7], q9=q_responses[8], q10=q_responses[9],
                 open_q1=open_responses[0], open_q2=open_responses[1], open_q3=open_responses[2], 
                 open_q4=open_responses[3], open_q5=open_responses[4], open_q6=open_responses[5],
-                open_q7=open_responses[6], open_q8=open_responses[7], open_q9=open_responses[8], open_q10=open_responses[9],
-                sentiment_polarity=polarity,
-                sentiment_subjectivity=subjectivity,
-                sentiment_label=sentiment_label
+                open_q7=open_responses[6], open_q8=open_responses[7], open_q9=open_responses[8], open_q10=open_responses[9]
             )
             
-            db.session.add(feedback)
-            db.session.commit()
+            # Sentiment is scored by the background workers (or inline in sync mode);
+            # with group commit the row is written together with other submissions
+            submission_buffer.save('student', feedback, open_responses)
             
             return redirect(url_for('thankyou_student', name=name))
         
         except Exception as e:
+            db.session.rollback()
             flash('An error occurred while submitting your feedback. Please try again.', 'error')
             return render_template('student_feedback.html')
     
@@ -216,9 +208,6 @@ def teacher_feedback():
             for i in range(1, 11):
                 open_responses.append(sanitize_input(request.form.get(f'open_q{i}')))
             
-            # Perform sentiment analysis
-            polarity, subjectivity, sentiment_label = analyze_sentiment(open_responses)
-            
             # Create new teacher feedback record
             feedback = TeacherFeedback(
                 teacher_name=name,
@@ -229,18 +218,17 @@ def teacher_feedback():
                 q6=q_responses[5], q7=q_responses[6], q8=q_responses[7], q9=q_responses[8], q10=q_responses[9],
                 open_q1=open_responses[0], open_q2=open_responses[1], open_q3=open_responses[2], 
                 open_q4=open_responses[3], open_q5=open_responses[4], open_q6=open_responses[5],
-                open_q7=open_responses[6], open_q8=open_responses[7], open_q9=open_responses[8], open_q10=open_responses[9],
-                sentiment_polarity=polarity,
-                sentiment_subjectivity=subjectivity,
-                sentiment_label=sentiment_label
+                open_q7=open_responses[6], open_q8=open_responses[7], open_q9=open_responses[8], open_q10=open_responses[9]
             )
             
-            db.session.add(feedback)
-            db.session.commit()
+            # Sentiment is scored by the background workers (or inline in sync mode);
+            # with group commit the row is written together with other submissions
+            submission_buffer.save('teacher', feedback, open_responses)
             
             return redirect(url_for('thankyou_teacher', name=name))
         
         except Exception as e:
+            db.session.rollback()
             flash('An error occurred while submitting your feedback. Please try again.', 'error')
             return render_template('teacher_feedback.html')
     
@@ -278,9 +266,9 @@ def admin_dashboard():
         return redirect(url_for('admin_login'))
     
     try:
-        # Get statistics
-        student_count = StudentFeedback.query.count()
-        teacher_count = TeacherFeedback.query.count()
+        # Get statistics from the aggregate table
+        student_count = aggregates.response_count('student')
+        teacher_count = aggregates.response_count('teacher')
         
         # Generate charts with error handling
         charts = generate_charts()
@@ -293,8 +281,10 @@ def admin_dashboard():
                              student_count=student_count,
                              teacher_count=teacher_count,
                              charts=charts,
+                             chart_mode=app.config['DASHBOARD_CHART_MODE'],
                              recent_students=recent_students,
-                             recent_teachers=recent_teachers)
+                             recent_teachers=recent_teachers,
+                             import_job_id=request.args.get('job'))
     except Exception as e:
         print(f"Error in admin dashboard: {e}")
         # Return dashboard without charts if there's an error
@@ -302,166 +292,213 @@ def admin_dashboard():
                              student_count=0,
                              teacher_count=0,
                              charts={},
+                             chart_mode=app.config['DASHBOARD_CHART_MODE'],
                              recent_students=[],
                              recent_teachers=[])
 
 def generate_charts():
+    # Image (or chart data) URLs for the charts that have data; they load separately
     charts = {}
-    
-    try:
-        # Sentiment distribution chart
-        student_sentiments = db.session.query(StudentFeedback.sentiment_label).all()
-        teacher_sentiments = db.session.query(TeacherFeedback.sentiment_label).all()
-        
-        sentiment_data = {}
-        for sentiment in [s[0] for s in student_sentiments + teacher_sentiments if s[0]]:
-            sentiment_data[sentiment] = sentiment_data.get(sentiment, 0) + 1
-        
-        if sentiment_data:
-            try:
-                plt.figure(figsize=(8, 6))
-                
-                # Define distinct colors for sentiment analysis
-                sentiment_colors = {
-                    'positive': '#2E8B57',     # Sea Green
-                    'neutral': '#FF8C00',      # Dark Orange  
-                    'negative': '#DC143C'      # Crimson Red
-                }
-                
-                # Get colors for each bar based on sentiment
-                colors = [sentiment_colors.get(sentiment, '#6495ED') for sentiment in sentiment_data.keys()]
-                
-                # Calculate total for percentages
-                total_responses = sum(sentiment_data.values())
-                
-                bars = plt.bar(list(sentiment_data.keys()), list(sentiment_data.values()), color=colors)
-                
-                # Add percentage labels on bars
-                for bar, (sentiment, count) in zip(bars, sentiment_data.items()):
-                    percentage = (count / total_responses) * 100
-                    height = bar.get_height()
-                    plt.text(bar.get_x() + bar.get_width()/2., height + total_responses*0.01,
-                            f'{percentage:.1f}%', ha='center', va='bottom', fontweight='bold', fontsize=10)
-                
-                plt.title('Overall Sentiment Distribution')
-                plt.ylabel('Count')
-                plt.xlabel('Sentiment')
-                plt.ylim(0, max(sentiment_data.values()) * 1.15)  # Add space for percentage labels
-                
-                # Save chart as base64 string
-                img = io.BytesIO()
-                plt.savefig(img, format='png', bbox_inches='tight', dpi=80, facecolor='white')
-                img.seek(0)
-                charts['sentiment'] = base64.b64encode(img.getvalue()).decode()
-                plt.close()
-            except Exception as e:
-                print(f"Error generating sentiment chart: {e}")
-                plt.close('all')  # Close any open figures
-        
-        # Student Satisfaction levels
+    client_side = app.config['DASHBOARD_CHART_MODE'] == 'client'
+    for name in CHART_SPECS:
         try:
-            student_satisfaction = db.session.query(StudentFeedback.q1).all()
-            satisfaction_data = {}
-            for sat in [s[0] for s in student_satisfaction if s[0]]:
-                satisfaction_data[sat] = satisfaction_data.get(sat, 0) + 1
-            
-            if satisfaction_data:
-                plt.figure(figsize=(10, 6))
-                
-                # Define colors for different satisfaction levels
-                satisfaction_colors = {
-                    'Very Satisfied': '#28a745',      # Green
-                    'Satisfied': '#6c757d',           # Gray
-                    'Neutral': '#ffc107',             # Yellow  
-                    'Dissatisfied': '#fd7e14',        # Orange
-                    'Very Dissatisfied': '#dc3545'    # Red
-                }
-                
-                # Get colors for each bar based on satisfaction level
-                colors = [satisfaction_colors.get(level, '#007bff') for level in satisfaction_data.keys()]
-                
-                # Calculate total for percentages
-                total_responses = sum(satisfaction_data.values())
-                
-                bars = plt.bar(list(satisfaction_data.keys()), list(satisfaction_data.values()), color=colors)
-                
-                # Add percentage labels on bars
-                for bar, (level, count) in zip(bars, satisfaction_data.items()):
-                    percentage = (count / total_responses) * 100
-                    height = bar.get_height()
-                    plt.text(bar.get_x() + bar.get_width()/2., height + total_responses*0.01,
-                            f'{percentage:.1f}%', ha='center', va='bottom', fontweight='bold', fontsize=10)
-                
-                plt.title('Student Satisfaction Levels')
-                plt.ylabel('Count')
-                plt.xlabel('Satisfaction Level')
-                plt.xticks(rotation=45)
-                plt.ylim(0, max(satisfaction_data.values()) * 1.15)  # Add space for percentage labels
-                
-                img = io.BytesIO()
-                plt.savefig(img, format='png', bbox_inches='tight', dpi=80, facecolor='white')
-                img.seek(0)
-                charts['satisfaction'] = base64.b64encode(img.getvalue()).decode()
-                plt.close()
-        except Exception as e:
-            print(f"Error generating satisfaction chart: {e}")
-            plt.close('all')  # Close any open figures
-            
-        # Teacher Effectiveness levels
-        try:
-            teacher_effectiveness = db.session.query(TeacherFeedback.q1).all()
-            effectiveness_data = {}
-            for eff in [e[0] for e in teacher_effectiveness if e[0]]:
-                effectiveness_data[eff] = effectiveness_data.get(eff, 0) + 1
-            
-            if effectiveness_data:
-                plt.figure(figsize=(10, 6))
-                
-                # Define colors for different effectiveness levels
-                effectiveness_colors = {
-                    'Very Effective': '#28a745',       # Green
-                    'Effective': '#17a2b8',           # Teal
-                    'Neutral': '#ffc107',             # Yellow
-                    'Ineffective': '#fd7e14',         # Orange
-                    'Very Ineffective': '#dc3545'     # Red
-                }
-                
-                # Get colors for each bar based on effectiveness level
-                colors = [effectiveness_colors.get(level, '#007bff') for level in effectiveness_data.keys()]
-                
-                # Calculate total for percentages
-                total_responses = sum(effectiveness_data.values())
-                
-                bars = plt.bar(list(effectiveness_data.keys()), list(effectiveness_data.values()), color=colors)
-                
-                # Add percentage labels on bars
-                for bar, (level, count) in zip(bars, effectiveness_data.items()):
-                    percentage = (count / total_responses) * 100
-                    height = bar.get_height()
-                    plt.text(bar.get_x() + bar.get_width()/2., height + total_responses*0.01,
-                            f'{percentage:.1f}%', ha='center', va='bottom', fontweight='bold', fontsize=10)
-                
-                plt.title('Teacher Effectiveness Levels')
-                plt.ylabel('Count')
-                plt.xlabel('Effectiveness Level')
-                plt.xticks(rotation=45)
-                plt.ylim(0, max(effectiveness_data.values()) * 1.15)  # Add space for percentage labels
-                
-                img = io.BytesIO()
-                plt.savefig(img, format='png', bbox_inches='tight', dpi=80, facecolor='white')
-                img.seek(0)
-                charts['teacher_effectiveness'] = base64.b64encode(img.getvalue()).decode()
-                plt.close()
+            if chart_service.version(name):
+                charts[name] = url_for('admin_chart_data' if client_side else 'admin_chart_image', name=name)
         except Exception as e:
-            print(f"Error generating teacher effectiveness chart: {e}")
-            plt.close('all')  # Close any open figures
-            
-    except Exception as e:
-        print(f"Error in chart generation: {e}")
-        plt.close('all')  # Close any open figures
-    
+            print(f"Error checking {name} chart: {e}")
     return charts
 
+@app.route('/admin/charts/<name>.png')
+def admin_chart_image(name):
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    if name not in CHART_SPECS:
+        return make_response('Chart not found', 404)
+    
+    # Answer revalidation straight from the data version, without rendering
+    version = chart_service.version(name)
+    if version is None:
+        return make_response('No data for this chart', 404)
+    etag = f'{name}-{version}'
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    image_data, version = chart_service.png_entry(name)
+    if image_data is None:
+        return make_response('Chart could not be rendered', 500)
+    
+    response = make_response(image_data)
+    response.headers['Content-Type'] = 'image/png'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    # Validated by data version alone, which every worker agrees on (render times differ)
+    response.set_etag(f'{name}-{version}')
+    return response.make_conditional(request)
+
+@app.route('/admin/api/charts/<name>')
+def admin_chart_data(name):
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    if name not in CHART_SPECS:
+        return jsonify({'error': f'Unknown chart: {name}'}), 404
+    
+    # Only the aggregated counts; the dashboard draws them itself
+    spec, version = chart_service.data_entry(name)
+    if spec is None:
+        return jsonify({'error': 'No data for this chart'}), 404
+    
+    response = jsonify(dict(spec, name=name, version=version))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(f'{name}-{version}')
+    return response.make_conditional(request)
+
+@app.route('/admin/api/sentiment-queue')
+def admin_sentiment_queue():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    return jsonify(sentiment_pool.metrics())
+
+@app.route('/admin/api/sentiment-cache')
+def admin_sentiment_cache():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    return jsonify(dict(sentiment.cache.stats(), engine=sentiment.engine.name))
+
+@app.route('/admin/api/analytics')
+def admin_analytics():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    respondent_type = request.args.get('type')
+    # pandas and NumPy are only loaded once analytics are asked for
+    import analytics
+
+    if respondent_type and respondent_type not in analytics.GROUP_FIELDS:
+        return jsonify({'error': 'type must be student or teacher'}), 400
+    
+    types = [respondent_type] if respondent_type else list(analytics.GROUP_FIELDS)
+    return jsonify({kind: analytics.summary(kind) for kind in types})
+
+@app.route('/admin/api/question-sentiment')
+def admin_question_sentiment():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    respondent_type = request.args.get('type')
+    if respondent_type and respondent_type not in FEEDBACK_MODELS:
+        return jsonify({'error': 'type must be student or teacher'}), 400
+    
+    types = [respondent_type] if respondent_type else list(FEEDBACK_MODELS)
+    return jsonify({kind: question_sentiment.distributions(kind) for kind in types})
+
+@app.route('/admin/api/breakdown')
+def admin_breakdown():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    by = request.args.get('by', 'student_class')
+    question = request.args.get('question', 'q1')
+    bucket = request.args.get('bucket', 'all')
+    respondent_type = rollups.RESPONDENT_TYPES_BY_GROUP.get(by)
+    if respondent_type is None:
+        return jsonify({'error': 'by must be student_class or teacher_subject'}), 400
+    if question not in rollups.QUESTIONS:
+        return jsonify({'error': f"question must be one of {', '.join(rollups.QUESTIONS)}"}), 400
+    if bucket not in rollups.PERIODS:
+        return jsonify({'error': 'bucket must be all, day or week'}), 400
+    try:
+        start, end = rollups.parse_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    counts = rollups.breakdown(respondent_type, question, bucket, start, end, request.args.get('group'))
+    result = {'by': by, 'question': question, 'bucket': bucket}
+    if bucket == 'all':
+        result['groups'] = counts.get(rollups.ALL_TIME, {})
+    else:
+        result['buckets'] = [{'start': period_start.isoformat(), 'groups': groups}
+                             for period_start, groups in counts.items()]
+    return jsonify(result)
+
+@app.route('/admin/api/trends')
+def admin_trends():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    bucket = request.args.get('bucket', 'week')
+    respondent_type = request.args.get('type')
+    if bucket not in trends.PERIODS:
+        return jsonify({'error': 'bucket must be day or week'}), 400
+    if respondent_type and respondent_type not in FEEDBACK_MODELS:
+        return jsonify({'error': 'type must be student or teacher'}), 400
+    try:
+        start, end = rollups.parse_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    types = [respondent_type] if respondent_type else list(FEEDBACK_MODELS)
+    result = {'bucket': bucket}
+    try:
+        for kind in types:
+            result[kind] = trends.series(kind, bucket, start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+def feedback_page(respondent_type):
+    # ?cursor=&limit=&fields=a,b&<class/subject, sentiment_label or q1-q10>=value (repeat for several)
+    try:
+        limit = int(request.args.get('limit', browse.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    fields = request.args.get('fields')
+    filters = {name: values for name, values in request.args.lists()
+               if name not in ('cursor', 'limit', 'fields')}
+    try:
+        result = browse.page(respondent_type, fields.split(',') if fields else None, filters,
+                             request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/admin/api/students')
+def admin_api_students():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    return feedback_page('student')
+
+@app.route('/admin/api/teachers')
+def admin_api_teachers():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    return feedback_page('teacher')
+
+@app.route('/admin/api/submission-buffer')
+def admin_submission_buffer():
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    return jsonify(submission_buffer.metrics())
+
+@app.route('/admin/jobs/<job_id>')
+def admin_job_status(job_id):
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job_status(job))
+
 @app.route('/admin/logout')
 def admin_logout():
     session.pop('admin_logged_in', None)
@@ -473,11 +510,6 @@ def download_students_csv():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    students = StudentFeedback.query.all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
     # Write header
     header = [
         'ID', 'Name', 'Class', 'Email', 'Phone',
@@ -487,37 +519,28 @@ def download_students_csv():
         'Benefit 2', 'Experience', 'Support', 'Additional Comments', 'Future Suggestions',
         'Sentiment Polarity', 'Sentiment Subjectivity', 'Sentiment Label', 'Created At'
     ]
-    writer.writerow(header)
-    
-    # Write data
-    for student in students:
-        row = [
-            student.id, student.student_name, student.student_class, student.student_email, student.student_phone,
-            student.q1, student.q2, student.q3, student.q4, student.q5,
-            student.q6, student.q7, student.q8, student.q9, student.q10,
-            student.open_q1, student.open_q2, student.open_q3, student.open_q4, student.open_q5,
-            student.open_q6, student.open_q7, student.open_q8, student.open_q9, student.open_q10,
-            student.sentiment_polarity, student.sentiment_subjectivity, student.sentiment_label,
-            student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
-        ]
-        writer.writerow(row)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=student_feedback_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
     
-    return response
+    # Rows are fetched in batches and streamed as they are written
+    def rows():
+        for student in iter_in_batches(normalized.export_source('student'), app.config['EXPORT_BATCH_SIZE']):
+            row = [
+                student.id, student.student_name, student.student_class, student.student_email, student.student_phone,
+                student.q1, student.q2, student.q3, student.q4, student.q5,
+                student.q6, student.q7, student.q8, student.q9, student.q10,
+                student.open_q1, student.open_q2, student.open_q3, student.open_q4, student.open_q5,
+                student.open_q6, student.open_q7, student.open_q8, student.open_q9, student.open_q10,
+                student.sentiment_polarity, student.sentiment_subjectivity, student.sentiment_label,
+                student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
+            ]
+            yield row
+    
+    return csv_download(header, rows(), 'student_feedback')
 
 @app.route('/admin/download/teachers/csv')
 def download_teachers_csv():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    teachers = TeacherFeedback.query.all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
     # Write header
     header = [
         'ID', 'Name', 'Subject', 'Email', 'Phone',
@@ -527,140 +550,127 @@ def download_teachers_csv():
         'Benefit 2', 'Experience', 'Support', 'Additional Comments', 'Future Suggestions',
         'Sentiment Polarity', 'Sentiment Subjectivity', 'Sentiment Label', 'Created At'
     ]
-    writer.writerow(header)
-    
-    # Write data
-    for teacher in teachers:
-        row = [
-            teacher.id, teacher.teacher_name, teacher.teacher_subject, teacher.teacher_email, teacher.teacher_phone,
-            teacher.q1, teacher.q2, teacher.q3, teacher.q4, teacher.q5,
-            teacher.q6, teacher.q7, teacher.q8, teacher.q9, teacher.q10,
-            teacher.open_q1, teacher.open_q2, teacher.open_q3, teacher.open_q4, teacher.open_q5,
-            teacher.open_q6, teacher.open_q7, teacher.open_q8, teacher.open_q9, teacher.open_q10,
-            teacher.sentiment_polarity, teacher.sentiment_subjectivity, teacher.sentiment_label,
-            teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
-        ]
-        writer.writerow(row)
     
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=teacher_feedback_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    
-    return response
+    # Rows are fetched in batches and streamed as they are written
+    def rows():
+        for teacher in iter_in_batches(normalized.export_source('teacher'), app.config['EXPORT_BATCH_SIZE']):
+            row = [
+                teacher.id, teacher.teacher_name, teacher.teacher_subject, teacher.teacher_email, teacher.teacher_phone,
+                teacher.q1, teacher.q2, teacher.q3, teacher.q4, teacher.q5,
+                teacher.q6, teacher.q7, teacher.q8, teacher.q9, teacher.q10,
+                teacher.open_q1, teacher.open_q2, teacher.open_q3, teacher.open_q4, teacher.open_q5,
+                teacher.open_q6, teacher.open_q7, teacher.open_q8, teacher.open_q9, teacher.open_q10,
+                teacher.sentiment_polarity, teacher.sentiment_subjectivity, teacher.sentiment_label,
+                teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
+            ]
+            yield row
+    
+    return csv_download(header, rows(), 'teacher_feedback')
+
+def student_to_dict(student):
+    # Nested structure used by the JSON downloads
+    return {
+        'id': student.id,
+        'personal_info': {
+            'name': student.student_name,
+            'class': student.student_class,
+            'email': student.student_email,
+            'phone': student.student_phone
+        },
+        'closed_questions': {
+            'satisfaction': student.q1,
+            'internet_access': student.q2,
+            'technical_issues': student.q3,
+            'interactive': student.q4,
+            'comfortable_asking': student.q5,
+            'teaching_materials': student.q6,
+            'assignments_manageable': student.q7,
+            'preference': student.q8,
+            'timely_feedback': student.q9,
+            'recommend': student.q10
+        },
+        'open_questions': {
+            'challenge_1': student.open_q1,
+            'challenge_2': student.open_q2,
+            'improvement_1': student.open_q3,
+            'improvement_2': student.open_q4,
+            'benefit_1': student.open_q5,
+            'benefit_2': student.open_q6,
+            'experience': student.open_q7,
+            'support': student.open_q8,
+            'additional_comments': student.open_q9,
+            'future_suggestions': student.open_q10
+        },
+        'sentiment_analysis': {
+            'polarity': student.sentiment_polarity,
+            'subjectivity': student.sentiment_subjectivity,
+            'label': student.sentiment_label
+        },
+        'created_at': student.created_at.isoformat() if student.created_at else None
+    }
 
 @app.route('/admin/download/students/json')
 def download_students_json():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    students = StudentFeedback.query.all()
-    data = []
-    
-    for student in students:
-        student_data = {
-            'id': student.id,
-            'personal_info': {
-                'name': student.student_name,
-                'class': student.student_class,
-                'email': student.student_email,
-                'phone': student.student_phone
-            },
-            'closed_questions': {
-                'satisfaction': student.q1,
-                'internet_access': student.q2,
-                'technical_issues': student.q3,
-                'interactive': student.q4,
-                'comfortable_asking': student.q5,
-                'teaching_materials': student.q6,
-                'assignments_manageable': student.q7,
-                'preference': student.q8,
-                'timely_feedback': student.q9,
-                'recommend': student.q10
-            },
-            'open_questions': {
-                'challenge_1': student.open_q1,
-                'challenge_2': student.open_q2,
-                'improvement_1': student.open_q3,
-                'improvement_2': student.open_q4,
-                'benefit_1': student.open_q5,
-                'benefit_2': student.open_q6,
-                'experience': student.open_q7,
-                'support': student.open_q8,
-                'additional_comments': student.open_q9,
-                'future_suggestions': student.open_q10
-            },
-            'sentiment_analysis': {
-                'polarity': student.sentiment_polarity,
-                'subjectivity': student.sentiment_subjectivity,
-                'label': student.sentiment_label
-            },
-            'created_at': student.created_at.isoformat() if student.created_at else None
-        }
-        data.append(student_data)
-    
-    response = make_response(jsonify(data))
-    response.headers['Content-Type'] = 'application/json'
-    response.headers['Content-Disposition'] = f'attachment; filename=student_feedback_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    
-    return response
+    # Streamed as a JSON array, or one object per line with ?format=ndjson
+    students = iter_in_batches(normalized.export_source('student'), app.config['EXPORT_BATCH_SIZE'])
+    return json_download((student_to_dict(student) for student in students), 'student_feedback',
+                         ndjson=request.args.get('format') == 'ndjson')
+
+def teacher_to_dict(teacher):
+    # Nested structure used by the JSON downloads
+    return {
+        'id': teacher.id,
+        'personal_info': {
+            'name': teacher.teacher_name,
+            'subject': teacher.teacher_subject,
+            'email': teacher.teacher_email,
+            'phone': teacher.teacher_phone
+        },
+        'closed_questions': {
+            'effectiveness': teacher.q1,
+            'resources_access': teacher.q2,
+            'technical_issues': teacher.q3,
+            'student_engagement': teacher.q4,
+            'comfortable_with_tools': teacher.q5,
+            'student_participation': teacher.q6,
+            'assessments_manageable': teacher.q7,
+            'preference': teacher.q8,
+            'provide_feedback': teacher.q9,
+            'recommend': teacher.q10
+        },
+        'open_questions': {
+            'challenge_1': teacher.open_q1,
+            'challenge_2': teacher.open_q2,
+            'improvement_1': teacher.open_q3,
+            'improvement_2': teacher.open_q4,
+            'benefit_1': teacher.open_q5,
+            'benefit_2': teacher.open_q6,
+            'experience': teacher.open_q7,
+            'support': teacher.open_q8,
+            'additional_comments': teacher.open_q9,
+            'future_suggestions': teacher.open_q10
+        },
+        'sentiment_analysis': {
+            'polarity': teacher.sentiment_polarity,
+            'subjectivity': teacher.sentiment_subjectivity,
+            'label': teacher.sentiment_label
+        },
+        'created_at': teacher.created_at.isoformat() if teacher.created_at else None
+    }
 
 @app.route('/admin/download/teachers/json')
 def download_teachers_json():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    teachers = TeacherFeedback.query.all()
-    data = []
-    
-    for teacher in teachers:
-        teacher_data = {
-            'id': teacher.id,
-            'personal_info': {
-                'name': teacher.teacher_name,
-                'subject': teacher.teacher_subject,
-                'email': teacher.teacher_email,
-                'phone': teacher.teacher_phone
-            },
-            'closed_questions': {
-                'effectiveness': teacher.q1,
-                'resources_access': teacher.q2,
-                'technical_issues': teacher.q3,
-                'student_engagement': teacher.q4,
-                'comfortable_with_tools': teacher.q5,
-                'student_participation': teacher.q6,
-                'assessments_manageable': teacher.q7,
-                'preference': teacher.q8,
-                'provide_feedback': teacher.q9,
-                'recommend': teacher.q10
-            },
-            'open_questions': {
-                'challenge_1': teacher.open_q1,
-                'challenge_2': teacher.open_q2,
-                'improvement_1': teacher.open_q3,
-                'improvement_2': teacher.open_q4,
-                'benefit_1': teacher.open_q5,
-                'benefit_2': teacher.open_q6,
-                'experience': teacher.open_q7,
-                'support': teacher.open_q8,
-                'additional_comments': teacher.open_q9,
-                'future_suggestions': teacher.open_q10
-            },
-            'sentiment_analysis': {
-                'polarity': teacher.sentiment_polarity,
-                'subjectivity': teacher.sentiment_subjectivity,
-                'label': teacher.sentiment_label
-            },
-            'created_at': teacher.created_at.isoformat() if teacher.created_at else None
-        }
-        data.append(teacher_data)
-    
-    response = make_response(jsonify(data))
-    response.headers['Content-Type'] = 'application/json'
-    response.headers['Content-Disposition'] = f'attachment; filename=teacher_feedback_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-    
-    return response
+    # Streamed as a JSON array, or one object per line with ?format=ndjson
+    teachers = iter_in_batches(normalized.export_source('teacher'), app.config['EXPORT_BATCH_SIZE'])
+    return json_download((teacher_to_dict(teacher) for teacher in teachers), 'teacher_feedback',
+                         ndjson=request.args.get('format') == 'ndjson')
 
-# CSV Upload Routes
 @app.route('/admin/upload/students', methods=['POST'])
 def upload_student_csv():
     if not session.get('admin_logged_in'):
@@ -677,92 +687,14 @@ def upload_student_csv():
             return redirect(url_for('admin_dashboard'))
         
         if file and file.filename.lower().endswith('.csv'):
-            # Read CSV content
-            content = file.read().decode('utf-8-sig')
-            csv_reader = csv.DictReader(content.splitlines())
+            # Save the file and import it in the background
+            job = import_jobs.create_job('student', file)
             
-            successful_imports = 0
-            errors = []
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(job_status(job)), 202
             
-            for row_num, row in enumerate(csv_reader, start=2):
-                try:
-                    # Validate required fields
-                    name = row.get('student_name', '').strip()
-                    if not name:
-                        continue  # Skip empty rows
-                    
-                    # Create student feedback entry
-                    student_feedback = StudentFeedback(
-                        # Basic info
-                        student_name=name,
-                        student_class=row.get('student_class', '').strip(),
-                        student_email=row.get('student_email', '').strip(),
-                        student_phone=row.get('student_phone', '').strip(),
-                        
-                        # Closed-ended questions
-                        q1=row.get('q1', ''),
-                        q2=row.get('q2', ''),
-                        q3=row.get('q3', ''),
-                        q4=row.get('q4', ''),
-                        q5=row.get('q5', ''),
-                        q6=row.get('q6', ''),
-                        q7=row.get('q7', ''),
-                        q8=row.get('q8', ''),
-                        q9=row.get('q9', ''),
-                        q10=row.get('q10', ''),
-                        
-                        # Open-ended questions
-                        open_q1=row.get('open_q1', ''),
-                        open_q2=row.get('open_q2', ''),
-                        open_q3=row.get('open_q3', ''),
-                        open_q4=row.get('open_q4', ''),
-                        open_q5=row.get('open_q5', ''),
-                        open_q6=row.get('open_q6', ''),
-                        open_q7=row.get('open_q7', ''),
-                        open_q8=row.get('open_q8', ''),
-                        open_q9=row.get('open_q9', ''),
-                        open_q10=row.get('open_q10', '')
-                    )
-                    
-                    # Analyze sentiment for open-ended responses
-                    all_open_responses = ' '.join([
-                        row.get('open_q1', ''), row.get('open_q2', ''), row.get('open_q3', ''),
-                        row.get('open_q4', ''), row.get('open_q5', ''), row.get('open_q6', ''),
-                        row.get('open_q7', ''), row.get('open_q8', ''), row.get('open_q9', ''),
-                        row.get('open_q10', '')
-                    ]).strip()
-                    
-                    if all_open_responses:
-                        blob = TextBlob(all_open_responses)
-                        sentiment_score = blob.sentiment.polarity
-                        
-                        if sentiment_score > 0.1:
-                            student_feedback.sentiment_label = 'Positive'
-                        elif sentiment_score < -0.1:
-                            student_feedback.sentiment_label = 'Negative'
-                        else:
-                            student_feedback.sentiment_label = 'Neutral'
-                        
-                        student_feedback.sentiment_polarity = sentiment_score
-                        student_feedback.sentiment_subjectivity = blob.sentiment.subjectivity
-                    else:
-                        student_feedback.sentiment_label = 'Neutral'
-                        student_feedback.sentiment_polarity = 0.0
-                    
-                    db.session.add(student_feedback)
-                    successful_imports += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
-            
-            try:
-                db.session.commit()
-                flash(f'Successfully imported {successful_imports} student records!', 'success')
-                if errors:
-                    flash(f'Errors in {len(errors)} rows: {"; ".join(errors[:3])}{"..." if len(errors) > 3 else ""}', 'warning')
-            except Exception as e:
-                db.session.rollback()
-                flash(f'Database error: {str(e)}', 'error')
+            flash(f'Import of {job.filename} started', 'info')
+            return redirect(url_for('admin_dashboard', job=job.id))
         else:
             flash('Please upload a valid CSV file', 'error')
     
@@ -787,92 +719,14 @@ def upload_teacher_csv():
             return redirect(url_for('admin_dashboard'))
         
         if file and file.filename.lower().endswith('.csv'):
-            # Read CSV content
-            content = file.read().decode('utf-8-sig')
-            csv_reader = csv.DictReader(content.splitlines())
-            
-            successful_imports = 0
-            errors = []
+            # Save the file and import it in the background
+            job = import_jobs.create_job('teacher', file)
             
-            for row_num, row in enumerate(csv_reader, start=2):
-                try:
-                    # Validate required fields
-                    name = row.get('teacher_name', '').strip()
-                    if not name:
-                        continue  # Skip empty rows
-                    
-                    # Create teacher feedback entry
-                    teacher_feedback = TeacherFeedback(
-                        # Basic info
-                        teacher_name=name,
-                        teacher_subject=row.get('teacher_subject', '').strip(),
-                        teacher_email=row.get('teacher_email', '').strip(),
-                        teacher_phone=row.get('teacher_phone', '').strip(),
-                        
-                        # Closed-ended questions
-                        q1=row.get('q1', ''),
-                        q2=row.get('q2', ''),
-                        q3=row.get('q3', ''),
-                        q4=row.get('q4', ''),
-                        q5=row.get('q5', ''),
-                        q6=row.get('q6', ''),
-                        q7=row.get('q7', ''),
-                        q8=row.get('q8', ''),
-                        q9=row.get('q9', ''),
-                        q10=row.get('q10', ''),
-                        
-                        # Open-ended questions
-                        open_q1=row.get('open_q1', ''),
-                        open_q2=row.get('open_q2', ''),
-                        open_q3=row.get('open_q3', ''),
-                        open_q4=row.get('open_q4', ''),
-                        open_q5=row.get('open_q5', ''),
-                        open_q6=row.get('open_q6', ''),
-                        open_q7=row.get('open_q7', ''),
-                        open_q8=row.get('open_q8', ''),
-                        open_q9=row.get('open_q9', ''),
-                        open_q10=row.get('open_q10', '')
-                    )
-                    
-                    # Analyze sentiment for open-ended responses
-                    all_open_responses = ' '.join([
-                        row.get('open_q1', ''), row.get('open_q2', ''), row.get('open_q3', ''),
-                        row.get('open_q4', ''), row.get('open_q5', ''), row.get('open_q6', ''),
-                        row.get('open_q7', ''), row.get('open_q8', ''), row.get('open_q9', ''),
-                        row.get('open_q10', '')
-                    ]).strip()
-                    
-                    if all_open_responses:
-                        blob = TextBlob(all_open_responses)
-                        sentiment_score = blob.sentiment.polarity
-                        
-                        if sentiment_score > 0.1:
-                            teacher_feedback.sentiment_label = 'Positive'
-                        elif sentiment_score < -0.1:
-                            teacher_feedback.sentiment_label = 'Negative'
-                        else:
-                            teacher_feedback.sentiment_label = 'Neutral'
-                        
-                        teacher_feedback.sentiment_polarity = sentiment_score
-                        teacher_feedback.sentiment_subjectivity = blob.sentiment.subjectivity
-                    else:
-                        teacher_feedback.sentiment_label = 'Neutral'
-                        teacher_feedback.sentiment_polarity = 0.0
-                    
-                    db.session.add(teacher_feedback)
-                    successful_imports += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(job_status(job)), 202
             
-            try:
-                db.session.commit()
-                flash(f'Successfully imported {successful_imports} teacher records!', 'success')
-                if errors:
-                    flash(f'Errors in {len(errors)} rows: {"; ".join(errors[:3])}{"..." if len(errors) > 3 else ""}', 'warning')
-            except Exception as e:
-                db.session.rollback()
-                flash(f'Database error: {str(e)}', 'error')
+            flash(f'Import of {job.filename} started', 'info')
+            return redirect(url_for('admin_dashboard', job=job.id))
         else:
             flash('Please upload a valid CSV file', 'error')
     
@@ -887,92 +741,74 @@ def download_students_sentiment_report():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    students = StudentFeedback.query.all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
     # Write header for sentiment report
     header = [
         'ID', 'Name', 'Class', 'Email', 'Phone',
         'Sentiment Score', 'Sentiment Label', 'Subjectivity',
         'Combined Open Responses', 'Response Count', 'Created At'
     ]
-    writer.writerow(header)
     
-    # Write sentiment data
-    for student in students:
-        # Combine all open responses
-        open_responses = [
-            student.open_q1, student.open_q2, student.open_q3, student.open_q4, student.open_q5,
-            student.open_q6, student.open_q7, student.open_q8, student.open_q9, student.open_q10
-        ]
-        combined_responses = " | ".join([resp for resp in open_responses if resp])
-        response_count = len([resp for resp in open_responses if resp])
+    # Write sentiment data, streamed in batches
+    def rows():
+        for student in iter_in_batches(normalized.export_source('student'), app.config['EXPORT_BATCH_SIZE']):
+            # Combine all open responses
+            open_responses = [
+                student.open_q1, student.open_q2, student.open_q3, student.open_q4, student.open_q5,
+                student.open_q6, student.open_q7, student.open_q8, student.open_q9, student.open_q10
+            ]
+            combined_responses = " | ".join([resp for resp in open_responses if resp])
+            response_count = len([resp for resp in open_responses if resp])
         
-        row = [
-            student.id, student.student_name, student.student_class, 
-            student.student_email, student.student_phone,
-            round(student.sentiment_polarity or 0, 4),
-            student.sentiment_label or 'neutral',
-            round(student.sentiment_subjectivity or 0, 4),
-            combined_responses,
-            response_count,
-            student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
-        ]
-        writer.writerow(row)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=student_sentiment_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    
-    return response
+            row = [
+                student.id, student.student_name, student.student_class, 
+                student.student_email, student.student_phone,
+                round(student.sentiment_polarity or 0, 4),
+                student.sentiment_label or 'neutral',
+                round(student.sentiment_subjectivity or 0, 4),
+                combined_responses,
+                response_count,
+                student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
+            ]
+            yield row
+    
+    return csv_download(header, rows(), 'student_sentiment_report')
 
 @app.route('/admin/download/teachers/sentiment-report')
 def download_teachers_sentiment_report():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    teachers = TeacherFeedback.query.all()
-    
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
     # Write header for sentiment report
     header = [
         'ID', 'Name', 'Subject', 'Email', 'Phone',
         'Sentiment Score', 'Sentiment Label', 'Subjectivity',
         'Combined Open Responses', 'Response Count', 'Created At'
     ]
-    writer.writerow(header)
     
-    # Write sentiment data
-    for teacher in teachers:
-        # Combine all open responses
-        open_responses = [
-            teacher.open_q1, teacher.open_q2, teacher.open_q3, teacher.open_q4, teacher.open_q5,
-            teacher.open_q6, teacher.open_q7, teacher.open_q8, teacher.open_q9, teacher.open_q10
-        ]
-        combined_responses = " | ".join([resp for resp in open_responses if resp])
-        response_count = len([resp for resp in open_responses if resp])
+    # Write sentiment data, streamed in batches
+    def rows():
+        for teacher in iter_in_batches(normalized.export_source('teacher'), app.config['EXPORT_BATCH_SIZE']):
+            # Combine all open responses
+            open_responses = [
+                teacher.open_q1, teacher.open_q2, teacher.open_q3, teacher.open_q4, teacher.open_q5,
+                teacher.open_q6, teacher.open_q7, teacher.open_q8, teacher.open_q9, teacher.open_q10
+            ]
+            combined_responses = " | ".join([resp for resp in open_responses if resp])
+            response_count = len([resp for resp in open_responses if resp])
         
-        row = [
-            teacher.id, teacher.teacher_name, teacher.teacher_subject, 
-            teacher.teacher_email, teacher.teacher_phone,
-            round(teacher.sentiment_polarity or 0, 4),
-            teacher.sentiment_label or 'neutral',
-            round(teacher.sentiment_subjectivity or 0, 4),
-            combined_responses,
-            response_count,
-            teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
-        ]
-        writer.writerow(row)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=teacher_sentiment_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    
-    return response
+            row = [
+                teacher.id, teacher.teacher_name, teacher.teacher_subject, 
+                teacher.teacher_email, teacher.teacher_phone,
+                round(teacher.sentiment_polarity or 0, 4),
+                teacher.sentiment_label or 'neutral',
+                round(teacher.sentiment_subjectivity or 0, 4),
+                combined_responses,
+                response_count,
+                teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
+            ]
+            yield row
+    
+    return csv_download(header, rows(), 'teacher_sentiment_report')
 
 # Complete Data Export Routes
 @app.route('/admin/download/complete-export')
@@ -980,56 +816,46 @@ def download_complete_export():
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
     # Write header for combined export
     header = [
         'Type', 'ID', 'Name', 'Class/Subject', 'Email', 'Phone',
         'Sentiment Score', 'Sentiment Label', 'Subjectivity',
         'All Closed Responses', 'All Open Responses', 'Created At'
     ]
-    writer.writerow(header)
     
-    # Write student data
-    students = StudentFeedback.query.all()
-    for student in students:
-        closed_responses = f"{student.q1} | {student.q2} | {student.q3} | {student.q4} | {student.q5} | {student.q6} | {student.q7} | {student.q8} | {student.q9} | {student.q10}"
-        open_responses = f"{student.open_q1} | {student.open_q2} | {student.open_q3} | {student.open_q4} | {student.open_q5} | {student.open_q6} | {student.open_q7} | {student.open_q8} | {student.open_q9} | {student.open_q10}"
+    # Students first, then teachers, each streamed in batches
+    def rows():
+        for student in iter_in_batches(normalized.export_source('student'), app.config['EXPORT_BATCH_SIZE']):
+            closed_responses = f"{student.q1} | {student.q2} | {student.q3} | {student.q4} | {student.q5} | {student.q6} | {student.q7} | {student.q8} | {student.q9} | {student.q10}"
+            open_responses = f"{student.open_q1} | {student.open_q2} | {student.open_q3} | {student.open_q4} | {student.open_q5} | {student.open_q6} | {student.open_q7} | {student.open_q8} | {student.open_q9} | {student.open_q10}"
         
-        row = [
-            'STUDENT', student.id, student.student_name, student.student_class, 
-            student.student_email, student.student_phone,
-            round(student.sentiment_polarity or 0, 4),
-            student.sentiment_label or 'neutral',
-            round(student.sentiment_subjectivity or 0, 4),
-            closed_responses, open_responses,
-            student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
-        ]
-        writer.writerow(row)
-    
-    # Write teacher data
-    teachers = TeacherFeedback.query.all()
-    for teacher in teachers:
-        closed_responses = f"{teacher.q1} | {teacher.q2} | {teacher.q3} | {teacher.q4} | {teacher.q5} | {teacher.q6} | {teacher.q7} | {teacher.q8} | {teacher.q9} | {teacher.q10}"
-        open_responses = f"{teacher.open_q1} | {teacher.open_q2} | {teacher.open_q3} | {teacher.open_q4} | {teacher.open_q5} | {teacher.open_q6} | {teacher.open_q7} | {teacher.open_q8} | {teacher.open_q9} | {teacher.open_q10}"
+            row = [
+                'STUDENT', student.id, student.student_name, student.student_class, 
+                student.student_email, student.student_phone,
+                round(student.sentiment_polarity or 0, 4),
+                student.sentiment_label or 'neutral',
+                round(student.sentiment_subjectivity or 0, 4),
+                closed_responses, open_responses,
+                student.created_at.strftime('%Y-%m-%d %H:%M:%S') if student.created_at else ''
+            ]
+            yield row
         
-        row = [
-            'TEACHER', teacher.id, teacher.teacher_name, teacher.teacher_subject, 
-            teacher.teacher_email, teacher.teacher_phone,
-            round(teacher.sentiment_polarity or 0, 4),
-            teacher.sentiment_label or 'neutral',
-            round(teacher.sentiment_subjectivity or 0, 4),
-            closed_responses, open_responses,
-            teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
-        ]
-        writer.writerow(row)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv'
-    response.headers['Content-Disposition'] = f'attachment; filename=complete_feedback_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-    
-    return response
+        for teacher in iter_in_batches(normalized.export_source('teacher'), app.config['EXPORT_BATCH_SIZE']):
+            closed_responses = f"{teacher.q1} | {teacher.q2} | {teacher.q3} | {teacher.q4} | {teacher.q5} | {teacher.q6} | {teacher.q7} | {teacher.q8} | {teacher.q9} | {teacher.q10}"
+            open_responses = f"{teacher.open_q1} | {teacher.open_q2} | {teacher.open_q3} | {teacher.open_q4} | {teacher.open_q5} | {teacher.open_q6} | {teacher.open_q7} | {teacher.open_q8} | {teacher.open_q9} | {teacher.open_q10}"
+        
+            row = [
+                'TEACHER', teacher.id, teacher.teacher_name, teacher.teacher_subject, 
+                teacher.teacher_email, teacher.teacher_phone,
+                round(teacher.sentiment_polarity or 0, 4),
+                teacher.sentiment_label or 'neutral',
+                round(teacher.sentiment_subjectivity or 0, 4),
+                closed_responses, open_responses,
+                teacher.created_at.strftime('%Y-%m-%d %H:%M:%S') if teacher.created_at else ''
+            ]
+            yield row
+    
+    return csv_download(header, rows(), 'complete_feedback_export')
 
 # Chart Download Routes
 @app.route('/admin/download/chart/sentiment')
@@ -1038,18 +864,20 @@ def admin_download_sentiment_chart():
         return redirect(url_for('admin_login'))
     
     try:
-        charts = generate_charts()
-        if not charts.get('sentiment'):
-            flash('Sentiment chart not available. Please ensure there is feedback data.', 'error')
+        fmt = request.args.get('format', 'png')
+        if fmt not in CHART_FORMATS:
+            flash(f'Unsupported chart format: {fmt}', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        # Decode base64 image
-        image_data = base64.b64decode(charts['sentiment'])
+        image_data = chart_service.image_entry('sentiment', fmt)[0]
+        if not image_data:
+            flash('Sentiment chart not available. Please ensure there is feedback data.', 'error')
+            return redirect(url_for('admin_dashboard'))
         
         # Create response
         response = make_response(image_data)
-        response.headers['Content-Disposition'] = f'attachment; filename=sentiment_analysis_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        response.headers['Content-Type'] = 'image/png'
+        response.headers['Content-Disposition'] = f'attachment; filename=sentiment_analysis_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
+        response.headers['Content-Type'] = CHART_FORMATS[fmt]
         
         return response
         
@@ -1063,18 +891,20 @@ def admin_download_satisfaction_chart():
         return redirect(url_for('admin_login'))
     
     try:
-        charts = generate_charts()
-        if not charts.get('satisfaction'):
-            flash('Student satisfaction chart not available. Please ensure there is student feedback data.', 'error')
+        fmt = request.args.get('format', 'png')
+        if fmt not in CHART_FORMATS:
+            flash(f'Unsupported chart format: {fmt}', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        # Decode base64 image
-        image_data = base64.b64decode(charts['satisfaction'])
+        image_data = chart_service.image_entry('satisfaction', fmt)[0]
+        if not image_data:
+            flash('Student satisfaction chart not available. Please ensure there is student feedback data.', 'error')
+            return redirect(url_for('admin_dashboard'))
         
         # Create response
         response = make_response(image_data)
-        response.headers['Content-Disposition'] = f'attachment; filename=student_satisfaction_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        response.headers['Content-Type'] = 'image/png'
+        response.headers['Content-Disposition'] = f'attachment; filename=student_satisfaction_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
+        response.headers['Content-Type'] = CHART_FORMATS[fmt]
         
         return response
         
@@ -1088,18 +918,20 @@ def admin_download_teacher_effectiveness_chart():
         return redirect(url_for('admin_login'))
     
     try:
-        charts = generate_charts()
-        if not charts.get('teacher_effectiveness'):
-            flash('Teacher effectiveness chart not available. Please ensure there is teacher feedback data.', 'error')
+        fmt = request.args.get('format', 'png')
+        if fmt not in CHART_FORMATS:
+            flash(f'Unsupported chart format: {fmt}', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        # Decode base64 image
-        image_data = base64.b64decode(charts['teacher_effectiveness'])
+        image_data = chart_service.image_entry('teacher_effectiveness', fmt)[0]
+        if not image_data:
+            flash('Teacher effectiveness chart not available. Please ensure there is teacher feedback data.', 'error')
+            return redirect(url_for('admin_dashboard'))
         
         # Create response
         response = make_response(image_data)
-        response.headers['Content-Disposition'] = f'attachment; filename=teacher_effectiveness_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-        response.headers['Content-Type'] = 'image/png'
+        response.headers['Content-Disposition'] = f'attachment; filename=teacher_effectiveness_chart_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
+        response.headers['Content-Type'] = CHART_FORMATS[fmt]
         
         return response
         
@@ -1107,10 +939,61 @@ def admin_download_teacher_effectiveness_chart():
         flash(f'Error downloading teacher effectiveness chart: {str(e)}', 'error')
         return redirect(url_for('admin_dashboard'))
 
+@app.cli.command('rebuild-aggregates')
+def rebuild_aggregates_command():
+    """Recompute the dashboard answer counts, breakdown rollups and sentiment trends from the feedback tables."""
+    aggregates.rebuild()
+    rollups.rebuild()
+    trends.rebuild()
+    print(f"Rebuilt aggregates: {aggregates.response_count('student')} student and "
+          f"{aggregates.response_count('teacher')} teacher responses")
+
+@app.cli.command('score-answers')
+def score_answers_command():
+    """Store per-question sentiment for responses that don't have it yet."""
+    for respondent_type in FEEDBACK_MODELS:
+        scored = question_sentiment.backfill(respondent_type)
+        print(f"Scored the answers of {scored} {respondent_type} responses")
+
+@app.cli.command('rescore')
+@click.option('--type', 'respondent_type', type=click.Choice(list(FEEDBACK_MODELS)), help='Only re-score one table.')
+@click.option('--batch-size', default=rescore.DEFAULT_BATCH_SIZE, show_default=True, help='Rows per transaction.')
+@click.option('--workers', type=int, default=None, help='Scoring processes (default: one per core).')
+@click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of an interrupted run and start over.')
+def rescore_command(respondent_type, batch_size, workers, pause, restart):
+    """Recompute stored sentiment with the current scorer and thresholds."""
+    for kind in [respondent_type] if respondent_type else list(FEEDBACK_MODELS):
+        started = time.perf_counter()
+        first = rescore.start_checkpoint(kind, restart).rows_processed
+        
+        def progress(checkpoint):
+            rate = (checkpoint.rows_processed - first) / max(time.perf_counter() - started, 1e-9)
+            print(f"{kind}: {checkpoint.rows_processed} rows, {checkpoint.rows_changed} changed "
+                  f"(up to id {checkpoint.last_id}, {rate:.0f} rows/s)")
+        
+        checkpoint = rescore.rescore(kind, batch_size, workers, pause=pause, progress=progress)
+        elapsed = time.perf_counter() - started
+        print(f"{kind}: done, {checkpoint.rows_processed} rows re-scored, {checkpoint.rows_changed} changed "
+              f"in {elapsed:.1f}s ({(checkpoint.rows_processed - first) / max(elapsed, 1e-9):.0f} rows/s)")
+
+@app.cli.command('normalize-responses')
+@click.option('--reset', is_flag=True, help='Drop the normalized answers and views and copy everything again.')
+def normalize_responses_command(reset):
+    """Copy feedback answers into the normalized tables and create the wide views."""
+    if reset:
+        normalized.drop_views()
+        normalized.reset()
+    normalized.ensure_catalog()
+    normalized.ensure_views()
+    for respondent_type in ('student', 'teacher'):
+        copied = normalized.backfill(respondent_type)
+        print(f"Copied {copied} {respondent_type} responses "
+              f"(normalized up to id {normalized.migrated_up_to(respondent_type)})")
+    if not app.config['NORMALIZED_RESPONSES']:
+        print("Set NORMALIZED_RESPONSES=1 to keep the tables in sync and use them for exports.")
+
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-    
     # Get port from environment variable for deployment or use 8080 for local
     import os
     port = int(os.environ.get('PORT', 8080))
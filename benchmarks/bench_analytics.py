@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark for analytics.py against loop-based counting over ORM rows.
+
+Fills a scratch SQLite database with synthetic student feedback, then
+computes the same statistics twice: the way the dashboard used to (load
+every row as an ORM object and count in Python loops) and with the typed
+DataFrame from analytics.load_frame(). Checks that both agree.
+
+    python benchmarks/bench_analytics.py --rows 100000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import analytics  # noqa: E402
+from models import db, StudentFeedback, CLOSED_FIELDS  # noqa: E402
+
+ANSWERS = ('Very Satisfied', 'Satisfied', 'Neutral', 'Dissatisfied', 'Very Dissatisfied')
+CLASSES = tuple(f'Class {n}' for n in range(6, 13))
+
+
+def fill(rows, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        polarity = round(rng.uniform(-1, 1), 4)
+        record = {
+            'student_name': f'Student {i}',
+            'student_class': rng.choice(CLASSES),
+            'student_email': f'student{i}@example.com',
+            'student_phone': '9800000000',
+            'sentiment_polarity': polarity,
+            'sentiment_subjectivity': round(rng.random(), 4),
+            'sentiment_label': 'positive' if polarity > 0.1 else 'negative' if polarity < -0.1 else 'neutral',
+            'created_at': start + timedelta(minutes=i),
+        }
+        for q in CLOSED_FIELDS:
+            record[q] = rng.choice(ANSWERS)
+            record[f'open_{q}'] = 'Some comment'
+        batch.append(record)
+        if len(batch) == 5000:
+            db.session.execute(insert(StudentFeedback), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(StudentFeedback), batch)
+    db.session.commit()
+
+
+def loop_summary():
+    """Per-row Python counting, as the dashboard and reports used to do."""
+    scores = {answer: score for score, answer in enumerate(analytics.Q1_SCALES['student'], start=1)}
+    answers = {q: Counter() for q in CLOSED_FIELDS}
+    labels = Counter()
+    groups = defaultdict(lambda: [0, 0.0, 0.0])
+    q1_by_group = defaultdict(Counter)
+    xs, ys = [], []
+
+    for row in StudentFeedback.query.all():
+        for q in CLOSED_FIELDS:
+            answers[q][getattr(row, q)] += 1
+        labels[row.sentiment_label] += 1
+        group = groups[row.student_class]
+        group[0] += 1
+        group[1] += row.sentiment_polarity
+        group[2] += scores.get(row.q1, 0)
+        q1_by_group[row.student_class][row.q1] += 1
+        if row.q1 in scores:
+            xs.append(scores[row.q1])
+            ys.append(row.sentiment_polarity)
+
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    return {
+        'answers': answers,
+        'labels': labels,
+        'by_group': {g: (c, p / c, s / c) for g, (c, p, s) in groups.items()},
+        'q1_by_group': q1_by_group,
+        'pearson': cov / math.sqrt(var_x * var_y),
+    }
+
+
+def timed(label, func, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best:8.3f}s")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'analytics.sqlite3')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        fill(args.rows)
+        print(f"inserted {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        loops, loop_time = timed('python loops over ORM rows', loop_summary, args.repeat)
+        frame, load_time = timed('analytics.load_frame', lambda: analytics.load_frame('student'), args.repeat)
+        vectorized, compute_time = timed('analytics.summarize', lambda: analytics.summarize(frame), args.repeat)
+        print(f"{'vectorized total':<28} {load_time + compute_time:8.3f}s  "
+              f"({loop_time / (load_time + compute_time):.1f}x faster)")
+        print(f"frame memory: {frame.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+        mismatches = []
+        if vectorized['answers']['q1'] != dict(loops['answers']['q1']):
+            mismatches.append('q1 counts')
+        if vectorized['sentiment']['labels'] != {label: loops['labels'][label] for label in analytics.SENTIMENT_LABELS}:
+            mismatches.append('sentiment labels')
+        if vectorized['crosstabs']['q1_by_group'] != {g: dict(c) for g, c in loops['q1_by_group'].items()}:
+            mismatches.append('q1 by group')
+        for group, (count, polarity, score) in loops['by_group'].items():
+            means = vectorized['by_group'][group]
+            if means['responses'] != count or abs(means['mean_polarity'] - polarity) > 1e-3 \
+                    or abs(means['mean_q1_score'] - score) > 1e-3:
+                mismatches.append(f'means for {group}')
+        if abs(vectorized['q1_sentiment_correlation']['pearson'] - loops['pearson']) > 1e-3:
+            mismatches.append('correlation')
+
+    if mismatches:
+        print(f"MISMATCH: {', '.join(mismatches)}")
+        sys.exit(1)
+    print("results match")
+
+
+if __name__ == '__main__':
+    main()
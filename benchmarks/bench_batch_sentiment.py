@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare the old per-row TextBlob loop used by the CSV upload routes with the
+batched, process-parallel scorer in sentiment.py.
+
+Responses are built from the answers in the bundled realistic_*_data.csv
+files, each tagged with its response number so that every answer text is
+distinct: repeats would be scored once and the benchmark would measure the
+answer cache instead of the scorer. The serial and pooled runs score with
+the cache off; the answer cache's gain is reported as a separate row, from
+scoring the same responses again with a warm cache.
+
+    python benchmarks/bench_batch_sentiment.py
+    python benchmarks/bench_batch_sentiment.py --rows 1000 --workers 2
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from textblob import TextBlob  # noqa: E402
+
+import sentiment  # noqa: E402
+from models import OPEN_FIELDS  # noqa: E402
+from sentiment import score_batch, default_workers, label_for, MIN_PARALLEL_ROWS  # noqa: E402
+
+
+def load_answers(filename, rows):
+    """rows responses cycling through the file's, every answer made unique."""
+    with open(os.path.join(ROOT, filename), newline='', encoding='utf-8-sig') as f:
+        source = [[row.get(field) or '' for field in OPEN_FIELDS] for row in csv.DictReader(f)]
+    # An unknown word carries no sentiment, so the tag leaves the scores alone
+    return [[f'{answer} r{n}' if answer.strip() else answer for answer in source[n % len(source)]]
+            for n in range(rows)]
+
+
+def per_row_loop(answer_lists):
+    # The loop the upload routes used to run, one TextBlob per row
+    results = []
+    for answers in answer_lists:
+        text = ' '.join(answers).strip()
+        if text:
+            blob = TextBlob(text)
+            results.append((blob.sentiment.polarity, blob.sentiment.subjectivity, label_for(blob.sentiment.polarity)))
+        else:
+            results.append((0.0, 0.0, 'neutral'))
+    return results
+
+
+def timed_batch(texts, workers):
+    start = time.perf_counter()
+    result = score_batch(texts, max_workers=workers)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=3000, help='Responses per CSV file')
+    parser.add_argument('--workers', type=int, default=default_workers(), help='Process pool size')
+    args = parser.parse_args()
+
+    # Start the pool (on answers no run scores) so process start-up isn't billed to the first run
+    warm_up = [[f'warm up answer {n}'] for n in range(MIN_PARALLEL_ROWS)]
+    sentiment.configure_cache(max_entries=0)
+    score_batch(warm_up, max_workers=args.workers)
+
+    for filename in ('realistic_students_data.csv', 'realistic_teachers_data.csv'):
+        texts = load_answers(filename, args.rows)
+        distinct = len({answer for answers in texts for answer in answers if answer.strip()})
+
+        start = time.perf_counter()
+        baseline = per_row_loop(texts)
+        loop_time = time.perf_counter() - start
+
+        sentiment.configure_cache(max_entries=0)
+        serial, serial_time = timed_batch(texts, 1)
+        pooled, pooled_time = timed_batch(texts, args.workers)
+
+        # Fill a cache large enough for every answer, then score the same responses again
+        sentiment.configure_cache(max_entries=distinct)
+        score_batch(texts, max_workers=args.workers)
+        cached, cached_time = timed_batch(texts, args.workers)
+
+        # Answers are scored separately, so polarity can differ slightly where a
+        # modifier at the end of one answer used to carry over into the next
+        same_order = all(a[2] == b[2] for a, b in zip(baseline, pooled))
+        print(f"{filename}: {len(texts)} rows, {distinct} distinct answers "
+              f"(the pool is used from {MIN_PARALLEL_ROWS})")
+        print(f"  per-row loop      : {loop_time:8.2f}s  ({len(texts) / loop_time:8.0f} rows/s)")
+        print(f"  batch x1          : {serial_time:8.2f}s  ({len(texts) / serial_time:8.0f} rows/s)")
+        print(f"  batch x{args.workers:<10} : {pooled_time:8.2f}s  ({len(texts) / pooled_time:8.0f} rows/s)  "
+              f"{serial_time / pooled_time:.2f}x batch x1")
+        print(f"  warm answer cache : {cached_time:8.2f}s  ({len(texts) / cached_time:8.0f} rows/s)  "
+              f"{pooled_time / cached_time:.2f}x batch x{args.workers}")
+        print(f"  speed-up          : {loop_time / pooled_time:8.2f}x   labels match row order: {same_order}, "
+              f"pooled = serial: {pooled == serial}, cached = serial: {cached == serial}")
+
+
+if __name__ == '__main__':
+    main()
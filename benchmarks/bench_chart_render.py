@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Render the dashboard charts from many threads at once through
+chart_renderer.ChartRenderer and check every image against a sequential
+render of the same spec, so concurrent renders can't corrupt each other.
+Reports charts/s in the calling threads (--workers 0) and through the
+process pool.
+
+    python benchmarks/bench_chart_render.py
+    python benchmarks/bench_chart_render.py --threads 8 --renders 200 --workers 2
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chart_renderer import ChartRenderer, render  # noqa: E402
+from charts import CHART_SPECS, chart_spec, ordered_counts  # noqa: E402
+
+
+def sample_specs():
+    specs = []
+    for name, spec in CHART_SPECS.items():
+        labels = list(spec['colors'])
+        # A few different data sets per chart, so mixed-up figures show
+        for shift in range(3):
+            data = {label: 10 + (i + shift) * 7 for i, label in enumerate(labels)}
+            specs.append(chart_spec(name, ordered_counts(data, labels)))
+    return specs
+
+
+def run(renderer, specs, expected, threads, renders, fmt):
+    jobs = [i % len(specs) for i in range(renders)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        images = list(pool.map(lambda i: renderer.render(specs[i], fmt), jobs))
+    elapsed = time.perf_counter() - started
+    mismatches = sum(image != expected[i] for i, image in zip(jobs, images))
+    return renders / elapsed, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='Request threads rendering at once')
+    parser.add_argument('--renders', type=int, default=90)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Renderer processes')
+    args = parser.parse_args()
+
+    specs = sample_specs()
+    expected = [render(spec, 'png') for spec in specs]
+
+    failed = False
+    for workers in (0, args.workers):
+        renderer = ChartRenderer(max_workers=workers)
+        # Start the pool (and import matplotlib in it) before timing
+        renderer.render(specs[0])
+        rate, mismatches = run(renderer, specs, expected, args.threads, args.renders, 'png')
+        print(f"workers={workers:<3} threads={args.threads}: {rate:7.1f} charts/s, "
+              f"{mismatches} of {args.renders} images differ from a sequential render")
+        failed = failed or mismatches > 0
+
+    svg = ChartRenderer(max_workers=0).render(specs[0], 'svg')
+    print(f"svg: {len(svg)} bytes, starts with {svg[:5]!r}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
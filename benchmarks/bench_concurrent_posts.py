@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for feedback submissions on SQLite.
+
+Starts N worker processes (like N gunicorn workers), each with its own app
+instance pointed at the same scratch database, and has them POST student
+feedback forms as fast as they can. Runs once with SQLite's default
+connection settings and once with the PRAGMAs from db_config.py, and
+reports throughput and how many submissions failed with lock errors.
+
+    python benchmarks/bench_concurrent_posts.py --processes 8 --posts 200
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every tuned PRAGMA switched off, i.e. what the app did before db_config.py
+DEFAULT_SETTINGS = {
+    'SQLITE_BUSY_TIMEOUT_MS': '',
+    'SQLITE_JOURNAL_MODE': '',
+    'SQLITE_SYNCHRONOUS': '',
+    'SQLITE_MMAP_SIZE': '',
+    'SQLITE_CACHE_SIZE': '',
+}
+
+
+def student_form(worker, number):
+    form = {
+        'student_name': f'Student {worker}-{number}',
+        'student_class': f'Class {8 + number % 3}',
+        'student_email': f'student{worker}.{number}@example.com',
+        'student_phone': '9800000000',
+    }
+    for i in range(1, 11):
+        form[f'q{i}'] = 'Satisfied'
+        form[f'open_q{i}'] = 'Classes are useful but the internet is slow'
+    return form
+
+
+def setup_database():
+    # Importing the app creates the tables once, before the workers race for them
+    sys.path.insert(0, ROOT)
+    import app  # noqa: F401
+
+
+def post_forms(worker, posts, start_barrier, results):
+    sys.path.insert(0, ROOT)
+    from app import app
+
+    client = app.test_client()
+    start_barrier.wait()
+
+    ok = failed = 0
+    started = time.perf_counter()
+    for number in range(posts):
+        response = client.post('/student_feedback', data=student_form(worker, number))
+        # A successful submission redirects to the thank-you page
+        if response.status_code == 302:
+            ok += 1
+        else:
+            failed += 1
+    results.put((ok, failed, time.perf_counter() - started))
+
+
+def run(label, settings, processes, posts, sentiment_mode):
+    context = multiprocessing.get_context('spawn')
+    workdir = tempfile.mkdtemp(prefix='bench-posts-')
+
+    os.environ.update(settings)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ['SENTIMENT_MODE'] = sentiment_mode
+
+    setup = context.Process(target=setup_database)
+    setup.start()
+    setup.join()
+
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=post_forms, args=(i, posts, barrier, results)) for i in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    outcomes = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    ok = sum(o[0] for o in outcomes)
+    failed = sum(o[1] for o in outcomes)
+    print(f"{label:<16} {ok:>7} ok  {failed:>6} lock errors  {elapsed:7.2f}s  {ok / elapsed:8.1f} submissions/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=8, help='Concurrent app processes')
+    parser.add_argument('--posts', type=int, default=100, help='Submissions per process')
+    parser.add_argument('--sentiment-mode', default='async', choices=['async', 'sync'])
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.posts} submissions, sentiment {args.sentiment_mode}")
+    run('sqlite defaults', DEFAULT_SETTINGS, args.processes, args.posts, args.sentiment_mode)
+    for variable in DEFAULT_SETTINGS:
+        os.environ.pop(variable, None)
+    run('tuned pragmas', {}, args.processes, args.posts, args.sentiment_mode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Load test for group commit of feedback submissions.
+
+Starts N app processes, each serving submissions from T threads (like
+gunicorn --workers N --threads T), all writing to one scratch database.
+Runs once with a commit per submission and once with GROUP_COMMIT
+enabled, and reports throughput, latency and the average batch size.
+
+    python benchmarks/bench_group_commit.py --processes 2 --threads 16 --posts 50
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from bench_concurrent_posts import student_form, setup_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def post_forms(worker, threads, posts, start_barrier, results):
+    sys.path.insert(0, ROOT)
+    from app import app, submission_buffer
+
+    latencies = []
+    failures = []
+
+    def poster(thread):
+        client = app.test_client()
+        for number in range(posts):
+            started = time.perf_counter()
+            response = client.post('/student_feedback', data=student_form(f'{worker}.{thread}', number))
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                failures.append(number)
+
+    posters = [threading.Thread(target=poster, args=(i,)) for i in range(threads)]
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in posters:
+        thread.start()
+    for thread in posters:
+        thread.join()
+    submission_buffer.flush()
+    results.put((len(latencies) - len(failures), len(failures), latencies,
+                 time.perf_counter() - started, submission_buffer.metrics()))
+
+
+def run(label, settings, args):
+    context = multiprocessing.get_context('spawn')
+    workdir = tempfile.mkdtemp(prefix='bench-group-commit-')
+
+    os.environ.update(settings)
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    os.environ['SENTIMENT_MODE'] = args.sentiment_mode
+    if args.synchronous:
+        os.environ['SQLITE_SYNCHRONOUS'] = args.synchronous
+
+    setup = context.Process(target=setup_database)
+    setup.start()
+    setup.join()
+
+    barrier = context.Barrier(args.processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=post_forms, args=(i, args.threads, args.posts, barrier, results))
+               for i in range(args.processes)]
+    for worker in workers:
+        worker.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    outcomes = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    ok = sum(o[0] for o in outcomes)
+    failed = sum(o[1] for o in outcomes)
+    latencies = sorted(latency for o in outcomes for latency in o[2])
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    batch_sizes = [o[4]['avg_batch_size'] for o in outcomes if o[4]['avg_batch_size']]
+    batch = f"{statistics.mean(batch_sizes):6.1f}" if batch_sizes else '     -'
+    print(f"{label:<22} {ok:>6} ok {failed:>5} failed  {ok / elapsed:8.1f} submissions/s  "
+          f"p50 {p50:6.1f}ms  p95 {p95:6.1f}ms  avg batch {batch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=2, help='App processes')
+    parser.add_argument('--threads', type=int, default=16, help='Request threads per process')
+    parser.add_argument('--posts', type=int, default=50, help='Submissions per thread')
+    parser.add_argument('--interval-ms', default='10', help='GROUP_COMMIT_INTERVAL_MS')
+    parser.add_argument('--max-rows', default='100', help='GROUP_COMMIT_MAX_ROWS')
+    parser.add_argument('--sentiment-mode', default='async', choices=['async', 'sync'])
+    parser.add_argument('--synchronous', default='FULL',
+                        help='SQLITE_SYNCHRONOUS for both runs (FULL makes every commit fsync)')
+    args = parser.parse_args()
+
+    print(f"{args.processes} processes x {args.threads} threads x {args.posts} submissions, "
+          f"sentiment {args.sentiment_mode}, synchronous={args.synchronous}")
+    run('commit per submission', {'GROUP_COMMIT': '0'}, args)
+    group = {
+        'GROUP_COMMIT': '1',
+        'GROUP_COMMIT_INTERVAL_MS': args.interval_ms,
+        'GROUP_COMMIT_MAX_ROWS': args.max_rows,
+    }
+    run('group commit', dict(group, GROUP_COMMIT_DURABILITY='commit'), args)
+    run('group commit, buffered', dict(group, GROUP_COMMIT_DURABILITY='buffered'), args)
+
+
+if __name__ == '__main__':
+    main()
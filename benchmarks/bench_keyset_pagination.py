@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Page latency of the /admin/api/students listing (browse.py) at increasing
+depth, keyset cursor against OFFSET paging with the same columns.
+
+Fills a scratch SQLite database with synthetic student feedback (see
+bench_rescore.py), walks every page with the cursor to check that each
+row comes back exactly once, and times single pages at several depths,
+with and without a sentiment label filter. Both time the query alone.
+
+    python benchmarks/bench_keyset_pagination.py --rows 200000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import select, func, text  # noqa: E402
+
+import browse  # noqa: E402
+from bench_rescore import fill  # noqa: E402
+from models import db, StudentFeedback  # noqa: E402
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def cursor_at(depth, limit, filters):
+    """Cursor of the page `depth` pages in (walked once, not timed)."""
+    cursor = None
+    for _ in range(depth):
+        cursor = browse.page('student', filters=filters, cursor=cursor, limit=limit)['next_cursor']
+    return cursor
+
+
+def keyset_page(cursor, limit, filters):
+    after = browse.decode_cursor(cursor) if cursor else None
+    query = browse.page_query('student', browse.default_fields('student'), filters, after, limit)
+    return db.session.execute(query).all()
+
+
+def offset_page(depth, limit, filters):
+    query = browse.page_query('student', browse.default_fields('student'), filters, limit=limit)
+    return db.session.execute(query.offset(depth * limit)).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=browse.DEFAULT_PAGE_SIZE)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'browse.sqlite3')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        fill(args.rows)
+        # Every 7th row shares its timestamp with the one before, so ties on created_at get paged too
+        db.session.execute(text('UPDATE student_feedback SET created_at = '
+                                '(SELECT f.created_at FROM student_feedback f WHERE f.id = student_feedback.id - 1) '
+                                'WHERE id % 7 = 0'))
+        db.session.execute(text("UPDATE student_feedback SET sentiment_label = "
+                                "CASE id % 3 WHEN 0 THEN 'positive' WHEN 1 THEN 'neutral' ELSE 'negative' END"))
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+
+        seen = []
+        cursor = None
+        while True:
+            result = browse.page('student', fields=['id'], cursor=cursor, limit=500)
+            seen.extend(item['id'] for item in result['items'])
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+        total = db.session.scalar(select(func.count()).select_from(StudentFeedback))
+        if sorted(seen) != list(range(1, total + 1)):
+            print("MISMATCH: the cursor walk skipped or repeated rows")
+            sys.exit(1)
+        print(f"cursor walk returned all {total} rows exactly once")
+
+        pages = args.rows // args.limit
+        depths = sorted({0, 10, 100, pages // 10, pages // 2, pages - 1} - {-1})
+        for label, filters in (('no filter', None), ('sentiment_label=positive', {'sentiment_label': ['positive']})):
+            matching = pages if filters is None else pages // 3
+            print(f"\n{label}, {args.limit} rows per page:")
+            print(f"  {'page':>7} {'keyset ms':>10} {'offset ms':>10}")
+            for depth in depths:
+                if depth >= matching:
+                    continue
+                cursor = cursor_at(depth, args.limit, filters)
+                keyset_ms, _ = timed(lambda: keyset_page(cursor, args.limit, filters))
+                offset_ms, _ = timed(lambda: offset_page(depth, args.limit, filters))
+                print(f"  {depth + 1:7} {keyset_ms:10.2f} {offset_ms:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
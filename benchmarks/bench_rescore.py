@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark for `flask rescore` (rescore.py).
+
+Fills a scratch SQLite database with synthetic student feedback whose open
+answers are drawn from the bundled CSV files, builds the aggregate tables,
+then re-scores everything with tighter thresholds and reports rows/s.
+Checks that the maintained counts match a rebuild afterwards.
+
+    python benchmarks/bench_rescore.py --rows 50000
+"""
+import argparse
+import csv
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import aggregates  # noqa: E402
+import rescore  # noqa: E402
+import rollups  # noqa: E402
+import sentiment  # noqa: E402
+import trends  # noqa: E402
+from models import db, StudentFeedback, FeedbackAggregate, OPEN_FIELDS  # noqa: E402
+
+
+def answer_pool():
+    answers = set()
+    for path in glob.glob(os.path.join(ROOT, '*.csv')):
+        with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+            for row in csv.DictReader(f):
+                answers.update(row[field] for field in OPEN_FIELDS if row.get(field))
+    return sorted(answers)
+
+
+def fill(rows, seed=7):
+    rng = random.Random(seed)
+    answers = answer_pool()
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        record = {
+            'student_name': f'Student {i}',
+            'student_class': f'Class {rng.randint(6, 12)}',
+            'student_email': f'student{i}@example.com',
+            'student_phone': '9800000000',
+            'sentiment_polarity': 0.0,
+            'sentiment_subjectivity': 0.0,
+            'sentiment_label': 'neutral',
+            'created_at': start + timedelta(minutes=i),
+        }
+        for q in range(1, 11):
+            record[f'q{q}'] = 'Satisfied'
+        for field in OPEN_FIELDS:
+            record[field] = rng.choice(answers)
+        batch.append(record)
+        if len(batch) == 5000:
+            db.session.execute(insert(StudentFeedback), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(StudentFeedback), batch)
+    db.session.commit()
+
+
+def counts():
+    return {(row.question, row.answer): row.count for row in FeedbackAggregate.query if row.count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=rescore.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'rescore.sqlite3')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        fill(args.rows)
+        aggregates.rebuild()
+        rollups.rebuild()
+        trends.rebuild()
+
+        sentiment.configure_thresholds(0.2, -0.2)
+        started = time.perf_counter()
+        checkpoint = rescore.rescore('student', args.batch_size, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"re-scored {checkpoint.rows_processed} rows ({checkpoint.rows_changed} changed) in {elapsed:.1f}s, "
+              f"{checkpoint.rows_processed / elapsed:.0f} rows/s")
+        print(f"answer cache: {sentiment.cache.stats()}")
+
+        maintained = counts()
+        aggregates.rebuild()
+        if maintained != counts():
+            print("MISMATCH between maintained and rebuilt aggregates")
+            sys.exit(1)
+    print("aggregates match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the app and of gunicorn workers (Linux only, reads /proc).
+
+1. Imports app.py in fresh interpreters and reports the import time, peak
+   RSS and which heavy libraries got loaded.
+2. Boots gunicorn with gunicorn.conf.py, with and without PRELOAD_APP,
+   and reports the time until the form page answers plus the RSS and PSS
+   (RSS with shared pages split between the processes sharing them) of
+   every worker.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --workers 4 --runs 5
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'textblob', 'nltk')
+
+IMPORT_PROBE = f'''
+import resource, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, ','.join(loaded) or '-')
+'''
+
+
+def scratch_env(directory, **extra):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'startup.sqlite3')}", **extra)
+    env['PYTHONPATH'] = ROOT
+    return env
+
+
+def measure_import(runs, env):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout.split()
+        results.append((float(output[0]), float(output[1]), output[2]))
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def boot_gunicorn(workers, env, timeout=60):
+    port = free_port()
+    started = time.perf_counter()
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(workers),
+         '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if time.perf_counter() - started > timeout or master.poll() is not None:
+                raise RuntimeError('gunicorn did not come up')
+            try:
+                if len(children(master.pid)) == workers:
+                    urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=5).read()
+                    break
+            except OSError:
+                pass
+            time.sleep(0.05)
+        ready = time.perf_counter() - started
+        # Let every worker finish booting before reading its memory
+        time.sleep(1)
+        return ready, [memory_kb(pid) for pid in children(master.pid)], memory_kb(master.pid)
+    finally:
+        master.terminate()
+        master.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters importing app.py')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = scratch_env(directory)
+        print('import app:')
+        for elapsed, rss, loaded in measure_import(args.runs, env):
+            print(f'  {elapsed:6.2f}s  peak RSS {rss:6.1f} MB  heavy modules: {loaded}')
+
+        for preload in ('0', '1'):
+            ready, workers, master = boot_gunicorn(args.workers, scratch_env(directory, PRELOAD_APP=preload))
+            print(f'\ngunicorn -w {args.workers}, PRELOAD_APP={preload}: serving after {ready:.2f}s, '
+                  f'master RSS {master[0] / 1024:.1f} MB')
+            for number, (rss, pss) in enumerate(workers, 1):
+                print(f'  worker {number}: RSS {rss / 1024:6.1f} MB  PSS {pss / 1024:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Multi-node check against a shared database.
+
+Starts several app processes ("nodes"), each with its own connection pool,
+all pointed at one database. They submit student and teacher feedback
+concurrently while one node also imports a CSV upload. Afterwards it checks
+that every write landed exactly once, that the sentiment queue drained,
+that the materialized aggregates match a full recount, and that every node
+sees the same totals.
+
+The database is, in order of preference:
+  --database-url / DATABASE_URL    an existing database (it must be empty)
+  a throwaway local PostgreSQL      when initdb and pg_ctl are on PATH
+  a temporary SQLite file           otherwise
+
+    python benchmarks/check_database_backend.py --nodes 4 --posts 50
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_ROWS = 250
+
+
+def feedback_form(kind, node, number):
+    form = {
+        f'{kind}_name': f'{kind.title()} {node}-{number}',
+        f'{kind}_email': f'{kind}{node}.{number}@example.com',
+        f'{kind}_phone': '9800000000',
+    }
+    form['student_class' if kind == 'student' else 'teacher_subject'] = f'Group {number % 4}'
+    for i in range(1, 11):
+        form[f'q{i}'] = ('Very Satisfied', 'Satisfied', 'Neutral')[(node + number + i) % 3]
+        form[f'open_q{i}'] = ('Great classes', 'The internet is terrible', 'It was fine')[(node + i) % 3]
+    return form
+
+
+def import_csv_bytes(rows):
+    header = ['student_name', 'student_class', 'student_email', 'student_phone']
+    header += [f'q{i}' for i in range(1, 11)] + [f'open_q{i}' for i in range(1, 11)]
+    lines = [','.join(header)]
+    for number in range(rows):
+        values = [f'Imported {number}', 'Class 9', f'imported{number}@example.com', '9800000000']
+        values += ['Very Interactive' if i == 4 else 'Satisfied' for i in range(1, 11)]
+        values += ['Helpful teachers'] * 10
+        lines.append(','.join(values))
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def find_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_throwaway_postgres(workdir):
+    """Start a private PostgreSQL cluster listening on a socket in workdir."""
+    data_dir = os.path.join(workdir, 'pgdata')
+    port = find_free_port()
+    subprocess.run(['initdb', '-D', data_dir, '-A', 'trust', '-U', 'postgres'],
+                   check=True, stdout=subprocess.DEVNULL)
+    subprocess.run(['pg_ctl', '-D', data_dir, '-w', '-l', os.path.join(workdir, 'postgres.log'),
+                    '-o', f"-k {workdir} -p {port} -c listen_addresses=''", 'start'],
+                   check=True, stdout=subprocess.DEVNULL)
+    return data_dir, f'postgresql://postgres@/postgres?host={workdir}&port={port}'
+
+
+def stop_throwaway_postgres(data_dir):
+    subprocess.run(['pg_ctl', '-D', data_dir, '-m', 'fast', 'stop'], stdout=subprocess.DEVNULL)
+
+
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    return client
+
+
+def run_node(node, posts, start_barrier, results):
+    sys.path.insert(0, ROOT)
+    from app import app
+
+    client = app.test_client()
+    start_barrier.wait()
+
+    failed = 0
+    if node == 0:
+        response = admin_client(app).post(
+            '/admin/upload/students',
+            data={'csv_file': (io.BytesIO(import_csv_bytes(IMPORT_ROWS)), 'students.csv')},
+            content_type='multipart/form-data',
+            headers={'Accept': 'application/json'},
+        )
+        failed += response.status_code != 202
+
+    for number in range(posts):
+        for kind in ('student', 'teacher'):
+            response = client.post(f'/{kind}_feedback', data=feedback_form(kind, node, number))
+            failed += response.status_code != 302
+    results.put(failed)
+
+    # Keep this node's workers running until everyone has finished
+    start_barrier.wait()
+
+
+def collect_state(expected_rows, timeout):
+    """Wait for queued work to finish, then return what this node sees."""
+    sys.path.insert(0, ROOT)
+    from collections import Counter
+    from sqlalchemy import select, func
+    from app import app, sentiment_pool, import_jobs
+    import aggregates
+    from models import db, FEEDBACK_MODELS, SentimentTask, ImportJob
+
+    with app.app_context():
+        sentiment_pool.ensure_started()
+        import_jobs.ensure_started()
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            db.session.rollback()  # start a fresh snapshot each time
+            rows = sum(db.session.execute(select(func.count()).select_from(model)).scalar()
+                       for model in FEEDBACK_MODELS.values())
+            tasks = db.session.execute(select(func.count()).select_from(SentimentTask)).scalar()
+            running_jobs = db.session.execute(
+                select(func.count()).select_from(ImportJob).where(ImportJob.status.in_(['queued', 'running']))
+            ).scalar()
+            if rows >= expected_rows and not tasks and not running_jobs:
+                break
+            sentiment_pool.wake()
+            time.sleep(0.5)
+
+        state = {'rows': rows, 'tasks': tasks, 'running_jobs': running_jobs}
+        for kind, model in FEEDBACK_MODELS.items():
+            state[f'{kind}_count'] = aggregates.response_count(kind)
+            state[f'{kind}_duplicate_emails'] = db.session.execute(
+                select(func.count()).select_from(
+                    select(model.__table__.c[f'{kind}_email'])
+                    .group_by(model.__table__.c[f'{kind}_email'])
+                    .having(func.count() > 1)
+                    .subquery()
+                )
+            ).scalar()
+            state[f'{kind}_pending'] = db.session.execute(
+                select(func.count()).select_from(model).where(model.sentiment_label == 'pending')
+            ).scalar()
+
+        # Materialized counts against a recount straight from the feedback tables
+        live = {(kind, question, answer): count
+                for kind, model in FEEDBACK_MODELS.items()
+                for question in aggregates.AGGREGATED_FIELDS
+                for answer, count in aggregates.answer_counts(kind, question).items()}
+        recount = Counter()
+        for kind, model in FEEDBACK_MODELS.items():
+            for question in aggregates.AGGREGATED_FIELDS:
+                column = getattr(model, question)
+                for answer, count in db.session.execute(
+                    select(column, func.count()).where(column != '').group_by(column)
+                ):
+                    recount[(kind, question, answer)] = count
+        state['aggregate_mismatches'] = sorted(
+            str(key) for key in set(live) | set(recount) if live.get(key, 0) != recount.get(key, 0)
+        )
+    return state
+
+
+def collect_on_node(expected_rows, timeout, results):
+    results.put(collect_state(expected_rows, timeout))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=4, help='App processes sharing the database')
+    parser.add_argument('--posts', type=int, default=25, help='Student and teacher submissions per node')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'),
+                        help='Existing, empty database to test against')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for background work')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='check-backend-')
+    postgres_dir = None
+    database_url = args.database_url
+    if not database_url and shutil.which('initdb') and shutil.which('pg_ctl'):
+        postgres_dir, database_url = start_throwaway_postgres(workdir)
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(workdir, 'check.sqlite3')}"
+
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['IMPORT_SPOOL_DIR'] = os.path.join(workdir, 'spool')
+    context = multiprocessing.get_context('spawn')
+
+    try:
+        print(f"{args.nodes} nodes x {args.posts} submissions per form against {database_url}")
+        barrier = context.Barrier(args.nodes + 1)
+        results = context.Queue()
+        nodes = [context.Process(target=run_node, args=(i, args.posts, barrier, results))
+                 for i in range(args.nodes)]
+        for node in nodes:
+            node.start()
+
+        # Times out (BrokenBarrierError) if a node dies while starting up
+        barrier.wait(timeout=args.timeout)
+        started = time.perf_counter()
+        failed = sum(results.get() for _ in nodes)
+        elapsed = time.perf_counter() - started
+        expected_rows = args.nodes * args.posts * 2 + IMPORT_ROWS
+
+        # Every node reads the shared database while the others' workers still run
+        states = []
+        for _ in range(2):
+            reader = context.Process(target=collect_on_node, args=(expected_rows, args.timeout, results))
+            reader.start()
+            states.append(results.get())
+            reader.join()
+        barrier.wait()
+        for node in nodes:
+            node.join()
+    finally:
+        if postgres_dir:
+            stop_throwaway_postgres(postgres_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    state = states[-1]
+    print(f"wrote {expected_rows - failed} of {expected_rows} rows in {elapsed:.2f}s "
+          f"({(expected_rows - failed) / elapsed:.1f} rows/s)")
+
+    problems = []
+    if failed:
+        problems.append(f'{failed} requests failed')
+    if state['rows'] != expected_rows:
+        problems.append(f"{state['rows']} rows stored, expected {expected_rows}")
+    if state['tasks'] or state['student_pending'] or state['teacher_pending']:
+        problems.append(f"sentiment queue did not drain ({state['tasks']} tasks left)")
+    if state['running_jobs']:
+        problems.append('import job did not finish')
+    for kind in ('student', 'teacher'):
+        if state[f'{kind}_duplicate_emails']:
+            problems.append(f'duplicate {kind} rows')
+    if state['student_count'] + state['teacher_count'] != state['rows']:
+        problems.append('aggregate response totals do not match the feedback tables')
+    if state['aggregate_mismatches']:
+        problems.append(f"aggregates out of sync: {', '.join(state['aggregate_mismatches'][:5])}")
+    if states[0] != states[-1]:
+        problems.append('nodes disagree about the database contents')
+
+    for problem in problems:
+        print(f'FAIL {problem}')
+    if problems:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
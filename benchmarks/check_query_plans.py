@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the dashboard, aggregate, breakdown, browse and export queries.
+
+Builds the schema in a scratch SQLite database, runs EXPLAIN QUERY PLAN on
+each query the app issues on a hot path and fails if any of them falls
+back to a full table scan or a temporary sort.
+
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import select, func, text  # noqa: E402
+
+from models import db, StudentFeedback, TeacherFeedback, FeedbackAggregate, SentimentTask, ClosedAnswer  # noqa: E402
+import browse  # noqa: E402
+import question_sentiment  # noqa: E402
+import normalized  # noqa: E402
+import rollups  # noqa: E402
+
+
+def hot_queries():
+    queries = {}
+    for respondent, model, group_column, email_column in (
+        ('student', StudentFeedback, StudentFeedback.student_class, StudentFeedback.student_email),
+        ('teacher', TeacherFeedback, TeacherFeedback.teacher_subject, TeacherFeedback.teacher_email),
+    ):
+        table = model.__tablename__
+        queries[f'{table}: recent 10'] = select(model).order_by(model.created_at.desc()).limit(10)
+        queries[f'{table}: browse keyset page'] = browse.page_query(
+            respondent, browse.default_fields(respondent), after=(datetime(2024, 1, 1), 100))
+        queries[f'{table}: export keyset batch'] = select(model).where(model.id > 100).order_by(model.id).limit(1000)
+        queries[f'{table}: sentiment counts'] = select(model.sentiment_label, func.count()).group_by(model.sentiment_label)
+        queries[f'{table}: q1 counts'] = select(model.q1, func.count()).group_by(model.q1)
+        queries[f'{table}: filter by group'] = select(model.id).where(group_column == 'Class 8')
+        queries[f'{table}: lookup by email'] = select(model.id).where(email_column == 'someone@example.com')
+
+    queries['feedback_aggregate: chart counts'] = (
+        select(FeedbackAggregate.answer, FeedbackAggregate.count)
+        .where(FeedbackAggregate.respondent_type == 'student', FeedbackAggregate.question == 'q1')
+    )
+    queries['feedback_rollup: weekly breakdown'] = rollups.breakdown_query('student', 'q1', 'week', date(2024, 1, 1))
+    queries['closed_answer: question tally'] = (
+        select(ClosedAnswer.answer_id, func.count())
+        .where(ClosedAnswer.question_id == normalized.question_id('student', 'q1'))
+        .group_by(ClosedAnswer.answer_id)
+    )
+    queries['answer_sentiment: per-question distributions'] = question_sentiment.distribution_query('student')
+    view = normalized.WIDE_VIEWS['student']
+    queries['student_feedback_wide: export keyset batch'] = select(view).where(view.c.id > 100).order_by(view.c.id).limit(1000)
+    queries['sentiment_task: queue depth'] = select(SentimentTask.status, func.count()).group_by(SentimentTask.status)
+    return queries
+
+
+def is_regression(detail):
+    detail = detail.upper()
+    full_scan = detail.startswith('SCAN ') and 'USING' not in detail
+    temp_sort = 'USE TEMP B-TREE' in detail
+    return full_scan or temp_sort
+
+
+def main():
+    app = Flask(__name__)
+    db_path = os.path.join(tempfile.mkdtemp(), 'plans.sqlite3')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        normalized.ensure_views()
+        db.session.execute(text('ANALYZE'))
+
+        for name, query in hot_queries().items():
+            sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+            details = [row[-1] for row in plan]
+            bad = [d for d in details if is_regression(d)]
+            failures += bool(bad)
+            print(f"{'FAIL' if bad else 'ok  '} {name}")
+            for detail in details:
+                print(f"       {detail}")
+
+    if failures:
+        print(f"\n{failures} queries regressed to a full scan or temporary sort")
+        sys.exit(1)
+    print("\nAll hot queries use an index")
+
+
+if __name__ == '__main__':
+    main()
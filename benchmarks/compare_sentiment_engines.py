@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Compare the sentiment engines in sentiment_engines.py on the bundled CSV
+files. TextBlob is the reference: for each other engine this reports how
+many response labels agree with it and the mean absolute polarity
+difference. As a rough accuracy check that needs no hand labels, it also
+reports each engine's correlation between polarity and the q1 rating,
+and its throughput in answers/s (in-process, no answer cache).
+
+    python benchmarks/compare_sentiment_engines.py
+    python benchmarks/compare_sentiment_engines.py --repeat 20 realistic_students_data.csv
+"""
+import argparse
+import csv
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+import sentiment  # noqa: E402
+from analytics import Q1_SCALES  # noqa: E402
+from models import OPEN_FIELDS  # noqa: E402
+from sentiment_cache import normalize_text  # noqa: E402
+from sentiment_engines import ENGINES, get_engine  # noqa: E402
+
+REFERENCE = 'textblob'
+
+
+def load_rows(path):
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        return list(csv.DictReader(f))
+
+
+def score_rows(engine, rows):
+    """(polarity, label) per response, scoring answers the way sentiment.answer_scores() does."""
+    results = []
+    for row in rows:
+        texts = [normalize_text(row.get(field)) for field in OPEN_FIELDS]
+        polarity, _, label = sentiment.combine([engine.assess(text) if text else None for text in texts])
+        results.append((polarity, label))
+    return results
+
+
+def throughput(engine, texts, repeat):
+    engine.assess_many(texts[:10])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        engine.assess_many(texts)
+    return len(texts) * repeat / (time.perf_counter() - started)
+
+
+def q1_correlation(rows, results):
+    scale = Q1_SCALES['teacher' if rows and 'teacher_name' in rows[0] else 'student']
+    pairs = [(scale.index(row['q1']) + 1, polarity)
+             for row, (polarity, _) in zip(rows, results) if row.get('q1') in scale]
+    if len(pairs) < 3:
+        return None
+    x, y = np.array(pairs, dtype='float64').T
+    if x.std() == 0 or y.std() == 0:
+        return None
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='CSV files (default: every *.csv in the repository root)')
+    parser.add_argument('--repeat', type=int, default=10, help='Passes over the answers when timing')
+    args = parser.parse_args()
+
+    paths = [os.path.join(ROOT, path) if not os.path.exists(path) else path for path in args.files]
+    paths = paths or sorted(glob.glob(os.path.join(ROOT, '*.csv')))
+    engines = [get_engine(name) for name in ENGINES]
+
+    all_rows = []
+    print(f"{'file':32} {'engine':9} {'rows':>5} {'agree':>7} {'|dp|':>7} {'q1 r':>6}")
+    for path in paths:
+        rows = load_rows(path)
+        all_rows.extend(rows)
+        reference = score_rows(get_engine(REFERENCE), rows)
+        for engine in engines:
+            results = reference if engine.name == REFERENCE else score_rows(engine, rows)
+            agree = sum(a[1] == b[1] for a, b in zip(reference, results)) / len(rows) if rows else 1.0
+            error = sum(abs(a[0] - b[0]) for a, b in zip(reference, results)) / len(rows) if rows else 0.0
+            correlation = q1_correlation(rows, results)
+            print(f"{os.path.basename(path):32} {engine.name:9} {len(rows):5} {agree:7.1%} {error:7.4f} "
+                  f"{'-' if correlation is None else f'{correlation:6.3f}':>6}")
+
+    texts = [text for text in (normalize_text(row.get(field)) for row in all_rows for field in OPEN_FIELDS) if text]
+    print(f"\nthroughput over {len(texts)} answers x {args.repeat}:")
+    rates = {engine.name: throughput(engine, texts, args.repeat) for engine in engines}
+    for name, rate in rates.items():
+        print(f"  {name:9} {rate:10.0f} answers/s  ({rate / rates[REFERENCE]:5.1f}x {REFERENCE})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Newest-first paging through feedback rows, for /admin/api/students and
+/admin/api/teachers.
+
+Pages are ordered by (created_at, id) descending and continue from an
+opaque cursor holding the last row's (created_at, id), so each page is a
+single range scan on the ix_*_created_at_id index and costs the same at
+any depth, unlike OFFSET paging, which reads and discards every earlier
+row. Rows can be filtered on the class/subject, the sentiment label and
+the closed answers, and `fields` picks the columns to load; by default
+the ten open-answer Text columns are left out.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from models import db, FEEDBACK_MODELS, CLOSED_FIELDS, OPEN_FIELDS
+from rollups import GROUP_FIELDS
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def columns(respondent_type):
+    return [column.name for column in FEEDBACK_MODELS[respondent_type].__table__.columns]
+
+
+def default_fields(respondent_type):
+    return [name for name in columns(respondent_type) if name not in OPEN_FIELDS]
+
+
+def filter_fields(respondent_type):
+    return (GROUP_FIELDS[respondent_type], 'sentiment_label') + CLOSED_FIELDS
+
+
+def encode_cursor(created_at, row_id):
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises ValueError for anything that isn't one."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def page_query(respondent_type, fields, filters=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """SELECT for one page: fields plus created_at and id, which the next cursor is made of."""
+    table = FEEDBACK_MODELS[respondent_type].__table__
+    selected = list(dict.fromkeys(list(fields) + ['created_at', 'id']))
+    query = select(*[table.c[name] for name in selected])
+    for name, values in (filters or {}).items():
+        column = table.c[name]
+        query = query.where(column == values[0] if len(values) == 1 else column.in_(values))
+    if after is not None:
+        # Row-value comparison, which both SQLite and PostgreSQL answer from the index
+        query = query.where(tuple_(table.c.created_at, table.c.id) < tuple_(*after))
+    return query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(limit)
+
+
+def page(respondent_type, fields=None, filters=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of rows as dicts, newest first, plus the cursor of the next page (None on the last).
+
+    filters maps a filter_fields() name to a list of accepted values.
+    Raises ValueError for unknown fields or filters, a bad cursor or limit.
+    """
+    fields = list(fields) if fields else default_fields(respondent_type)
+    unknown = [name for name in fields if name not in columns(respondent_type)]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    filters = dict(filters or {})
+    unknown = [name for name in filters if name not in filter_fields(respondent_type)]
+    if unknown:
+        raise ValueError(f"Cannot filter on: {', '.join(unknown)}")
+    if 'sentiment_label' in filters:
+        # Labels are stored lowercase
+        filters['sentiment_label'] = [label.lower() for label in filters['sentiment_label']]
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    after = decode_cursor(cursor) if cursor else None
+
+    # One extra row tells whether there is a next page
+    rows = db.session.execute(page_query(respondent_type, fields, filters, after, limit + 1)).mappings().all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[name]
+            item[name] = value.isoformat() if isinstance(value, datetime) else value
+        items.append(item)
+    last = rows[-1] if rows else None
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(last['created_at'], last['id']) if more else None,
+    }
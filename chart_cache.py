@@ -0,0 +1,103 @@
+"""
+Cache for rendered dashboard charts.
+
+Entries are keyed by chart name plus a data version (a hash of the counts
+the chart was drawn from), so a chart is only re-rendered when its data
+actually changes. A bounded LRU lives in each process; an optional disk
+directory lets all gunicorn workers share renders.
+"""
+import glob
+import os
+import threading
+from collections import OrderedDict
+
+
+class ChartCache:
+    def __init__(self, max_entries=32, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, name, version, extension):
+        return os.path.join(self.disk_dir, f'{name}-{version}.{extension}')
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, name, version, extension='png'):
+        """Return the cached image bytes or None."""
+        key = (name, version, extension)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(name, version, extension), 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                with self._lock:
+                    self.disk_hits += 1
+                return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, name, version, data, extension='png'):
+        self._remember((name, version, extension), data)
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                path = self._disk_path(name, version, extension)
+                # Write then rename so other workers never read a partial file
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+                # Older versions of this chart are no longer needed
+                for old_path in glob.glob(self._disk_path(name, '*', extension)):
+                    if old_path != path:
+                        try:
+                            os.remove(old_path)
+                        except OSError:
+                            pass
+            except OSError as e:
+                print(f"Error writing chart cache file: {e}")
+
+    def get_or_render(self, name, version, render, extension='png'):
+        """Return the image bytes, calling render() on a miss (None if that fails)."""
+        data = self.get(name, version, extension)
+        if data is None:
+            data = render()
+            if data is not None:
+                self.set(name, version, data, extension)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'disk_dir': self.disk_dir,
+            }
@@ -0,0 +1,84 @@
+"""
+Chart rendering, kept apart from the request workers.
+
+Charts are drawn with matplotlib's object-oriented API: every render
+builds its own Figure with its own canvas and never touches pyplot's
+global figure registry, so renders can run side by side and a failed one
+leaves nothing behind. A ChartRenderer hands each render to a small pool
+of processes (CHART_RENDER_WORKERS), keeping the CPU work and matplotlib's
+memory out of the request threads: callers pass a plain data spec (see
+charts.chart_spec()) and get PNG or SVG bytes back. With no workers the
+chart is drawn in the calling thread instead.
+"""
+import io
+from concurrent.futures.process import BrokenProcessPool
+
+from spawn_pool import SpawnPool
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+# Seconds a request waits for the pool before giving up on a chart
+RENDER_TIMEOUT = 30
+
+
+def load_matplotlib():
+    """The Figure class, importing matplotlib on first use (see warmup.py)."""
+    from matplotlib.figure import Figure
+    return Figure
+
+
+def render(spec, fmt='png'):
+    """Draw a bar chart spec and return the image bytes in fmt ('png' or 'svg')."""
+    Figure = load_matplotlib()
+    figure = Figure(figsize=spec['figsize'], facecolor='white')
+    axes = figure.subplots()
+
+    labels = spec['labels']
+    values = spec['values']
+    total_responses = sum(values)
+    bars = axes.bar(labels, values, color=spec['colors'])
+
+    # Add percentage labels on bars
+    for bar, count in zip(bars, values):
+        percentage = (count / total_responses) * 100
+        axes.text(bar.get_x() + bar.get_width()/2., bar.get_height() + total_responses*0.01,
+                  f'{percentage:.1f}%', ha='center', va='bottom', fontweight='bold', fontsize=10)
+
+    axes.set_title(spec['title'])
+    axes.set_ylabel('Count')
+    axes.set_xlabel(spec['xlabel'])
+    if spec['rotate_labels']:
+        axes.tick_params(axis='x', labelrotation=45)
+    axes.set_ylim(0, max(values) * 1.15)  # Add space for percentage labels
+
+    image = io.BytesIO()
+    # savefig picks the Agg or SVG canvas from the format
+    figure.savefig(image, format=fmt, bbox_inches='tight', dpi=spec.get('dpi', 80), facecolor='white')
+    return image.getvalue()
+
+
+class ChartRenderer:
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self._pool = SpawnPool()
+
+    def render(self, spec, fmt='png'):
+        """Image bytes for a chart spec, or None if it could not be drawn."""
+        if fmt not in FORMATS:
+            raise ValueError(f'Unsupported chart format: {fmt}')
+        try:
+            if self.max_workers <= 0:
+                return render(spec, fmt)
+            executor = self._pool.get(self.max_workers)
+            try:
+                return executor.submit(render, spec, fmt).result(timeout=RENDER_TIMEOUT)
+            except BrokenProcessPool:
+                # A renderer process died; the next chart gets a fresh pool
+                self._pool.discard(executor)
+                raise
+        except Exception as e:
+            print(f"Error generating {spec['title']} chart: {e!r}")
+            return None
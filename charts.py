@@ -0,0 +1,150 @@
+"""
+Dashboard charts: what each chart shows, where its data comes from and how
+it is drawn. Drawing happens in chart_renderer.py; rendered images are
+cached per data version so repeated dashboard loads and downloads skip
+matplotlib entirely.
+"""
+import hashlib
+import json
+
+import aggregates
+from chart_cache import ChartCache
+from chart_renderer import ChartRenderer
+from sentiment_queue import PENDING_LABEL
+
+CHART_SPECS = {
+    'sentiment': {
+        'title': 'Overall Sentiment Distribution',
+        'xlabel': 'Sentiment',
+        'figsize': (8, 6),
+        'rotate_labels': False,
+        'default_color': '#6495ED',
+        # Define distinct colors for sentiment analysis
+        'colors': {
+            'positive': '#2E8B57',     # Sea Green
+            'neutral': '#FF8C00',      # Dark Orange
+            'negative': '#DC143C'      # Crimson Red
+        },
+    },
+    'satisfaction': {
+        'title': 'Student Satisfaction Levels',
+        'xlabel': 'Satisfaction Level',
+        'figsize': (10, 6),
+        'rotate_labels': True,
+        'default_color': '#007bff',
+        # Define colors for different satisfaction levels
+        'colors': {
+            'Very Satisfied': '#28a745',      # Green
+            'Satisfied': '#6c757d',           # Gray
+            'Neutral': '#ffc107',             # Yellow
+            'Dissatisfied': '#fd7e14',        # Orange
+            'Very Dissatisfied': '#dc3545'    # Red
+        },
+    },
+    'teacher_effectiveness': {
+        'title': 'Teacher Effectiveness Levels',
+        'xlabel': 'Effectiveness Level',
+        'figsize': (10, 6),
+        'rotate_labels': True,
+        'default_color': '#007bff',
+        # Define colors for different effectiveness levels
+        'colors': {
+            'Very Effective': '#28a745',       # Green
+            'Effective': '#17a2b8',           # Teal
+            'Neutral': '#ffc107',             # Yellow
+            'Ineffective': '#fd7e14',         # Orange
+            'Very Ineffective': '#dc3545'     # Red
+        },
+    },
+}
+
+
+def ordered_counts(counts, order):
+    # Known answers in scale order, anything else after them
+    ordered = {answer: counts[answer] for answer in order if answer in counts}
+    for answer, count in counts.items():
+        ordered.setdefault(answer, count)
+    return ordered
+
+
+def chart_data(name):
+    """Return the {label: count} a chart is drawn from."""
+    if name == 'sentiment':
+        # Students and teachers combined
+        data = aggregates.answer_counts('student', 'sentiment_label')
+        for sentiment, count in aggregates.answer_counts('teacher', 'sentiment_label').items():
+            data[sentiment] = data.get(sentiment, 0) + count
+        data.pop(PENDING_LABEL, None)
+    elif name == 'satisfaction':
+        data = aggregates.answer_counts('student', 'q1')
+    elif name == 'teacher_effectiveness':
+        data = aggregates.answer_counts('teacher', 'q1')
+    else:
+        raise KeyError(name)
+    return ordered_counts(data, list(CHART_SPECS[name]['colors']))
+
+
+def data_version(data):
+    """Short hash that changes whenever the chart's counts change."""
+    encoded = json.dumps(list(data.items()), separators=(',', ':')).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def chart_spec(name, data):
+    """The plain data a chart is drawn from, as chart_renderer.render() takes it."""
+    spec = CHART_SPECS[name]
+    return {
+        'title': spec['title'],
+        'xlabel': spec['xlabel'],
+        'figsize': spec['figsize'],
+        'rotate_labels': spec['rotate_labels'],
+        'labels': list(data.keys()),
+        'values': list(data.values()),
+        # Get colors for each bar based on its label
+        'colors': [spec['colors'].get(label, spec['default_color']) for label in data.keys()],
+    }
+
+
+class ChartService:
+    def __init__(self, app=None):
+        self.cache = ChartCache()
+        self.renderer = ChartRenderer()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.cache = ChartCache(max_entries=int(app.config.get('CHART_CACHE_SIZE', 32)),
+                                disk_dir=app.config.get('CHART_CACHE_DIR'))
+        self.renderer = ChartRenderer(max_workers=int(app.config.get('CHART_RENDER_WORKERS', 1)))
+
+    def version(self, name):
+        """Current data version of a chart, or None when there is no data for it."""
+        data = chart_data(name)
+        return data_version(data) if data else None
+
+    def data_entry(self, name):
+        """Return (chart_spec without the figure size, version), or (None, None) without data."""
+        data = chart_data(name)
+        if not data:
+            return None, None
+        spec = chart_spec(name, data)
+        del spec['figsize']
+        return spec, data_version(data)
+
+    def image_entry(self, name, fmt='png'):
+        """Return (image_bytes, version), or (None, None) without data."""
+        data = chart_data(name)
+        if not data:
+            return None, None
+        version = data_version(data)
+        image = self.cache.get_or_render(
+            name, version, lambda: self.renderer.render(chart_spec(name, data), fmt), extension=fmt)
+        return image, version
+
+    def png_entry(self, name):
+        """Return (png_bytes, version), or (None, None) without data."""
+        return self.image_entry(name, 'png')
+
+    def png(self, name):
+        """PNG bytes for one chart, or None when there is no data for it."""
+        return self.png_entry(name)[0]
@@ -0,0 +1,113 @@
+"""
+Database engine configuration.
+
+The database comes from DATABASE_URL, so several app nodes can share one
+PostgreSQL server instead of each keeping its own SQLite file. Server
+databases get a connection pool sized from the environment (DB_POOL_*),
+with pre-ping and recycling so connections dropped by the server or a
+proxy are replaced instead of failing a request.
+
+For SQLite, every new connection gets a set of PRAGMAs tuned for several
+gunicorn workers writing at once: WAL journaling so readers never block
+the writer, synchronous=NORMAL (safe with WAL), a busy timeout so writers
+queue up instead of failing with "database is locked", plus memory-mapped
+I/O and a larger page cache. Each setting comes from the environment; set
+a variable to an empty string to leave that PRAGMA at SQLite's default.
+"""
+import os
+import re
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+
+DEFAULT_DATABASE_URL = 'sqlite:///db.sqlite3'
+
+# insert() constructs with ON CONFLICT support, by dialect name
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Engine option, environment variable, default and parser for pooled server databases
+POOL_SETTINGS = (
+    ('pool_size', 'DB_POOL_SIZE', '5', int),
+    ('max_overflow', 'DB_MAX_OVERFLOW', '10', int),
+    ('pool_timeout', 'DB_POOL_TIMEOUT', '30', int),
+    ('pool_recycle', 'DB_POOL_RECYCLE', '1800', int),  # seconds, below typical server/proxy idle timeouts
+    ('pool_pre_ping', 'DB_POOL_PRE_PING', 'true', lambda value: value.lower() in ('1', 'true', 'yes', 'on')),
+)
+
+# Environment variable and default for each PRAGMA, in the order they are applied
+SQLITE_PRAGMA_SETTINGS = (
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    ('journal_mode', 'SQLITE_JOURNAL_MODE', 'WAL'),
+    ('synchronous', 'SQLITE_SYNCHRONOUS', 'NORMAL'),
+    ('mmap_size', 'SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    ('cache_size', 'SQLITE_CACHE_SIZE', '-65536'),  # negative means KiB, so 64 MiB
+)
+
+
+def database_url_from_env(environ=None):
+    environ = os.environ if environ is None else environ
+    url = environ.get('DATABASE_URL', '').strip() or DEFAULT_DATABASE_URL
+    # Heroku-style URLs use a scheme SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options_from_env(database_url, environ=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URL.
+
+    SQLite keeps SQLAlchemy's own pool choice (a single file has nothing
+    to gain from a large pool); other backends get the DB_POOL_* settings.
+    Set a variable to an empty string to use SQLAlchemy's default.
+    """
+    environ = os.environ if environ is None else environ
+    if database_url.startswith('sqlite'):
+        return {}
+    options = {}
+    for option, variable, default, parse in POOL_SETTINGS:
+        value = environ.get(variable, default).strip()
+        if not value:
+            continue
+        try:
+            options[option] = parse(value)
+        except ValueError:
+            raise ValueError(f'Invalid value for {variable}: {value!r}')
+    return options
+
+
+def sqlite_pragmas_from_env(environ=None):
+    environ = os.environ if environ is None else environ
+    pragmas = {}
+    for pragma, variable, default in SQLITE_PRAGMA_SETTINGS:
+        value = environ.get(variable, default).strip()
+        if not value:
+            continue
+        # Values end up in a PRAGMA statement, so only allow plain words and numbers
+        if not re.fullmatch(r'-?[A-Za-z0-9_]+', value):
+            raise ValueError(f'Invalid value for {variable}: {value!r}')
+        pragmas[pragma] = value
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run the given PRAGMAs on every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f'PRAGMA {pragma}={value}')
+        finally:
+            cursor.close()
+
+
+def configure_engine(app, db):
+    """Attach connection settings to the app's engine. Call before the first query."""
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS', {}))
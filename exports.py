@@ -0,0 +1,138 @@
+"""
+Streaming helpers for the admin download routes.
+
+Rows are fetched in keyset-paginated batches (WHERE id > last_id ORDER BY
+id LIMIT n) and written out as CSV, JSON or NDJSON a buffer at a time, so
+the first bytes go out immediately and memory use doesn't grow with the
+table.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from sqlalchemy import select, Table
+
+from models import db
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Flush the output buffer to the client once it holds this many characters
+FLUSH_SIZE = 64 * 1024
+
+# orjson is much faster when installed; the stdlib encoder matches jsonify's output
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def iter_in_batches(model, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every row of a feedback model in id order, one batch in memory at a time.
+
+    A Core table or view with an id column works too and yields Row objects.
+    """
+    if isinstance(model, Table):
+        yield from _iter_table_in_batches(model, batch_size)
+        return
+
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(model).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        ).scalars().all()
+        if not batch:
+            return
+
+        for row in batch:
+            yield row
+        last_id = batch[-1].id
+
+        # Drop the finished batch from the session's identity map
+        for row in batch:
+            db.session.expunge(row)
+
+
+def _iter_table_in_batches(table, batch_size):
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        yield from batch
+        last_id = batch[-1].id
+
+
+def stream_csv(header, rows):
+    """Generate CSV text for a header and an iterable of row lists."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if output.tell() >= FLUSH_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    yield output.getvalue()
+
+
+def stream_json_array(items):
+    """Generate a JSON array from an iterable of dicts, one element at a time."""
+    parts = ['[']
+    size = 1
+    for index, item in enumerate(items):
+        encoded = dumps(item)
+        parts.append(encoded if index == 0 else ',' + encoded)
+        size += len(encoded) + 1
+        if size >= FLUSH_SIZE:
+            yield ''.join(parts)
+            parts, size = [], 0
+    parts.append(']\n')
+    yield ''.join(parts)
+
+
+def stream_ndjson(items):
+    """Generate newline-delimited JSON, one object per line."""
+    parts = []
+    size = 0
+    for item in items:
+        encoded = dumps(item)
+        parts.append(encoded + '\n')
+        size += len(encoded) + 1
+        if size >= FLUSH_SIZE:
+            yield ''.join(parts)
+            parts, size = [], 0
+    yield ''.join(parts)
+
+
+def timestamped(prefix, extension):
+    return f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+
+def streamed_download(chunks, filename, content_type):
+    response = Response(stream_with_context(chunks))
+    response.headers['Content-Type'] = content_type
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def csv_download(header, rows, filename_prefix):
+    return streamed_download(stream_csv(header, rows), timestamped(filename_prefix, 'csv'), 'text/csv')
+
+
+def json_download(items, filename_prefix, ndjson=False):
+    if ndjson:
+        return streamed_download(stream_ndjson(items), timestamped(filename_prefix, 'ndjson'), 'application/x-ndjson')
+    return streamed_download(stream_json_array(items), timestamped(filename_prefix, 'json'), 'application/json')
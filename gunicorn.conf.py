@@ -0,0 +1,17 @@
+"""
+gunicorn settings, read automatically by `gunicorn app:app`.
+
+PRELOAD_APP=1 imports the app once in the master and warms up its heavy
+dependencies there (see warmup.py) before workers are forked. Everything
+else keeps gunicorn's defaults (WEB_CONCURRENCY, PORT, ...).
+"""
+import os
+
+preload_app = os.environ.get('PRELOAD_APP', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks
+    if preload_app:
+        from warmup import warm_up
+        warm_up()
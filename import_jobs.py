@@ -0,0 +1,221 @@
+"""
+Background import jobs for large CSV uploads.
+
+The upload route saves the file to a spool directory, records an ImportJob
+row and returns straight away. A small thread pool runs the streaming
+importer against the spooled file and keeps the job row up to date after
+every chunk, so any gunicorn worker can report progress through
+/admin/jobs/<id>. Jobs interrupted by a restart resume from the last
+committed chunk.
+"""
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, func, or_
+from werkzeug.utils import secure_filename
+
+from importer import import_csv, ImportResult
+from models import db, ImportJob
+
+# Number of error messages kept on the job row
+MAX_STORED_ERRORS = 20
+
+
+class ImportJobRunner:
+    def __init__(self, app=None):
+        self.app = None
+        self.spool_dir = None
+        self.workers = 1
+        self.chunk_size = 1000
+        self.stale_after = 120
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._resumed_pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.spool_dir = app.config.get('IMPORT_SPOOL_DIR') or os.path.join(app.instance_path, 'import_spool')
+        self.workers = int(app.config.get('IMPORT_JOB_WORKERS', 1))
+        self.chunk_size = int(app.config.get('IMPORT_CHUNK_SIZE', 1000))
+        self.stale_after = int(app.config.get('IMPORT_JOB_STALE_SECONDS', 120))
+
+    def _get_executor(self):
+        # Executor threads do not survive a fork, so build one per process
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-job')
+                self._pid = os.getpid()
+            return self._executor
+
+    def spool_upload(self, file_storage):
+        """Copy an uploaded file into the spool directory.
+
+        Returns (job_id, path, estimated_rows). Rows are estimated from the
+        line count while copying, minus the header.
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.spool_dir, f'{job_id}_{secure_filename(file_storage.filename) or "upload.csv"}')
+
+        lines = 0
+        last_byte = b'\n'
+        with open(path, 'wb') as out:
+            while True:
+                block = file_storage.stream.read(1024 * 1024)
+                if not block:
+                    break
+                lines += block.count(b'\n')
+                last_byte = block[-1:]
+                out.write(block)
+        if last_byte != b'\n':
+            lines += 1  # no trailing newline on the last row
+
+        return job_id, path, max(lines - 1, 0)
+
+    def create_job(self, respondent_type, file_storage):
+        job_id, path, total_rows = self.spool_upload(file_storage)
+        job = ImportJob(
+            id=job_id,
+            respondent_type=respondent_type,
+            filename=file_storage.filename,
+            spool_path=path,
+            status='queued',
+            total_rows=total_rows,
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        if self.workers > 0:
+            self._get_executor().submit(self._run_in_context, job_id)
+        else:
+            # No background workers configured: import inside the request
+            self.run(job_id)
+        return job
+
+    def _run_in_context(self, job_id):
+        try:
+            with self.app.app_context():
+                self.run(job_id)
+        except Exception as e:
+            print(f"Error in import job {job_id}: {e}")
+
+    def _claimable(self):
+        stale_before = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        return or_(
+            ImportJob.status == 'queued',
+            (ImportJob.status == 'running') & (ImportJob.updated_at < stale_before),
+        )
+
+    def run(self, job_id):
+        # Claim the job so only one worker (or process) runs it. A resumed
+        # job keeps its first start time, which job_status measures rows from.
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, self._claimable())
+            .values(status='running', started_at=func.coalesce(ImportJob.started_at, now), updated_at=now)
+        ).rowcount
+        db.session.commit()
+        if claimed != 1:
+            return
+
+        job = db.session.get(ImportJob, job_id)
+        errors = job.errors.splitlines() if job.errors else []
+
+        # Carry on from the last committed chunk if this job was interrupted
+        result = ImportResult()
+        result.rows_processed = job.rows_processed
+        result.imported = job.rows_imported
+        result.error_count = job.error_count
+        skip_rows = job.rows_processed
+
+        def progress(result):
+            new_errors = errors + result.errors
+            db.session.execute(
+                update(ImportJob).where(ImportJob.id == job_id).values(
+                    rows_processed=result.rows_processed,
+                    rows_imported=result.imported,
+                    error_count=result.error_count,
+                    errors='\n'.join(new_errors[:MAX_STORED_ERRORS]) or None,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            # Committed by import_csv together with the chunk it reports
+
+        try:
+            with open(job.spool_path, 'rb') as stream:
+                import_csv(job.respondent_type, stream, chunk_size=self.chunk_size,
+                           progress=progress, skip_rows=skip_rows, result=result)
+            # Rows after the last chunk that failed validation; committed with the status below
+            progress(result)
+            status = 'done'
+        except Exception as e:
+            db.session.rollback()
+            errors.append(f'Import failed: {str(e)}')
+            status = 'failed'
+
+        db.session.execute(
+            update(ImportJob).where(ImportJob.id == job_id).values(
+                status=status,
+                errors='\n'.join((errors + result.errors)[:MAX_STORED_ERRORS]) or None,
+                finished_at=datetime.utcnow(),
+                updated_at=datetime.utcnow(),
+            )
+        )
+        db.session.commit()
+
+        if status == 'done' and os.path.exists(job.spool_path):
+            os.remove(job.spool_path)
+
+    def ensure_started(self):
+        # Once per process, pick up jobs left behind by a previous run
+        if self.workers <= 0 or self._resumed_pid == os.getpid():
+            return
+        self._resumed_pid = os.getpid()
+        self.resume_pending()
+
+    def resume_pending(self):
+        """Re-submit queued jobs and jobs abandoned by a stopped process."""
+        job_ids = db.session.execute(select(ImportJob.id).where(self._claimable())).scalars().all()
+        for job_id in job_ids:
+            self._get_executor().submit(self._run_in_context, job_id)
+        return len(job_ids)
+
+
+def job_status(job):
+    """JSON-friendly progress report for an import job."""
+    now = datetime.utcnow()
+    end = job.finished_at or now
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0.0
+    rows_per_second = job.rows_processed / elapsed if elapsed > 0 else None
+
+    eta_seconds = None
+    if job.status == 'done':
+        eta_seconds = 0.0
+    elif rows_per_second and job.total_rows is not None:
+        eta_seconds = max(job.total_rows - job.rows_processed, 0) / rows_per_second
+
+    return {
+        'id': job.id,
+        'type': job.respondent_type,
+        'filename': job.filename,
+        'status': job.status,
+        'total_rows': job.total_rows,
+        'rows_processed': job.rows_processed,
+        'rows_imported': job.rows_imported,
+        'error_count': job.error_count,
+        'errors': job.errors.splitlines() if job.errors else [],
+        'rows_per_second': round(rows_per_second, 1) if rows_per_second else None,
+        'eta_seconds': round(eta_seconds, 1) if eta_seconds is not None else None,
+        'elapsed_seconds': round(elapsed, 1),
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
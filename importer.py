@@ -0,0 +1,182 @@
+"""
+Streaming CSV import for the admin upload routes.
+
+The uploaded file is read incrementally through a text wrapper, rows are
+validated in a generator pipeline and written with Core-level bulk inserts
+one chunk at a time, each chunk in its own transaction. Memory use stays
+flat regardless of file size, and a bad chunk only loses that chunk.
+"""
+import csv
+import io
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert
+
+import aggregates
+import normalized
+import question_sentiment
+import rollups
+import sentiment
+import trends
+from models import db, FEEDBACK_MODELS, CLOSED_FIELDS, OPEN_FIELDS, column_lengths
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Personal info columns for each respondent type (the first one is required)
+PERSONAL_FIELDS = {
+    'student': ('student_name', 'student_class', 'student_email', 'student_phone'),
+    'teacher': ('teacher_name', 'teacher_subject', 'teacher_email', 'teacher_phone'),
+}
+
+# Column size limits, checked per row so an over-long value fails only its row
+FIELD_LENGTHS = {kind: column_lengths(model) for kind, model in FEEDBACK_MODELS.items()}
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows_processed = 0   # data rows read from the file
+        self.imported = 0         # rows written to the database
+        self.skipped = 0          # blank rows
+        self.error_count = 0      # rows that failed validation or whose chunk failed
+        self.errors = []          # human readable messages
+        self.chunks = []          # per-chunk progress
+
+    def add_error(self, message, rows=1):
+        self.errors.append(message)
+        self.error_count += rows
+
+
+def iter_csv_rows(stream):
+    """Yield (row_number, row_dict) from a binary file stream without reading it all."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for row_num, row in enumerate(csv.DictReader(text), start=2):
+            yield row_num, row
+    finally:
+        # Hand the underlying stream back to its owner instead of closing it
+        text.detach()
+
+
+def build_record(respondent_type, row):
+    """Turn a CSV row into column values, or None for a blank row."""
+    def value(field):
+        return row.get(field) or ''
+
+    name_field = PERSONAL_FIELDS[respondent_type][0]
+    name = value(name_field).strip()
+    if not name:
+        return None
+
+    record = {name_field: name}
+    for field in PERSONAL_FIELDS[respondent_type][1:]:
+        record[field] = value(field).strip()
+    for field in CLOSED_FIELDS + OPEN_FIELDS:
+        record[field] = value(field)
+
+    for field, length in FIELD_LENGTHS[respondent_type].items():
+        if len(record.get(field, '')) > length:
+            raise ValueError(f"{field} is longer than {length} characters")
+    return record
+
+
+def validated_rows(respondent_type, rows, result):
+    for row_num, row in rows:
+        result.rows_processed += 1
+        try:
+            record = build_record(respondent_type, row)
+        except Exception as e:
+            result.add_error(f"Row {row_num}: {str(e)}")
+            continue
+        if record is None:
+            result.skipped += 1
+            continue
+        yield row_num, record
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def open_answers(record):
+    return [record[field] for field in OPEN_FIELDS]
+
+
+def import_csv(respondent_type, stream, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, skip_rows=0, result=None):
+    """Import a feedback CSV stream, committing every chunk_size rows.
+
+    progress, if given, is called with the ImportResult after each chunk,
+    before the chunk commits; it should only add to the session.
+    To resume an interrupted import, pass the number of data rows already
+    handled as skip_rows and an ImportResult carrying the earlier counts.
+    """
+    model = FEEDBACK_MODELS[respondent_type]
+    if result is None:
+        result = ImportResult()
+    rows = iter_csv_rows(stream)
+    if skip_rows:
+        rows = islice(rows, skip_rows, None)
+    rows = validated_rows(respondent_type, rows, result)
+
+    for chunk_number, chunk in enumerate(chunked(rows, chunk_size), start=1):
+        first_row, last_row = chunk[0][0], chunk[-1][0]
+        records = [record for _, record in chunk]
+        chunk_info = {
+            'chunk': chunk_number,
+            'first_row': first_row,
+            'last_row': last_row,
+            'rows': len(records),
+            'status': 'ok',
+        }
+
+        try:
+            # One pass gives the per-answer scores and, combined, each response's score
+            answer_scores = sentiment.answer_scores([open_answers(record) for record in records])
+            for record, scores in zip(records, answer_scores):
+                polarity, subjectivity, label = sentiment.combine(scores)
+                record['sentiment_polarity'] = polarity
+                record['sentiment_subjectivity'] = subjectivity
+                record['sentiment_label'] = label
+            # One timestamp per chunk, so the rows and their rollup buckets agree
+            imported_at = datetime.utcnow()
+            for record in records:
+                record['created_at'] = imported_at
+
+            # The answer score and normalized answer rows need the new feedback ids
+            ids = db.session.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True), records
+            ).scalars().all()
+            question_sentiment.write(respondent_type, zip(ids, answer_scores))
+            normalized.record_rows(respondent_type, zip(ids, records))
+            counts = Counter()
+            for record in records:
+                aggregates.count_record(record, counts)
+            aggregates.apply_counts(respondent_type, counts)
+            rollups.record_rows(respondent_type, records)
+            trends.record_rows(respondent_type, records)
+            result.imported += len(records)
+            result.chunks.append(chunk_info)
+            if progress is not None:
+                # In the chunk's own transaction, so a resumed import never repeats it
+                progress(result)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if result.chunks and result.chunks[-1] is chunk_info:
+                # The commit itself failed
+                result.chunks.pop()
+                result.imported -= len(records)
+            result.add_error(f"Rows {first_row}-{last_row}: Database error: {str(e)}", rows=len(records))
+            chunk_info['status'] = 'failed'
+            result.chunks.append(chunk_info)
+            if progress is not None:
+                progress(result)
+                db.session.commit()
+
+    return result
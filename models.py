@@ -0,0 +1,284 @@
+import time
+from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DatabaseError
+
+db = SQLAlchemy()
+
+# Database Models
+class StudentFeedback(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_name = db.Column(db.String(100), nullable=False)
+    student_class = db.Column(db.String(50), nullable=False, index=True)
+    student_email = db.Column(db.String(120), nullable=False, index=True)
+    student_phone = db.Column(db.String(20), nullable=False)
+    
+    # Closed-ended questions
+    q1 = db.Column(db.String(50), nullable=False, index=True)  # satisfaction
+    q2 = db.Column(db.String(50), nullable=False)  # internet access
+    q3 = db.Column(db.String(50), nullable=False)  # technical issues
+    q4 = db.Column(db.String(50), nullable=False)  # interactive
+    q5 = db.Column(db.String(50), nullable=False)  # comfortable asking
+    q6 = db.Column(db.String(50), nullable=False)  # teaching materials
+    q7 = db.Column(db.String(50), nullable=False)  # assignments manageable
+    q8 = db.Column(db.String(50), nullable=False)  # preference
+    q9 = db.Column(db.String(50), nullable=False)  # timely feedback
+    q10 = db.Column(db.String(50), nullable=False) # recommend
+    
+    # Open-ended questions
+    open_q1 = db.Column(db.Text, nullable=False)
+    open_q2 = db.Column(db.Text, nullable=False)
+    open_q3 = db.Column(db.Text, nullable=False)
+    open_q4 = db.Column(db.Text, nullable=False)
+    open_q5 = db.Column(db.Text, nullable=False)
+    open_q6 = db.Column(db.Text, nullable=False)
+    open_q7 = db.Column(db.Text, nullable=False)
+    open_q8 = db.Column(db.Text, nullable=False)
+    open_q9 = db.Column(db.Text, nullable=False)
+    open_q10 = db.Column(db.Text, nullable=False)
+    
+    # Sentiment analysis results
+    sentiment_polarity = db.Column(db.Float, nullable=True)
+    sentiment_subjectivity = db.Column(db.Float, nullable=True)
+    sentiment_label = db.Column(db.String(20), nullable=True, index=True)
+    
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Newest-first listings and (created_at, id) keyset paging
+        db.Index('ix_student_feedback_created_at_id', 'created_at', 'id'),
+    )
+
+class TeacherFeedback(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_name = db.Column(db.String(100), nullable=False)
+    teacher_subject = db.Column(db.String(50), nullable=False, index=True)
+    teacher_email = db.Column(db.String(120), nullable=False, index=True)
+    teacher_phone = db.Column(db.String(20), nullable=False)
+    
+    # Closed-ended questions
+    q1 = db.Column(db.String(50), nullable=False, index=True)  # effectiveness
+    q2 = db.Column(db.String(50), nullable=False)  # resources access
+    q3 = db.Column(db.String(50), nullable=False)  # technical issues
+    q4 = db.Column(db.String(50), nullable=False)  # student engagement
+    q5 = db.Column(db.String(50), nullable=False)  # comfortable with tools
+    q6 = db.Column(db.String(50), nullable=False)  # student participation
+    q7 = db.Column(db.String(50), nullable=False)  # assessments manageable
+    q8 = db.Column(db.String(50), nullable=False)  # preference
+    q9 = db.Column(db.String(50), nullable=False)  # provide feedback
+    q10 = db.Column(db.String(50), nullable=False) # recommend
+    
+    # Open-ended questions
+    open_q1 = db.Column(db.Text, nullable=False)
+    open_q2 = db.Column(db.Text, nullable=False)
+    open_q3 = db.Column(db.Text, nullable=False)
+    open_q4 = db.Column(db.Text, nullable=False)
+    open_q5 = db.Column(db.Text, nullable=False)
+    open_q6 = db.Column(db.Text, nullable=False)
+    open_q7 = db.Column(db.Text, nullable=False)
+    open_q8 = db.Column(db.Text, nullable=False)
+    open_q9 = db.Column(db.Text, nullable=False)
+    open_q10 = db.Column(db.Text, nullable=False)
+    
+    # Sentiment analysis results
+    sentiment_polarity = db.Column(db.Float, nullable=True)
+    sentiment_subjectivity = db.Column(db.Float, nullable=True)
+    sentiment_label = db.Column(db.String(20), nullable=True, index=True)
+    
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Newest-first listings and (created_at, id) keyset paging
+        db.Index('ix_teacher_feedback_created_at_id', 'created_at', 'id'),
+    )
+
+class SentimentTask(db.Model):
+    # Queue of feedback rows still waiting for sentiment analysis.
+    # Kept in the database so queued work survives a restart.
+    id = db.Column(db.Integer, primary_key=True)
+    respondent_type = db.Column(db.String(10), nullable=False)  # 'student' or 'teacher'
+    feedback_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending', index=True)  # pending/running/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    enqueued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+class ImportJob(db.Model):
+    # A CSV upload saved to the spool directory and imported in the background
+    id = db.Column(db.String(32), primary_key=True)
+    respondent_type = db.Column(db.String(10), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    spool_path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued/running/done/failed
+    
+    total_rows = db.Column(db.Integer, nullable=True)  # estimated from line count
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text, nullable=True)  # first few error messages, one per line
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class RescoreCheckpoint(db.Model):
+    # Progress of `flask rescore` per respondent type, committed with each batch so a run can resume
+    respondent_type = db.Column(db.String(10), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_changed = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class FeedbackAggregate(db.Model):
+    # Running answer counts, updated in the same transaction as the feedback rows
+    respondent_type = db.Column(db.String(10), primary_key=True)
+    question = db.Column(db.String(20), primary_key=True)  # q1-q10, sentiment_label or responses
+    answer = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class FeedbackRollup(db.Model):
+    # Answer counts per class/subject, all-time and per day/week of created_at
+    respondent_type = db.Column(db.String(10), primary_key=True)
+    question = db.Column(db.String(20), primary_key=True)  # q1-q10, sentiment_label or responses
+    period = db.Column(db.String(4), primary_key=True)     # 'all', 'day' or 'week'
+    period_start = db.Column(db.Date, primary_key=True)    # day, Monday of the week, or 1970-01-01 for 'all'
+    group_value = db.Column(db.String(50), primary_key=True)  # student_class or teacher_subject
+    answer = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class SentimentTrend(db.Model):
+    # Sentiment of scored feedback per day/week of created_at; mean and variance come from the sums
+    respondent_type = db.Column(db.String(10), primary_key=True)
+    period = db.Column(db.String(4), primary_key=True)   # 'day' or 'week'
+    period_start = db.Column(db.Date, primary_key=True)  # day, or Monday of the week
+    responses = db.Column(db.Integer, nullable=False, default=0)
+    polarity_sum = db.Column(db.Float, nullable=False, default=0.0)
+    polarity_sumsq = db.Column(db.Float, nullable=False, default=0.0)
+    positive = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    negative = db.Column(db.Integer, nullable=False, default=0)
+
+class Question(db.Model):
+    # Catalog of questions for the normalized response tables, with fixed ids
+    id = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    respondent_type = db.Column(db.String(10), nullable=False)
+    field = db.Column(db.String(20), nullable=False)  # wide column name, e.g. q1 or open_q1
+    kind = db.Column(db.String(10), nullable=False)   # 'closed' or 'open'
+    topic = db.Column(db.String(50), nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('respondent_type', 'field'),
+    )
+
+class AnswerOption(db.Model):
+    # Each distinct answer to a closed question gets a small integer code
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.SmallInteger, db.ForeignKey('question.id'), nullable=False)
+    label = db.Column(db.String(50), nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('question_id', 'label'),
+    )
+
+class ClosedAnswer(db.Model):
+    # One narrow row per answered closed question; blank answers are not stored
+    feedback_id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.SmallInteger, db.ForeignKey('question.id'), primary_key=True)
+    answer_id = db.Column(db.SmallInteger, nullable=False)
+    
+    __table_args__ = (
+        # Tallies: GROUP BY answer_id for one question, straight from the index
+        db.Index('ix_closed_answer_question_answer', 'question_id', 'answer_id'),
+    )
+
+class OpenAnswer(db.Model):
+    # Open-ended answers, kept out of the rows the tallies scan
+    feedback_id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.SmallInteger, db.ForeignKey('question.id'), primary_key=True)
+    text = db.Column(db.Text, nullable=False)
+
+class AnswerSentiment(db.Model):
+    # Sentiment of each non-blank open-ended answer; question ids come from the normalized catalog
+    feedback_id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.SmallInteger, primary_key=True)
+    polarity = db.Column(db.Float, nullable=False)
+    subjectivity = db.Column(db.Float, nullable=False)
+    
+    __table_args__ = (
+        # Per-question distributions straight from the index
+        db.Index('ix_answer_sentiment_question', 'question_id', 'polarity', 'subjectivity'),
+    )
+
+# Stand-in submission time for rows stored without one
+EPOCH = datetime(1970, 1, 1)
+
+# Feedback model for each respondent type
+FEEDBACK_MODELS = {
+    'student': StudentFeedback,
+    'teacher': TeacherFeedback,
+}
+
+# Multiple-choice (q1-q10) and open-answer (open_q1-open_q10) columns, shared by both models
+CLOSED_FIELDS = tuple(f'q{i}' for i in range(1, 11))
+OPEN_FIELDS = tuple(f'open_q{i}' for i in range(1, 11))
+
+def column_lengths(model):
+    """Return {column name: max length} for the model's VARCHAR columns.
+
+    SQLite stores longer strings without complaint but PostgreSQL rejects
+    them, so callers check these limits to behave the same on both.
+    """
+    return {column.name: column.type.length for column in model.__table__.columns
+            if isinstance(column.type, db.String) and column.type.length}
+
+def ensure_indexes():
+    """Create any model index missing from an existing database.
+
+    db.create_all() skips tables that already exist, indexes included, so
+    databases created before an index was added are upgraded here.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+def ensure_created_at():
+    """Give every feedback row a created_at and make the column NOT NULL.
+
+    Keyset paging (browse.py) orders by created_at, so it cannot be NULL.
+    Rows stored without one get the epoch, i.e. they sort as the oldest.
+    SQLite cannot add the constraint to an existing table; there the
+    backfill brings older databases in line and new ones get it from the
+    model.
+    """
+    with db.engine.begin() as connection:
+        for model in FEEDBACK_MODELS.values():
+            table = model.__table__
+            connection.execute(table.update().where(table.c.created_at.is_(None)).values(created_at=EPOCH))
+        if connection.dialect.name == 'postgresql':
+            inspector = inspect(connection)
+            for model in FEEDBACK_MODELS.values():
+                table = model.__table__
+                if any(column['name'] == 'created_at' and column['nullable'] for column in inspector.get_columns(table.name)):
+                    connection.execute(text(f'ALTER TABLE {table.name} ALTER COLUMN created_at SET NOT NULL'))
+
+def create_schema(attempts=5):
+    """Create missing tables and indexes, tolerating other nodes doing the same.
+
+    Nodes that boot together against one database can all see a table as
+    missing and race to create it; the losers get an "already exists"
+    error, wait a moment and find it there on the next attempt.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            db.create_all()
+            ensure_indexes()
+            ensure_created_at()
+            return
+        except DatabaseError:
+            if attempt == attempts:
+                raise
+            time.sleep(0.2 * attempt)
@@ -0,0 +1,269 @@
+"""
+Normalized storage for feedback answers.
+
+Next to the wide student_feedback/teacher_feedback rows, answers can be
+kept in narrow tables:
+
+  question        catalog of every question, with fixed small ids
+  answer_option   one small integer code per distinct closed answer
+  closed_answer   (feedback_id, question_id, answer_id), blanks not stored
+  open_answer     (feedback_id, question_id, text)
+
+so a tally of one question is an integer GROUP BY over an index instead of
+comparing strings across whole feedback rows. With NORMALIZED_RESPONSES
+enabled every submission and import is written to both layouts, aggregate
+rebuilds count from closed_answer, and the download routes read the
+student_feedback_wide/teacher_feedback_wide views, which rebuild the
+original columns from the narrow tables.
+
+`flask normalize-responses` creates the catalog and views and copies
+existing feedback rows across; on startup only rows added since are copied.
+"""
+from flask import current_app
+from sqlalchemy import Column, MetaData, Table, select, insert, delete, func, inspect, text
+
+from db_config import UPSERT_INSERTS
+from models import (db, FEEDBACK_MODELS, CLOSED_FIELDS, OPEN_FIELDS,
+                    Question, AnswerOption, ClosedAnswer, OpenAnswer)
+
+# Topic of each closed question, in q1..q10 order
+QUESTION_TOPICS = {
+    'student': ('satisfaction', 'internet access', 'technical issues', 'interactive',
+                'comfortable asking', 'teaching materials', 'assignments manageable',
+                'preference', 'timely feedback', 'recommend'),
+    'teacher': ('effectiveness', 'resources access', 'technical issues', 'student engagement',
+                'comfortable with tools', 'student participation', 'assessments manageable',
+                'preference', 'provide feedback', 'recommend'),
+}
+
+BACKFILL_BATCH_SIZE = 1000
+
+# The views are not part of db.metadata, so create_all() leaves them alone
+_view_metadata = MetaData()
+
+
+def _build_catalog():
+    catalog = []
+    for respondent_type in FEEDBACK_MODELS:
+        for i, field in enumerate(CLOSED_FIELDS):
+            catalog.append((respondent_type, field, 'closed', QUESTION_TOPICS[respondent_type][i]))
+        for field in OPEN_FIELDS:
+            catalog.append((respondent_type, field, 'open', None))
+    # Ids are fixed by position so every database and the view SQL agree on them
+    return {(respondent_type, field): (question_id, kind, topic)
+            for question_id, (respondent_type, field, kind, topic) in enumerate(catalog, start=1)}
+
+
+QUESTION_CATALOG = _build_catalog()
+
+
+def question_id(respondent_type, field):
+    return QUESTION_CATALOG[(respondent_type, field)][0]
+
+
+def view_name(respondent_type):
+    return f'{FEEDBACK_MODELS[respondent_type].__tablename__}_wide'
+
+
+def _view_table(respondent_type):
+    # Same columns as the feedback table, so exports get the same types back
+    columns = [Column(column.name, column.type) for column in FEEDBACK_MODELS[respondent_type].__table__.columns]
+    return Table(view_name(respondent_type), _view_metadata, *columns)
+
+
+WIDE_VIEWS = {respondent_type: _view_table(respondent_type) for respondent_type in FEEDBACK_MODELS}
+
+
+def is_enabled():
+    return bool(current_app.config.get('NORMALIZED_RESPONSES', False))
+
+
+def export_source(respondent_type):
+    """What the download routes read from: the compatibility view or the feedback model."""
+    if is_enabled():
+        return WIDE_VIEWS[respondent_type]
+    return FEEDBACK_MODELS[respondent_type]
+
+
+def ensure_catalog():
+    existing = set(db.session.execute(select(Question.id)).scalars())
+    missing = [
+        {'id': question_id, 'respondent_type': respondent_type, 'field': field, 'kind': kind, 'topic': topic}
+        for (respondent_type, field), (question_id, kind, topic) in QUESTION_CATALOG.items()
+        if question_id not in existing
+    ]
+    if missing:
+        db.session.execute(insert(Question), missing)
+        db.session.commit()
+
+
+def wide_select(respondent_type):
+    """SELECT rebuilding the wide feedback columns from the normalized tables."""
+    table = FEEDBACK_MODELS[respondent_type].__table__
+    columns = []
+    for column in table.columns:
+        if (respondent_type, column.name) not in QUESTION_CATALOG:
+            columns.append(column)
+            continue
+        qid = question_id(respondent_type, column.name)
+        if column.name in CLOSED_FIELDS:
+            value = (
+                select(AnswerOption.label)
+                .join(ClosedAnswer, ClosedAnswer.answer_id == AnswerOption.id)
+                .where(ClosedAnswer.feedback_id == table.c.id, ClosedAnswer.question_id == qid)
+            )
+        else:
+            value = select(OpenAnswer.text).where(OpenAnswer.feedback_id == table.c.id, OpenAnswer.question_id == qid)
+        # Blank answers are not stored; the wide columns held '' for them
+        columns.append(func.coalesce(value.scalar_subquery(), '').label(column.name))
+    return select(*columns)
+
+
+def ensure_views():
+    existing = set(inspect(db.engine).get_view_names())
+    for respondent_type in FEEDBACK_MODELS:
+        name = view_name(respondent_type)
+        if name in existing:
+            continue
+        query = wide_select(respondent_type).compile(db.engine, compile_kwargs={'literal_binds': True})
+        with db.engine.begin() as connection:
+            connection.execute(text(f'CREATE VIEW {name} AS {query}'))
+
+
+def drop_views():
+    existing = set(inspect(db.engine).get_view_names())
+    with db.engine.begin() as connection:
+        for respondent_type in FEEDBACK_MODELS:
+            if view_name(respondent_type) in existing:
+                connection.execute(text(f'DROP VIEW {view_name(respondent_type)}'))
+
+
+def _answer_ids(respondent_type, records):
+    """Map (question_id, label) to answer codes, adding codes for new answers."""
+    wanted = {(question_id(respondent_type, field), record[field])
+              for record in records for field in CLOSED_FIELDS if record.get(field)}
+    if not wanted:
+        return {}
+    question_ids = {qid for qid, _ in wanted}
+
+    def known():
+        return {(qid, label): answer_id for answer_id, qid, label in db.session.execute(
+            select(AnswerOption.id, AnswerOption.question_id, AnswerOption.label)
+            .where(AnswerOption.question_id.in_(question_ids))
+        )}
+
+    codes = known()
+    new = [{'question_id': qid, 'label': label} for qid, label in sorted(wanted) if (qid, label) not in codes]
+    if new:
+        upsert_insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        if upsert_insert is not None:
+            # Another node may add the same answer at the same time
+            db.session.execute(upsert_insert(AnswerOption).values(new).on_conflict_do_nothing())
+        else:
+            db.session.execute(insert(AnswerOption), new)
+        codes = known()
+    return codes
+
+
+def record_rows(respondent_type, rows):
+    """Write the normalized answers of new feedback rows.
+
+    rows is an iterable of (feedback_id, column values). Runs in the
+    caller's transaction; does nothing unless NORMALIZED_RESPONSES is on.
+    """
+    if is_enabled():
+        _write_rows(respondent_type, list(rows))
+
+
+def _write_rows(respondent_type, rows):
+    if not rows:
+        return
+    codes = _answer_ids(respondent_type, [values for _, values in rows])
+    closed, opened = [], []
+    for feedback_id, values in rows:
+        for field in CLOSED_FIELDS:
+            if values.get(field):
+                qid = question_id(respondent_type, field)
+                closed.append({'feedback_id': feedback_id, 'question_id': qid,
+                               'answer_id': codes[(qid, values[field])]})
+        for field in OPEN_FIELDS:
+            if values.get(field):
+                opened.append({'feedback_id': feedback_id, 'question_id': question_id(respondent_type, field),
+                               'text': values[field]})
+    if closed:
+        db.session.execute(insert(ClosedAnswer), closed)
+    if opened:
+        db.session.execute(insert(OpenAnswer), opened)
+
+
+def record_feedback(respondent_type, feedback):
+    """record_rows() for one ORM feedback object added to the session."""
+    if not is_enabled():
+        return
+    if feedback.id is None:
+        db.session.flush()
+    values = {field: getattr(feedback, field) for field in CLOSED_FIELDS + OPEN_FIELDS}
+    record_rows(respondent_type, [(feedback.id, values)])
+
+
+def answer_tallies(respondent_type, field):
+    """Return {answer: count} for one closed question, grouped on answer codes."""
+    qid = question_id(respondent_type, field)
+    counts = db.session.execute(
+        select(ClosedAnswer.answer_id, func.count())
+        .where(ClosedAnswer.question_id == qid)
+        .group_by(ClosedAnswer.answer_id)
+    ).all()
+    labels = dict(db.session.execute(
+        select(AnswerOption.id, AnswerOption.label).where(AnswerOption.question_id == qid)
+    ).all())
+    return {labels[answer_id]: count for answer_id, count in counts}
+
+
+def migrated_up_to(respondent_type):
+    """Highest feedback id that already has normalized answers."""
+    question_ids = [qid for (kind, _), (qid, _, _) in QUESTION_CATALOG.items() if kind == respondent_type]
+    highest = 0
+    for model in (ClosedAnswer, OpenAnswer):
+        value = db.session.execute(
+            select(func.max(model.feedback_id)).where(model.question_id.in_(question_ids))
+        ).scalar()
+        highest = max(highest, value or 0)
+    return highest
+
+
+def backfill(respondent_type, batch_size=BACKFILL_BATCH_SIZE):
+    """Copy feedback rows newer than migrated_up_to() into the normalized tables."""
+    model = FEEDBACK_MODELS[respondent_type]
+    table = model.__table__
+    fields = [table.c[field] for field in CLOSED_FIELDS + OPEN_FIELDS]
+    last_id = migrated_up_to(respondent_type)
+    copied = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, *fields).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            return copied
+        _write_rows(respondent_type, [(row['id'], row) for row in rows])
+        db.session.commit()
+        copied += len(rows)
+        last_id = rows[-1]['id']
+
+
+def reset():
+    """Empty the normalized answer tables (the catalog stays)."""
+    db.session.execute(delete(ClosedAnswer))
+    db.session.execute(delete(OpenAnswer))
+    db.session.execute(delete(AnswerOption))
+    db.session.commit()
+
+
+def ensure_built():
+    """Catalog, views and any rows written while the option was off. Called on startup."""
+    if not is_enabled():
+        return
+    ensure_catalog()
+    ensure_views()
+    for respondent_type in FEEDBACK_MODELS:
+        backfill(respondent_type)
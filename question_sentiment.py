@@ -0,0 +1,123 @@
+"""
+Sentiment of each open-ended answer, for per-question breakdowns.
+
+The overall score of a response is combined from per-answer scores (see
+sentiment.py); the answer_sentiment table keeps those per-answer polarity
+and subjectivity values, one narrow row per non-blank answer keyed by
+feedback id and the question's id in the normalized catalog. Rows are
+written as soon as a response is scored, so the per-question API never
+runs NLP at read time. `flask score-answers` fills them in for responses
+stored before the table existed.
+"""
+from sqlalchemy import select, insert, delete, func, case
+
+import sentiment
+from models import db, FEEDBACK_MODELS, OPEN_FIELDS, AnswerSentiment
+from normalized import question_id
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def question_ids(respondent_type):
+    return [question_id(respondent_type, field) for field in OPEN_FIELDS]
+
+
+def write(respondent_type, scored):
+    """Insert the per-answer scores of new responses.
+
+    scored is an iterable of (feedback_id, answer_scores()) pairs, with the
+    scores in open_q1..open_q10 order. Runs in the caller's transaction.
+    """
+    ids = question_ids(respondent_type)
+    rows = []
+    for feedback_id, scores in scored:
+        for qid, score in zip(ids, scores):
+            if score is None:
+                continue
+            polarity, subjectivity = sentiment.answer_sentiment(score)
+            rows.append({'feedback_id': feedback_id, 'question_id': qid,
+                         'polarity': polarity, 'subjectivity': subjectivity})
+    if rows:
+        db.session.execute(insert(AnswerSentiment), rows)
+
+
+def record_rows(respondent_type, rows):
+    """Score (through the answer cache) and store scored responses given as (feedback_id, column values)."""
+    rows = list(rows)
+    if not rows:
+        return
+    scores = sentiment.answer_scores([[values.get(field) for field in OPEN_FIELDS] for _, values in rows])
+    write(respondent_type, zip((feedback_id for feedback_id, _ in rows), scores))
+
+
+def clear(respondent_type, feedback_ids):
+    """Remove stored answer scores, before a response is scored again."""
+    db.session.execute(delete(AnswerSentiment).where(
+        AnswerSentiment.feedback_id.in_(list(feedback_ids)),
+        AnswerSentiment.question_id.in_(question_ids(respondent_type)),
+    ))
+
+
+def record_feedback(respondent_type, feedback):
+    """Store the answer scores of one ORM feedback row that has just been scored."""
+    if feedback.id is None:
+        db.session.flush()
+    clear(respondent_type, [feedback.id])
+    record_rows(respondent_type, [(feedback.id, {field: getattr(feedback, field) for field in OPEN_FIELDS})])
+
+
+def distribution_query(respondent_type):
+    polarity = AnswerSentiment.polarity
+    return (
+        select(
+            AnswerSentiment.question_id,
+            func.count(),
+            func.avg(polarity),
+            func.avg(AnswerSentiment.subjectivity),
+            func.sum(case((polarity > sentiment.POSITIVE_THRESHOLD, 1), else_=0)),
+            func.sum(case((polarity < sentiment.NEGATIVE_THRESHOLD, 1), else_=0)),
+        )
+        .where(AnswerSentiment.question_id.in_(question_ids(respondent_type)))
+        .group_by(AnswerSentiment.question_id)
+    )
+
+
+def distributions(respondent_type):
+    """Per open question: answers scored, mean polarity/subjectivity and label counts."""
+    ids = dict(zip(question_ids(respondent_type), OPEN_FIELDS))
+    result = {field: {'answers': 0, 'mean_polarity': None, 'mean_subjectivity': None,
+                      'labels': {'negative': 0, 'neutral': 0, 'positive': 0}}
+              for field in OPEN_FIELDS}
+    for qid, count, mean_polarity, mean_subjectivity, positive, negative in db.session.execute(distribution_query(respondent_type)):
+        result[ids[qid]] = {
+            'answers': count,
+            'mean_polarity': round(mean_polarity, 4),
+            'mean_subjectivity': round(mean_subjectivity, 4),
+            'labels': {'negative': negative, 'neutral': count - positive - negative, 'positive': positive},
+        }
+    return result
+
+
+def backfill(respondent_type, batch_size=BACKFILL_BATCH_SIZE):
+    """Score the answers of responses that have no answer scores yet; returns how many were scored."""
+    table = FEEDBACK_MODELS[respondent_type].__table__
+    fields = [table.c[field] for field in OPEN_FIELDS]
+    has_scores = (
+        select(AnswerSentiment.feedback_id)
+        .where(AnswerSentiment.feedback_id == table.c.id,
+               AnswerSentiment.question_id.in_(question_ids(respondent_type)))
+        .exists()
+    )
+    last_id = 0
+    scored = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, *fields).where(table.c.id > last_id, ~has_scores)
+            .order_by(table.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            return scored
+        record_rows(respondent_type, [(row['id'], row) for row in rows])
+        db.session.commit()
+        scored += len(rows)
+        last_id = rows[-1]['id']
@@ -0,0 +1,139 @@
+"""
+Re-scoring of stored sentiment, for `flask rescore`.
+
+Walks a feedback table in id order, a batch of rows at a time. Each batch
+is scored through the answer cache and the process pool in sentiment.py
+with the current thresholds; rows whose score changed are written back
+with one executemany UPDATE, and the aggregate, rollup, trend and
+per-question tables are adjusted in the same short transaction as a
+checkpoint row. An interrupted run resumes after the last committed batch,
+and live submissions never wait for more than one batch.
+
+Rows still waiting for the sentiment workers are left to them.
+
+lowercase_labels() runs on startup and folds the capitalized labels that
+older CSV imports stored, without re-scoring anything.
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, update, bindparam, or_
+
+import aggregates
+import question_sentiment
+import rollups
+import sentiment
+import trends
+from models import db, FEEDBACK_MODELS, OPEN_FIELDS, RescoreCheckpoint
+from sentiment_queue import PENDING_LABEL
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Labels the CSV upload routes stored before labels were unified
+LEGACY_LABELS = {label.capitalize(): label for label in trends.SENTIMENT_LABELS}
+
+
+def lowercase_labels():
+    """Rewrite capitalized sentiment labels in lowercase; returns the rows changed.
+
+    The answer counts and rollups counted the old spellings as answers of
+    their own, so they are rebuilt when anything changed. Trends already
+    fold the case (trends.normalize_label).
+    """
+    changed = 0
+    for model in FEEDBACK_MODELS.values():
+        table = model.__table__
+        for legacy, label in LEGACY_LABELS.items():
+            changed += db.session.execute(
+                update(table).where(table.c.sentiment_label == legacy).values(sentiment_label=label)
+            ).rowcount
+    db.session.commit()
+    if changed:
+        aggregates.rebuild()
+        rollups.rebuild()
+    return changed
+
+
+def start_checkpoint(respondent_type, restart=False):
+    """The checkpoint to continue from; a finished (or restarted) run starts over."""
+    checkpoint = db.session.get(RescoreCheckpoint, respondent_type)
+    if checkpoint is None:
+        checkpoint = RescoreCheckpoint(respondent_type=respondent_type)
+        db.session.add(checkpoint)
+    if restart or checkpoint.finished_at is not None or checkpoint.last_id is None:
+        checkpoint.last_id = 0
+        checkpoint.rows_processed = 0
+        checkpoint.rows_changed = 0
+        checkpoint.started_at = datetime.utcnow()
+        checkpoint.finished_at = None
+    db.session.commit()
+    return checkpoint
+
+
+def rescore(respondent_type, batch_size=DEFAULT_BATCH_SIZE, max_workers=None, restart=False,
+            pause=0.0, progress=None):
+    """Re-score one feedback table. progress, if given, is called with the checkpoint after each batch."""
+    table = FEEDBACK_MODELS[respondent_type].__table__
+    group_field = rollups.GROUP_FIELDS[respondent_type]
+    columns = [table.c.id, table.c.created_at, table.c[group_field], table.c.sentiment_polarity,
+               table.c.sentiment_subjectivity, table.c.sentiment_label] + [table.c[field] for field in OPEN_FIELDS]
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('row_id'))
+        .values(sentiment_polarity=bindparam('polarity'), sentiment_subjectivity=bindparam('subjectivity'),
+                sentiment_label=bindparam('label'))
+    )
+
+    checkpoint = start_checkpoint(respondent_type, restart)
+    while True:
+        rows = db.session.execute(
+            select(*columns)
+            .where(table.c.id > checkpoint.last_id,
+                   or_(table.c.sentiment_label.is_(None), table.c.sentiment_label != PENDING_LABEL))
+            .order_by(table.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+
+        answer_scores = sentiment.answer_scores([[row[field] for field in OPEN_FIELDS] for row in rows],
+                                                max_workers=max_workers)
+        changes = []
+        counts = Counter()
+        rollup_counts = Counter()
+        buckets = defaultdict(dict)
+        for row, scores in zip(rows, answer_scores):
+            polarity, subjectivity, label = sentiment.combine(scores)
+            if (polarity, subjectivity, label) == (row['sentiment_polarity'], row['sentiment_subjectivity'],
+                                                   row['sentiment_label']):
+                continue
+            changes.append({'row_id': row['id'], 'polarity': polarity, 'subjectivity': subjectivity, 'label': label})
+            aggregates.count_sentiment_change(row['sentiment_label'], label, counts)
+            rollups.count_sentiment_change(respondent_type, row, row['sentiment_label'], label, rollup_counts)
+            trends.count_record(row, buckets, sign=-1)
+            trends.count_record(dict(row, sentiment_polarity=polarity, sentiment_label=label), buckets)
+
+        if changes:
+            db.session.execute(statement, changes)
+            aggregates.apply_counts(respondent_type, counts)
+            rollups.apply_counts(respondent_type, rollup_counts)
+            trends.apply_buckets(respondent_type, buckets)
+        ids = [row['id'] for row in rows]
+        question_sentiment.clear(respondent_type, ids)
+        question_sentiment.write(respondent_type, zip(ids, answer_scores))
+
+        checkpoint.last_id = ids[-1]
+        checkpoint.rows_processed += len(rows)
+        checkpoint.rows_changed += len(changes)
+        checkpoint.updated_at = datetime.utcnow()
+        db.session.commit()
+
+        if progress is not None:
+            progress(checkpoint)
+        if pause:
+            # Leave the database to live submissions for a moment
+            time.sleep(pause)
+
+    checkpoint.finished_at = datetime.utcnow()
+    db.session.commit()
+    return checkpoint
@@ -0,0 +1,182 @@
+"""
+Per-class and per-subject answer counts for the breakdown API.
+
+The feedback_rollup table holds one count per (respondent type, question,
+period, period start, class/subject, answer), where the period is all-time,
+a day or an ISO week (starting Monday) of created_at. Like the dashboard
+aggregates it is updated in the same transaction as the feedback rows, so a
+breakdown reads a few small rows however many responses there are.
+`flask rebuild-aggregates` recomputes it from scratch.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, delete
+
+import aggregates
+from models import db, FEEDBACK_MODELS, FeedbackRollup
+
+# Column each respondent type is broken down by
+GROUP_FIELDS = {
+    'student': 'student_class',
+    'teacher': 'teacher_subject',
+}
+RESPONDENT_TYPES_BY_GROUP = {field: respondent_type for respondent_type, field in GROUP_FIELDS.items()}
+
+# Questions that can be broken down, including the response total
+QUESTIONS = aggregates.AGGREGATED_FIELDS + (aggregates.TOTAL_QUESTION,)
+
+PERIODS = ('all', 'day', 'week')
+# period_start used for the all-time counts (part of the primary key, so not NULL)
+ALL_TIME = date(1970, 1, 1)
+
+KEY_COLUMNS = ('respondent_type', 'question', 'period', 'period_start', 'group_value', 'answer')
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def parse_day(value):
+    """Parse a YYYY-MM-DD query parameter; None when empty. Raises ValueError."""
+    if not value:
+        return None
+    return date.fromisoformat(value)
+
+
+def parse_range(start, end):
+    """(start, end) dates from the from/to query parameters, either one optional.
+
+    Raises ValueError, with a message for the API response, for a bad date
+    or a start after the end.
+    """
+    try:
+        start, end = parse_day(start), parse_day(end)
+    except ValueError:
+        raise ValueError('from and to must be dates (YYYY-MM-DD)')
+    if start and end and start > end:
+        raise ValueError('from must not be after to')
+    return start, end
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def period_starts(created_at):
+    day = created_at.date()
+    return (('all', ALL_TIME), ('day', day), ('week', week_start(day)))
+
+
+def count_record(respondent_type, values, counter=None):
+    """Add one feedback row (a dict of column values) to a Counter of rollup keys."""
+    if counter is None:
+        counter = Counter()
+    group = values.get(GROUP_FIELDS[respondent_type]) or ''
+    answers = [(aggregates.TOTAL_QUESTION, aggregates.TOTAL_ANSWER)]
+    answers += [(field, values.get(field)) for field in aggregates.AGGREGATED_FIELDS if values.get(field)]
+    for period, start in period_starts(values.get('created_at') or datetime.utcnow()):
+        for question, answer in answers:
+            counter[(question, period, start, group, answer)] += 1
+    return counter
+
+
+def apply_counts(respondent_type, counter):
+    """Add a Counter from count_record() to the rollup table, in the caller's transaction."""
+    aggregates.increment(FeedbackRollup.__table__, KEY_COLUMNS, {
+        (respondent_type,) + key: {'count': delta} for key, delta in counter.items()
+    })
+
+
+def record_rows(respondent_type, rows):
+    """Count new feedback rows given as dicts of column values (created_at included)."""
+    counter = Counter()
+    for values in rows:
+        count_record(respondent_type, values, counter)
+    apply_counts(respondent_type, counter)
+
+
+def record_feedback(respondent_type, feedback):
+    if feedback.created_at is None:
+        # Set it now so the rollup bucket and the stored row agree
+        feedback.created_at = datetime.utcnow()
+    fields = aggregates.AGGREGATED_FIELDS + (GROUP_FIELDS[respondent_type], 'created_at')
+    record_rows(respondent_type, [{field: getattr(feedback, field) for field in fields}])
+
+
+def count_sentiment_change(respondent_type, values, old_label, new_label, counter=None):
+    """Add a change of one row's sentiment label (values holding its group and created_at) to a Counter."""
+    if counter is None:
+        counter = Counter()
+    if old_label == new_label:
+        return counter
+    group = values.get(GROUP_FIELDS[respondent_type]) or ''
+    for period, start in period_starts(values.get('created_at') or datetime.utcnow()):
+        if old_label:
+            counter[('sentiment_label', period, start, group, old_label)] -= 1
+        if new_label:
+            counter[('sentiment_label', period, start, group, new_label)] += 1
+    return counter
+
+
+def record_sentiment_change(respondent_type, feedback, old_label, new_label):
+    values = {GROUP_FIELDS[respondent_type]: getattr(feedback, GROUP_FIELDS[respondent_type]),
+              'created_at': feedback.created_at}
+    apply_counts(respondent_type, count_sentiment_change(respondent_type, values, old_label, new_label))
+
+
+def breakdown_query(respondent_type, question, period='all', start=None, end=None, group=None):
+    query = (
+        select(FeedbackRollup.period_start, FeedbackRollup.group_value, FeedbackRollup.answer, FeedbackRollup.count)
+        .where(FeedbackRollup.respondent_type == respondent_type,
+               FeedbackRollup.question == question,
+               FeedbackRollup.period == period,
+               FeedbackRollup.count > 0)
+        .order_by(FeedbackRollup.period_start, FeedbackRollup.group_value, FeedbackRollup.answer)
+    )
+    if period != 'all':
+        if start is not None:
+            # Include the bucket the start date falls in
+            query = query.where(FeedbackRollup.period_start >= (week_start(start) if period == 'week' else start))
+        if end is not None:
+            query = query.where(FeedbackRollup.period_start <= end)
+    if group is not None:
+        query = query.where(FeedbackRollup.group_value == group)
+    return query
+
+
+def breakdown(respondent_type, question, period='all', start=None, end=None, group=None):
+    """Return {period_start: {group: {answer: count}}} from the rollup table."""
+    result = {}
+    query = breakdown_query(respondent_type, question, period, start, end, group)
+    for period_start, group_value, answer, count in db.session.execute(query):
+        result.setdefault(period_start, {}).setdefault(group_value, {})[answer] = count
+    return result
+
+
+def rebuild():
+    """Recompute every rollup from the feedback tables."""
+    db.session.execute(delete(FeedbackRollup))
+    for respondent_type, model in FEEDBACK_MODELS.items():
+        table = model.__table__
+        fields = aggregates.AGGREGATED_FIELDS + (GROUP_FIELDS[respondent_type], 'created_at')
+        columns = [table.c[field] for field in fields]
+        counter = Counter()
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, *columns).where(table.c.id > last_id).order_by(table.c.id).limit(REBUILD_BATCH_SIZE)
+            ).mappings().all()
+            if not rows:
+                break
+            for row in rows:
+                count_record(respondent_type, row, counter)
+            last_id = rows[-1]['id']
+        apply_counts(respondent_type, counter)
+    db.session.commit()
+
+
+def ensure_built():
+    # Existing databases start with an empty rollup table
+    if db.session.execute(select(FeedbackRollup.question).limit(1)).first() is not None:
+        return
+    if any(db.session.execute(select(model.id).limit(1)).first() for model in FEEDBACK_MODELS.values()):
+        rebuild()
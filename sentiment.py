@@ -0,0 +1,158 @@
+"""
+Sentiment scoring for feedback answers.
+
+A response's open-ended answers are scored one answer at a time by the
+configured engine (see sentiment_engines.py): polarity and subjectivity
+are averages over the sentiment-bearing phrases ("assessments") found, so
+the per-answer sums combine into the score of the whole response.
+Distinct answers are looked up in a SentimentCache first, so repeated
+answers are scored once. Labels are always lowercase.
+
+For CSV imports, the answers that still need scoring are split into chunks
+and scored across a process pool sized to the machine's cores. Results
+always come back in the same order as the input, so imports stay
+deterministic. On a single core, for small batches, or with an engine
+cheaper than the trip to a worker (lexicon), everything is scored
+in-process.
+"""
+import math
+import os
+from functools import partial
+
+from sentiment_cache import SentimentCache, normalize_text
+from sentiment_engines import get_engine
+from spawn_pool import SpawnPool
+
+# Below this many answers a process pool costs more than it saves
+MIN_PARALLEL_ROWS = 200
+
+_pool = SpawnPool()
+
+# Polarity above/below which a response counts as positive/negative
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+engine = get_engine('textblob')
+cache = SentimentCache(namespace=engine.name)
+
+
+def configure_engine(name='textblob'):
+    """Select the scoring engine (SENTIMENT_ENGINE); cached scores are kept per engine."""
+    global engine
+    engine = get_engine(name)
+    cache.namespace = engine.name
+
+
+def configure_thresholds(positive=0.1, negative=-0.1):
+    """Set the label cut-offs (SENTIMENT_POSITIVE_THRESHOLD / SENTIMENT_NEGATIVE_THRESHOLD)."""
+    global POSITIVE_THRESHOLD, NEGATIVE_THRESHOLD
+    if negative > positive:
+        raise ValueError('The negative sentiment threshold must not be above the positive one')
+    POSITIVE_THRESHOLD = positive
+    NEGATIVE_THRESHOLD = negative
+
+
+def configure_cache(max_entries=10000, db_path=None):
+    """Replace the answer cache (SENTIMENT_CACHE_SIZE / SENTIMENT_CACHE_PATH)."""
+    global cache
+    cache = SentimentCache(max_entries=max_entries, db_path=db_path, namespace=engine.name)
+
+
+def assess(text):
+    """(polarity sum, subjectivity sum, number of assessments) for one answer."""
+    return engine.assess(text)
+
+
+def label_for(polarity):
+    if polarity > POSITIVE_THRESHOLD:
+        return 'positive'
+    if polarity < NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+def answer_sentiment(score):
+    """(polarity, subjectivity) of a single answer from its assess() result."""
+    polarity_sum, subjectivity_sum, count = score
+    if not count:
+        return 0.0, 0.0
+    return polarity_sum / count, subjectivity_sum / count
+
+
+def combine(scores):
+    """Turn the assess() results of a response's answers into (polarity, subjectivity, label).
+
+    Blank answers (None) are skipped; a response with no answers, or none
+    that carry sentiment, is neutral with 0.0 polarity and subjectivity.
+    """
+    scores = [score for score in scores if score is not None]
+    count = sum(score[2] for score in scores)
+    if not count:
+        return 0.0, 0.0, 'neutral'
+    polarity = sum(score[0] for score in scores) / count
+    return polarity, sum(score[1] for score in scores) / count, label_for(polarity)
+
+
+def _score_chunk(engine_name, texts):
+    # Pool workers are spawned, so they look the engine up by name
+    return get_engine(engine_name).assess_many(texts)
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _assess_many(texts, chunk_size=None, max_workers=None):
+    if max_workers is None:
+        max_workers = default_workers()
+
+    if max_workers <= 1 or len(texts) < MIN_PARALLEL_ROWS or not engine.parallel:
+        return engine.assess_many(texts)
+
+    if chunk_size is None:
+        # A few chunks per worker evens out answers of different lengths
+        chunk_size = max(1, math.ceil(len(texts) / (max_workers * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+    results = []
+    # executor.map yields chunk results in submission order
+    for chunk_result in _pool.get(max_workers).map(partial(_score_chunk, engine.name), chunks):
+        results.extend(chunk_result)
+    return results
+
+
+def answer_scores(answer_lists, chunk_size=None, max_workers=None):
+    """assess() results for each answer of each response (None for blanks), via the cache."""
+    key_lists = []
+    texts = {}
+    lookups = []
+    for answers in answer_lists:
+        keys = []
+        for answer in answers:
+            text = normalize_text(answer)
+            if not text:
+                keys.append(None)
+                continue
+            key = cache.key(text)
+            texts.setdefault(key, text)
+            keys.append(key)
+            lookups.append(key)
+        key_lists.append(keys)
+
+    scores = cache.get_many(lookups)
+    missing = [key for key in texts if key not in scores]
+    if missing:
+        new = dict(zip(missing, _assess_many([texts[key] for key in missing], chunk_size, max_workers)))
+        cache.set_many(new)
+        scores.update(new)
+    return [[scores[key] if key is not None else None for key in keys] for keys in key_lists]
+
+
+def score_answers(answers):
+    """Score one response's open-ended answers: (polarity, subjectivity, label)."""
+    return combine(answer_scores([answers], max_workers=1)[0])
+
+
+def score_batch(answer_lists, chunk_size=None, max_workers=None):
+    """Score many responses (each a list of answers), returning (polarity, subjectivity, label) in input order."""
+    return [combine(scores) for scores in answer_scores(list(answer_lists), chunk_size, max_workers)]
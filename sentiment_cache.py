@@ -0,0 +1,146 @@
+"""
+Cache for sentiment scores of individual open-ended answers.
+
+Many answers repeat word for word ("Exams are fair", "Need more lab
+facilities"), so each distinct answer is scored once. Entries are keyed by
+a SHA-1 of the scoring engine's name and the answer text (lowercased, with
+whitespace collapsed, which the scorer ignores anyway). A bounded LRU lives
+in each process; an optional SQLite file keeps scores across restarts and
+shares them between gunicorn workers.
+
+Each entry holds the sums of the polarity and subjectivity of the answer's
+sentiment assessments and how many there were, so scores of several
+answers can be combined into one.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+
+# Keys per SELECT ... IN (...), well under SQLite's bound parameter limit
+_LOOKUP_BATCH_SIZE = 500
+
+
+def normalize_text(text):
+    return ' '.join((text or '').lower().split())
+
+
+class SentimentCache:
+    def __init__(self, max_entries=10000, db_path=None, namespace='textblob'):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text):
+        return hashlib.sha1(f'{self.namespace}\0{normalize_text(text)}'.encode()).hexdigest()
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads or forks
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sentiment_cache ('
+                'key TEXT PRIMARY KEY, polarity_sum REAL NOT NULL, '
+                'subjectivity_sum REAL NOT NULL, assessments INTEGER NOT NULL)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _remember(self, scores):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for key, score in scores.items():
+                self._entries[key] = score
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys):
+        """Return {key: score} for the keys that are cached.
+
+        keys may repeat; the statistics count every occurrence, and repeats
+        of a key that is not cached count as hits since the caller scores
+        it only once.
+        """
+        occurrences = Counter(keys)
+        found = {}
+        with self._lock:
+            for key in occurrences:
+                score = self._entries.get(key)
+                if score is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = score
+            self.hits += sum(occurrences[key] for key in found)
+
+        missing = [key for key in occurrences if key not in found]
+        if self.db_path and missing:
+            from_db = {}
+            try:
+                connection = self._connection()
+                for start in range(0, len(missing), _LOOKUP_BATCH_SIZE):
+                    batch = missing[start:start + _LOOKUP_BATCH_SIZE]
+                    rows = connection.execute(
+                        'SELECT key, polarity_sum, subjectivity_sum, assessments FROM sentiment_cache '
+                        f"WHERE key IN ({','.join('?' * len(batch))})", batch
+                    )
+                    from_db.update((key, tuple(score)) for key, *score in rows)
+            except sqlite3.Error as e:
+                print(f"Error reading sentiment cache: {e}")
+            if from_db:
+                self._remember(from_db)
+                found.update(from_db)
+            with self._lock:
+                self.db_hits += sum(occurrences[key] for key in from_db)
+            missing = [key for key in missing if key not in from_db]
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += sum(occurrences[key] - 1 for key in missing)
+        return found
+
+    def set_many(self, scores):
+        """Store {key: (polarity_sum, subjectivity_sum, assessments)}."""
+        if not scores:
+            return
+        self._remember(scores)
+        if self.db_path:
+            try:
+                connection = self._connection()
+                with connection:
+                    connection.executemany(
+                        'INSERT OR IGNORE INTO sentiment_cache VALUES (?, ?, ?, ?)',
+                        [(key,) + tuple(score) for key, score in scores.items()],
+                    )
+            except sqlite3.Error as e:
+                print(f"Error writing sentiment cache: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.db_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.db_hits) / lookups, 4) if lookups else None,
+                'db_path': self.db_path,
+            }
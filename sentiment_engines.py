@@ -0,0 +1,167 @@
+"""
+Sentiment engines that score a single open-ended answer.
+
+Every code path scores answers through sentiment.py, which hands the text
+to the engine chosen by SENTIMENT_ENGINE. An engine's assess() returns the
+sums of the polarity and subjectivity of the answer's sentiment
+assessments and how many there were, so answers combine into the score of
+a whole response (see sentiment.combine()).
+
+textblob  TextBlob's pattern analyzer, exactly as TextBlob(text).sentiment
+          scores a text.
+lexicon   The same word list and negation/intensifier rules, compiled once
+          into a flat {word: (polarity, subjectivity, intensity, adverb)}
+          table and applied over a single regex tokenization. Several times
+          the throughput of the textblob engine; scores differ only where
+          the two tokenizers split a text differently.
+"""
+import re
+import threading
+
+# Words that flip the polarity of the next sentiment word ("not good")
+NEGATIONS = ('no', 'not', "n't", 'never')
+
+
+class SentimentEngine:
+    """Scores one answer at a time; subclasses set name and implement assess()."""
+
+    name = None
+    # Whether batches are worth sending to the process pool in sentiment.py
+    parallel = True
+
+    def assess(self, text):
+        """(polarity sum, subjectivity sum, number of assessments) for one answer."""
+        raise NotImplementedError
+
+    def assess_many(self, texts):
+        return [self.assess(text) for text in texts]
+
+
+class TextBlobEngine(SentimentEngine):
+    name = 'textblob'
+
+    def assess(self, text):
+        # TextBlob is only imported by processes that score with it
+        from textblob.en.sentiments import pattern_sentiment
+
+        assessments = pattern_sentiment(text).assessments
+        return (
+            sum(polarity for _, polarity, _, _ in assessments),
+            sum(subjectivity for _, _, subjectivity, _ in assessments),
+            len(assessments),
+        )
+
+
+class LexiconEngine(SentimentEngine):
+    name = 'lexicon'
+    # Scoring an answer costs less than shipping it to another process
+    parallel = False
+
+    def __init__(self):
+        self._table = None
+        self._emoticons = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    def compile(self):
+        """Build the word table from TextBlob's sentiment lexicon, once per process."""
+        with self._lock:
+            if self._table is not None:
+                return
+            from textblob._text import EMOTICONS
+            from textblob.en.sentiments import pattern_sentiment
+
+            if not len(pattern_sentiment):
+                pattern_sentiment.load()
+            # Scores averaged over every part of speech, as pattern uses them for plain text;
+            # words with an adverb sense modify the word after them ("very good")
+            table = {
+                word: (float(scores[None][0]), float(scores[None][1]), float(scores[None][2]), 'RB' in scores)
+                for word, scores in pattern_sentiment.items()
+                if ' ' not in word
+            }
+            emoticons = {}
+            for (_, polarity), faces in EMOTICONS.items():
+                for face in faces:
+                    emoticons.setdefault(face.lower(), polarity)
+
+            faces = '|'.join(re.escape(face) for face in sorted(emoticons, key=len, reverse=True))
+            self._token = re.compile(rf"{faces}|!|\.\.\.|n't|[^\W_]+(?:[-*][^\W_]+)*")
+            self._emoticons = emoticons
+            self._table = table
+
+    def tokens(self, text):
+        if self._table is None:
+            self.compile()
+        # "don't" -> "do n't", as pattern's tokenizer splits contractions
+        return self._token.findall(text.lower().replace("n't", " n't"))
+
+    def assess(self, text):
+        table = self._table
+        if table is None:
+            self.compile()
+            table = self._table
+        emoticons = self._emoticons
+
+        # Each assessment is [polarity, subjectivity, intensity, negated]
+        assessments = []
+        modifier = None
+        negation = None
+        for word in self.tokens(text):
+            entry = table.get(word)
+            if entry is not None:
+                polarity, subjectivity, intensity, adverb = entry
+                if modifier is None:
+                    current = [polarity, subjectivity, intensity, False]
+                    assessments.append(current)
+                else:
+                    # "really good": the adverb's intensity scales the word
+                    current = assessments[-1]
+                    current[0] = max(-1.0, min(polarity * current[2], 1.0))
+                    current[1] = max(-1.0, min(subjectivity * current[2], 1.0))
+                    current[2] = intensity
+                if negation is not None:
+                    current[2] = 1.0 / current[2]
+                    current[3] = True
+                modifier = word if adverb else None
+                negation = word if word in NEGATIONS else None
+                continue
+
+            if word in NEGATIONS:
+                negation = word
+            elif negation and len(word) > 1:
+                # Negation carries across short words only ("not a good")
+                negation = None
+            if negation is not None and modifier is not None and modifier.endswith('ly'):
+                # "really not good"
+                assessments[-1][3] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            if word == '!':
+                if assessments:
+                    assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+            elif word in emoticons:
+                assessments.append([emoticons[word], 1.0, 1.0, False])
+
+        polarity_sum = 0.0
+        subjectivity_sum = 0.0
+        for polarity, subjectivity, _, negated in assessments:
+            # "not good" is slightly bad, "not bad" slightly good
+            polarity_sum += polarity * -0.5 if negated else polarity
+            subjectivity_sum += subjectivity
+        return polarity_sum, subjectivity_sum, len(assessments)
+
+
+ENGINES = {engine.name: engine for engine in (TextBlobEngine, LexiconEngine)}
+
+_instances = {}
+
+
+def get_engine(name):
+    """The shared engine instance for a SENTIMENT_ENGINE name."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown sentiment engine {name!r}, expected one of: {', '.join(ENGINES)}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
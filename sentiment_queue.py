@@ -0,0 +1,230 @@
+"""
+Background sentiment analysis for feedback submissions.
+
+Submissions are saved straight away with a 'pending' sentiment label and a
+row in the sentiment_task table. A small pool of worker threads picks the
+tasks up, scores the open-ended answers and writes the result back to the
+feedback row. Because the queue lives in the database, anything still
+queued when the process stops is picked up again on the next start.
+
+Set SENTIMENT_MODE=sync to score inline on the request instead (useful for
+tests and single-user setups).
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, func, or_
+
+import aggregates
+import question_sentiment
+import rollups
+import trends
+from models import db, FEEDBACK_MODELS, OPEN_FIELDS, SentimentTask
+
+PENDING_LABEL = 'pending'
+MAX_ATTEMPTS = 3
+
+
+def open_responses_of(feedback):
+    return [getattr(feedback, field) for field in OPEN_FIELDS]
+
+
+class SentimentWorkerPool:
+    def __init__(self, app=None, score_func=None):
+        self.app = None
+        self.score_func = score_func
+        self.mode = 'sync'
+        self.workers = 0
+        self.poll_interval = 1.0
+        self.task_timeout = 300
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._pid = None
+
+        # Per-process counters for the metrics endpoint
+        self.processed = 0
+        self.errors = 0
+        self.total_lag = 0.0
+        self.last_lag = None
+
+        if app is not None:
+            self.init_app(app, score_func)
+
+    def init_app(self, app, score_func=None):
+        self.app = app
+        if score_func is not None:
+            self.score_func = score_func
+        self.mode = app.config.get('SENTIMENT_MODE', 'async')
+        self.workers = int(app.config.get('SENTIMENT_WORKERS', 2))
+        self.poll_interval = float(app.config.get('SENTIMENT_POLL_INTERVAL', 1.0))
+        self.task_timeout = int(app.config.get('SENTIMENT_TASK_TIMEOUT', 300))
+
+    @property
+    def is_async(self):
+        return self.mode == 'async' and self.workers > 0
+
+    def prepare(self, feedback, open_responses):
+        """Fill in the sentiment columns of a new feedback row without touching the session.
+
+        Scores right away in sync mode; in async mode marks the row pending
+        and returns True, meaning a task must be queued once it has an id.
+        """
+        if not self.is_async:
+            polarity, subjectivity, label = self.score_func(open_responses)
+            feedback.sentiment_polarity = polarity
+            feedback.sentiment_subjectivity = subjectivity
+            feedback.sentiment_label = label
+            return False
+
+        feedback.sentiment_polarity = None
+        feedback.sentiment_subjectivity = None
+        feedback.sentiment_label = PENDING_LABEL
+        return True
+
+    def submit(self, respondent_type, feedback, open_responses):
+        """Attach sentiment to a new feedback row inside the caller's transaction.
+
+        In sync mode the row is scored right away. In async mode it is marked
+        pending and a task is queued; the caller commits both together and
+        then calls wake().
+        """
+        if not self.prepare(feedback, open_responses):
+            db.session.add(feedback)
+            question_sentiment.record_feedback(respondent_type, feedback)
+            return
+
+        db.session.add(feedback)
+        db.session.flush()  # need the feedback id for the task row
+        db.session.add(SentimentTask(respondent_type=respondent_type, feedback_id=feedback.id))
+
+    def wake(self):
+        if self.is_async:
+            self.ensure_started()
+            self._wakeup.set()
+
+    def ensure_started(self):
+        # Threads do not survive a fork, so restart them when running in a
+        # new process (e.g. gunicorn workers forked from a preloaded master).
+        if not self.is_async or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'sentiment-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+
+    def _worker_loop(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    worked = self.run_pending(limit=50)
+            except Exception as e:
+                print(f"Error in sentiment worker: {e}")
+                worked = 0
+            if not worked:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claimable(self):
+        stale_before = datetime.utcnow() - timedelta(seconds=self.task_timeout)
+        return or_(
+            SentimentTask.status == 'pending',
+            (SentimentTask.status == 'running') & (SentimentTask.claimed_at < stale_before),
+        )
+
+    def _claim_task(self):
+        # Claim with a guarded UPDATE so two workers (or two gunicorn
+        # processes) never score the same task.
+        while True:
+            task_id = db.session.execute(
+                select(SentimentTask.id).where(self._claimable()).order_by(SentimentTask.id).limit(1)
+            ).scalar()
+            if task_id is None:
+                db.session.rollback()
+                return None
+
+            result = db.session.execute(
+                update(SentimentTask)
+                .where(SentimentTask.id == task_id, self._claimable())
+                .values(status='running', claimed_at=datetime.utcnow(), attempts=SentimentTask.attempts + 1)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return task_id
+
+    def process_task(self, task_id):
+        task = db.session.get(SentimentTask, task_id)
+        if task is None:
+            return
+        try:
+            feedback = db.session.get(FEEDBACK_MODELS[task.respondent_type], task.feedback_id)
+            if feedback is not None:
+                polarity, subjectivity, label = self.score_func(open_responses_of(feedback))
+                aggregates.record_sentiment_change(task.respondent_type, feedback.sentiment_label, label)
+                rollups.record_sentiment_change(task.respondent_type, feedback, feedback.sentiment_label, label)
+                trends.record_sentiment_change(task.respondent_type, feedback, polarity, label)
+                feedback.sentiment_polarity = polarity
+                feedback.sentiment_subjectivity = subjectivity
+                feedback.sentiment_label = label
+                question_sentiment.record_feedback(task.respondent_type, feedback)
+
+            lag = (datetime.utcnow() - task.enqueued_at).total_seconds()
+            db.session.delete(task)
+            db.session.commit()
+
+            with self._lock:
+                self.processed += 1
+                self.total_lag += lag
+                self.last_lag = lag
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error scoring sentiment task {task_id}: {e}")
+            with self._lock:
+                self.errors += 1
+            status = 'failed' if task.attempts >= MAX_ATTEMPTS else 'pending'
+            db.session.execute(update(SentimentTask).where(SentimentTask.id == task_id).values(status=status))
+            db.session.commit()
+
+    def run_pending(self, limit=None):
+        """Score queued tasks in the current thread. Returns how many were handled."""
+        handled = 0
+        while limit is None or handled < limit:
+            task_id = self._claim_task()
+            if task_id is None:
+                break
+            self.process_task(task_id)
+            handled += 1
+        return handled
+
+    def metrics(self):
+        counts = dict(db.session.execute(
+            select(SentimentTask.status, func.count()).group_by(SentimentTask.status)
+        ).all())
+        oldest = db.session.execute(
+            select(func.min(SentimentTask.enqueued_at)).where(SentimentTask.status != 'failed')
+        ).scalar()
+
+        with self._lock:
+            processed = self.processed
+            avg_lag = self.total_lag / processed if processed else None
+            return {
+                'mode': 'async' if self.is_async else 'sync',
+                'workers': self.workers if self.is_async else 0,
+                'workers_alive': sum(1 for t in self._threads if t.is_alive()) if self._pid == os.getpid() else 0,
+                'queue_depth': counts.get('pending', 0) + counts.get('running', 0),
+                'pending': counts.get('pending', 0),
+                'running': counts.get('running', 0),
+                'failed': counts.get('failed', 0),
+                'oldest_task_age_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+                'processed': processed,
+                'errors': self.errors,
+                'avg_lag_seconds': avg_lag,
+                'last_lag_seconds': self.last_lag,
+            }
@@ -0,0 +1,42 @@
+"""
+Process pools for the CPU-bound work kept out of the request threads:
+chart rendering (chart_renderer.py) and parallel sentiment scoring
+(sentiment.py).
+
+Each process gets its own pool, started with the 'spawn' method.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class SpawnPool:
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._workers = None
+        self._lock = threading.Lock()
+
+    def get(self, max_workers):
+        """The pool of this process, (re)built on first use, after a fork or for a new size."""
+        with self._lock:
+            # A pool inherited through fork is unusable, so build a fresh one per process
+            if self._executor is None or self._pid != os.getpid() or self._workers != max_workers:
+                if self._executor is not None and self._pid == os.getpid():
+                    self._executor.shutdown(wait=False)
+                # 'spawn' keeps the children clear of locks held by the parent's threads.
+                # Spawned children re-import the main script, which must not start the
+                # app again there (app.py checks for __mp_main__; gunicorn's is harmless)
+                self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+                self._workers = max_workers
+            return self._executor
+
+    def discard(self, executor):
+        """Drop a broken pool; the next get() builds a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
@@ -0,0 +1,110 @@
+// Draws the dashboard bar charts from /admin/api/charts/<name> as inline SVG
+// (DASHBOARD_CHART_MODE=client), so the server only sends the counts.
+(function() {
+    'use strict';
+
+    const SVG_NS = 'http://www.w3.org/2000/svg';
+    const WIDTH = 640;
+    const HEIGHT = 480;
+    const MARGIN = {top: 48, right: 16, bottom: 72, left: 56};
+
+    function element(name, attributes, text) {
+        const node = document.createElementNS(SVG_NS, name);
+        Object.entries(attributes || {}).forEach(([key, value]) => node.setAttribute(key, value));
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    // About five round steps for the count axis
+    function tickStep(max) {
+        const rough = max / 5;
+        const magnitude = Math.pow(10, Math.floor(Math.log10(rough || 1)));
+        const step = [1, 2, 5, 10].map(m => m * magnitude).find(s => s >= rough);
+        return Math.max(1, step);
+    }
+
+    function draw(chart) {
+        const plotWidth = WIDTH - MARGIN.left - MARGIN.right;
+        const plotHeight = HEIGHT - MARGIN.top - MARGIN.bottom;
+        const total = chart.values.reduce((sum, value) => sum + value, 0);
+        // Room above the tallest bar for its percentage label
+        const top = Math.max(...chart.values) * 1.15 || 1;
+        const y = value => MARGIN.top + plotHeight - (value / top) * plotHeight;
+        const slot = plotWidth / chart.values.length;
+
+        const svg = element('svg', {
+            viewBox: `0 0 ${WIDTH} ${HEIGHT}`,
+            width: '100%',
+            height: '100%',
+            'font-family': 'system-ui, sans-serif',
+            'font-size': '13',
+        });
+        svg.appendChild(element('text', {x: WIDTH / 2, y: 26, 'text-anchor': 'middle', 'font-size': '16'}, chart.title));
+
+        const step = tickStep(top);
+        for (let tick = 0; tick <= top; tick += step) {
+            svg.appendChild(element('line', {
+                x1: MARGIN.left, x2: WIDTH - MARGIN.right, y1: y(tick), y2: y(tick), stroke: '#e9ecef',
+            }));
+            svg.appendChild(element('text', {x: MARGIN.left - 6, y: y(tick) + 4, 'text-anchor': 'end', fill: '#6c757d'}, tick));
+        }
+
+        chart.values.forEach((value, i) => {
+            const x = MARGIN.left + slot * i + slot * 0.1;
+            const width = slot * 0.8;
+            const bar = element('rect', {
+                x: x, y: y(value), width: width, height: MARGIN.top + plotHeight - y(value), fill: chart.colors[i],
+            });
+            bar.appendChild(element('title', {}, `${chart.labels[i]}: ${value}`));
+            svg.appendChild(bar);
+
+            const percentage = total ? (value / total * 100).toFixed(1) : '0.0';
+            svg.appendChild(element('text', {
+                x: x + width / 2, y: y(value) - 4, 'text-anchor': 'middle', 'font-weight': 'bold',
+            }, `${percentage}%`));
+
+            const labelY = MARGIN.top + plotHeight + 16;
+            const label = element('text', {x: x + width / 2, y: labelY, 'text-anchor': 'middle'}, chart.labels[i]);
+            if (chart.rotate_labels) {
+                label.setAttribute('text-anchor', 'end');
+                label.setAttribute('transform', `rotate(-45 ${x + width / 2} ${labelY})`);
+            }
+            svg.appendChild(label);
+        });
+
+        svg.appendChild(element('line', {
+            x1: MARGIN.left, x2: WIDTH - MARGIN.right, y1: y(0), y2: y(0), stroke: '#495057',
+        }));
+        svg.appendChild(element('text', {
+            x: 16, y: MARGIN.top + plotHeight / 2, 'text-anchor': 'middle',
+            transform: `rotate(-90 16 ${MARGIN.top + plotHeight / 2})`,
+        }, 'Count'));
+        if (!chart.rotate_labels) {
+            svg.appendChild(element('text', {x: WIDTH / 2, y: HEIGHT - 16, 'text-anchor': 'middle'}, chart.xlabel));
+        }
+        return svg;
+    }
+
+    function showUnavailable(container) {
+        container.innerHTML = '<div class="d-flex align-items-center justify-content-center h-100 text-muted"><div class="text-center"><i class="fs-1">📊</i><p class="mt-2 mb-0">Chart unavailable</p><small>Try refreshing</small></div></div>';
+    }
+
+    document.querySelectorAll('[data-chart-url]').forEach(container => {
+        fetch(container.dataset.chartUrl, {headers: {'Accept': 'application/json'}, credentials: 'same-origin'})
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(chart => {
+                container.replaceChildren(draw(chart));
+            })
+            .catch(error => {
+                console.log('Chart loading failed, showing fallback', error);
+                showUnavailable(container);
+            });
+    });
+})();
@@ -0,0 +1,277 @@
+"""
+Group commit for feedback form submissions.
+
+Normally every submission is its own transaction, i.e. one fsync per form.
+With GROUP_COMMIT enabled, request threads hand their rows to an in-process
+bounded buffer instead; a flusher thread writes everything that arrived
+within GROUP_COMMIT_INTERVAL_MS (or GROUP_COMMIT_MAX_ROWS rows, whichever
+comes first) as one multi-row insert in one transaction.
+
+GROUP_COMMIT_DURABILITY decides when the request returns:
+  commit    wait until the batch holding the row has committed (default);
+            a failed write is reported to that request only, and a row
+            still queued after GROUP_COMMIT_TIMEOUT is withdrawn, so a
+            timed-out form can safely be submitted again
+  buffered  return as soon as the row is queued; rows still in the buffer
+            are lost if the process dies before the next flush
+
+Batching only helps when one process serves several requests at once, e.g.
+gunicorn with --threads.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert
+
+import aggregates
+import normalized
+import question_sentiment
+import rollups
+import trends
+from models import db, FEEDBACK_MODELS, SentimentTask
+
+DURABILITY_MODES = ('commit', 'buffered')
+
+
+class BufferFullError(Exception):
+    pass
+
+
+def feedback_values(model, feedback):
+    """Column values of an unsaved feedback row, for a Core insert."""
+    values = {column.name: getattr(feedback, column.name)
+              for column in model.__table__.columns if column.name != 'id'}
+    if values.get('created_at') is None:
+        # Submission time, not the time the batch happens to be flushed
+        values['created_at'] = datetime.utcnow()
+    return values
+
+
+class PendingSubmission:
+    def __init__(self, respondent_type, values, needs_task):
+        self.respondent_type = respondent_type
+        self.values = values
+        self.needs_task = needs_task
+        self.done = threading.Event()
+        self.error = None
+        self.writing = False
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def claim(self):
+        """Mark the row as being written; False if its request already gave up on it."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.writing = True
+            return True
+
+    def cancel(self):
+        """Withdraw the row if it is still queued; False once the flusher has started writing it."""
+        with self._lock:
+            if self.writing:
+                return False
+            self.cancelled = True
+            return True
+
+
+class SubmissionBuffer:
+    def __init__(self, app=None, sentiment_pool=None):
+        self.app = None
+        self.sentiment_pool = sentiment_pool
+        self.enabled = False
+        self.max_rows = 100
+        self.interval = 0.01
+        self.durability = 'commit'
+        self.timeout = 30.0
+        self._queue = queue.Queue(maxsize=1000)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Per-process counters for the metrics endpoint
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self.total_flush_seconds = 0.0
+
+        if app is not None:
+            self.init_app(app, sentiment_pool)
+
+    def init_app(self, app, sentiment_pool=None):
+        self.app = app
+        if sentiment_pool is not None:
+            self.sentiment_pool = sentiment_pool
+        self.enabled = bool(app.config.get('GROUP_COMMIT', False))
+        self.max_rows = int(app.config.get('GROUP_COMMIT_MAX_ROWS', 100))
+        self.interval = int(app.config.get('GROUP_COMMIT_INTERVAL_MS', 10)) / 1000.0
+        self.durability = app.config.get('GROUP_COMMIT_DURABILITY', 'commit')
+        self.timeout = float(app.config.get('GROUP_COMMIT_TIMEOUT', 30))
+        self._queue = queue.Queue(maxsize=int(app.config.get('GROUP_COMMIT_QUEUE_SIZE', 1000)))
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"GROUP_COMMIT_DURABILITY must be one of {', '.join(DURABILITY_MODES)}")
+
+    def save(self, respondent_type, feedback, open_responses):
+        """Store a new feedback row, through the buffer when group commit is on."""
+        if not self.enabled:
+            db.session.add(feedback)
+            self.sentiment_pool.submit(respondent_type, feedback, open_responses)
+            aggregates.record_feedback(respondent_type, feedback)
+            rollups.record_feedback(respondent_type, feedback)
+            trends.record_feedback(respondent_type, feedback)
+            normalized.record_feedback(respondent_type, feedback)
+            db.session.commit()
+            self.sentiment_pool.wake()
+            return
+
+        model = FEEDBACK_MODELS[respondent_type]
+        needs_task = self.sentiment_pool.prepare(feedback, open_responses)
+        item = PendingSubmission(respondent_type, feedback_values(model, feedback), needs_task)
+
+        self.ensure_started()
+        try:
+            # Block briefly when the buffer is full, then give up rather than pile up requests
+            self._queue.put(item, timeout=self.timeout)
+        except queue.Full:
+            raise BufferFullError('Submission buffer is full')
+
+        if self.durability == 'commit':
+            if not item.done.wait(self.timeout):
+                if item.cancel():
+                    raise TimeoutError('Timed out waiting for the submission to be saved')
+                # Already part of a transaction: wait for its outcome, or a retry could store it twice
+                item.done.wait()
+            if item.error is not None:
+                raise item.error
+
+    def ensure_started(self):
+        # Threads do not survive a fork, so restart the flusher in each new process
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._flush_loop, name='submission-flusher', daemon=True)
+            self._thread.start()
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush_loop(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Error in submission flusher: {e}")
+
+    def flush(self):
+        """Write everything still buffered from the calling thread (used at exit)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(batch), self.max_rows):
+            self._write(batch[start:start + self.max_rows])
+
+    def _insert(self, batch):
+        by_type = defaultdict(list)
+        for item in batch:
+            by_type[item.respondent_type].append(item)
+
+        for respondent_type, items in by_type.items():
+            model = FEEDBACK_MODELS[respondent_type]
+            ids = db.session.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True),
+                [item.values for item in items],
+            ).scalars().all()
+
+            tasks = [{'respondent_type': respondent_type, 'feedback_id': feedback_id}
+                     for feedback_id, item in zip(ids, items) if item.needs_task]
+            if tasks:
+                db.session.execute(insert(SentimentTask), tasks)
+
+            counter = Counter()
+            for item in items:
+                aggregates.count_record(item.values, counter)
+            aggregates.apply_counts(respondent_type, counter)
+            rollups.record_rows(respondent_type, [item.values for item in items])
+            trends.record_rows(respondent_type, [item.values for item in items])
+            normalized.record_rows(respondent_type, zip(ids, (item.values for item in items)))
+            # Rows scored on submission (sync mode); the workers handle the rest
+            question_sentiment.record_rows(
+                respondent_type, [(feedback_id, item.values) for feedback_id, item in zip(ids, items) if not item.needs_task]
+            )
+
+    def _write(self, batch):
+        # Skip rows whose request timed out and withdrew them
+        batch = [item for item in batch if item.claim()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                try:
+                    self._insert(batch)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+        except Exception as e:
+            if len(batch) > 1:
+                # Retry one by one so a bad row only fails its own request
+                for item in batch:
+                    self._write([item])
+                return
+            print(f"Error saving buffered submission: {e}")
+            batch[0].error = e
+            with self._lock:
+                self.failed += 1
+        else:
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.total_flush_seconds += time.perf_counter() - started
+            self.sentiment_pool.wake()
+
+        for item in batch:
+            item.done.set()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'durability': self.durability,
+                'max_rows': self.max_rows,
+                'interval_ms': self.interval * 1000,
+                'queued': self._queue.qsize(),
+                'batches': self.batches,
+                'rows': self.rows,
+                'failed': self.failed,
+                'largest_batch': self.largest_batch,
+                'avg_batch_size': self.rows / self.batches if self.batches else None,
+                'avg_flush_ms': self.total_flush_seconds * 1000 / self.batches if self.batches else None,
+            }
@@ -0,0 +1,177 @@
+"""
+Sentiment over time for the trends API.
+
+The sentiment_trend table keeps one row per respondent type and day or ISO
+week (starting Monday) of created_at, holding the number of scored
+responses, the sum and sum of squares of their polarity and the label
+counts. Rows are updated when a response's sentiment is known: on
+submission in sync mode and for imports, otherwise when the sentiment
+worker scores it. Mean and variance per bucket follow from the sums, so a
+range query reads one small row per bucket instead of the feedback tables.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, delete
+
+import aggregates
+import rollups
+from models import db, FEEDBACK_MODELS, SentimentTrend
+
+PERIODS = ('day', 'week')
+SENTIMENT_LABELS = ('negative', 'neutral', 'positive')
+
+KEY_COLUMNS = ('respondent_type', 'period', 'period_start')
+
+REBUILD_BATCH_SIZE = 5000
+
+# Most buckets one series() call returns (about 2.7 years of days, 19 of weeks)
+MAX_BUCKETS = 1000
+
+
+def normalize_label(label):
+    """Stored sentiment label in the lowercase form of SENTIMENT_LABELS."""
+    # CSV imports used to store capitalized labels (folded on startup by rescore.lowercase_labels)
+    return label.lower() if isinstance(label, str) else label
+
+
+def _deltas(created_at, polarity, label, sign=1):
+    """Column deltas for one scored response, or None if it has no score yet."""
+    label = normalize_label(label)
+    if polarity is None or label not in SENTIMENT_LABELS:
+        return None
+    values = {'responses': sign, 'polarity_sum': sign * polarity,
+              'polarity_sumsq': sign * polarity * polarity, label: sign}
+    return [((period, start), values)
+            for period, start in rollups.period_starts(created_at or datetime.utcnow()) if period in PERIODS]
+
+
+def count_record(values, buckets, sign=1):
+    """Add (or with sign=-1 remove) one feedback row, a dict of column values,
+    to {(period, start): {column: delta}}."""
+    for key, deltas in _deltas(values.get('created_at'), values.get('sentiment_polarity'),
+                               values.get('sentiment_label'), sign) or ():
+        bucket = buckets[key]
+        for column, delta in deltas.items():
+            bucket[column] = bucket.get(column, 0) + delta
+
+
+def apply_buckets(respondent_type, buckets):
+    """Add the deltas from count_record() to the trend table, in the caller's transaction."""
+    aggregates.increment(SentimentTrend.__table__, KEY_COLUMNS, {
+        (respondent_type,) + key: deltas for key, deltas in buckets.items()
+    })
+
+
+def record_rows(respondent_type, rows):
+    """Count new feedback rows given as dicts of column values; unscored rows are skipped."""
+    buckets = defaultdict(dict)
+    for values in rows:
+        count_record(values, buckets)
+    apply_buckets(respondent_type, buckets)
+
+
+def _values(feedback):
+    return {'created_at': feedback.created_at, 'sentiment_polarity': feedback.sentiment_polarity,
+            'sentiment_label': feedback.sentiment_label}
+
+
+def record_feedback(respondent_type, feedback):
+    record_rows(respondent_type, [_values(feedback)])
+
+
+def record_sentiment_change(respondent_type, feedback, polarity, label):
+    """Move a response from its current score (if any) to a new one. Call before updating the row."""
+    buckets = defaultdict(dict)
+    old = _values(feedback)
+    count_record(old, buckets, sign=-1)
+    count_record(dict(old, sentiment_polarity=polarity, sentiment_label=label), buckets)
+    apply_buckets(respondent_type, buckets)
+
+
+def _round(value):
+    return round(value, 4)
+
+
+def _bucket(period_start, row=None):
+    responses = row.responses if row is not None else 0
+    result = {
+        'start': period_start.isoformat(),
+        'responses': responses,
+        'mean_polarity': None,
+        'variance': None,
+        'labels': {label: getattr(row, label) if row is not None else 0 for label in SENTIMENT_LABELS},
+    }
+    if responses:
+        mean = row.polarity_sum / responses
+        result['mean_polarity'] = _round(mean)
+        if responses > 1:
+            # Sample variance; clamp the rounding error of the running sums
+            variance = (row.polarity_sumsq - responses * mean * mean) / (responses - 1)
+            result['variance'] = _round(max(variance, 0.0))
+    return result
+
+
+def series(respondent_type, period='week', start=None, end=None):
+    """Buckets from start to end (dates, both optional), including empty ones.
+
+    Raises ValueError when the range holds more than MAX_BUCKETS buckets.
+    """
+    if period == 'week' and start is not None:
+        start = rollups.week_start(start)
+    query = (
+        select(SentimentTrend)
+        .where(SentimentTrend.respondent_type == respondent_type, SentimentTrend.period == period)
+        .order_by(SentimentTrend.period_start)
+    )
+    if start is not None:
+        query = query.where(SentimentTrend.period_start >= start)
+    if end is not None:
+        query = query.where(SentimentTrend.period_start <= end)
+    rows = {row.period_start: row for row in db.session.execute(query).scalars() if row.responses}
+
+    first = start if start is not None else min(rows, default=None)
+    last = end if end is not None else max(rows, default=None)
+    if first is None or last is None:
+        return [_bucket(day, row) for day, row in sorted(rows.items())]
+    if period == 'week':
+        last = rollups.week_start(last)
+    step = timedelta(days=7 if period == 'week' else 1)
+    # Counted rather than stepped past `last`, which could overflow near date.max
+    count = (last - first) // step + 1
+    if count > MAX_BUCKETS:
+        raise ValueError(f'The range covers {count} {period} buckets, more than {MAX_BUCKETS}; '
+                         f'narrow from/to or use a longer bucket')
+    return [_bucket(first + step * i, rows.get(first + step * i)) for i in range(max(count, 0))]
+
+
+def rebuild():
+    """Recompute every trend bucket from the feedback tables."""
+    db.session.execute(delete(SentimentTrend))
+    for respondent_type, model in FEEDBACK_MODELS.items():
+        table = model.__table__
+        buckets = defaultdict(dict)
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.created_at, table.c.sentiment_polarity, table.c.sentiment_label)
+                .where(table.c.id > last_id).order_by(table.c.id).limit(REBUILD_BATCH_SIZE)
+            ).mappings().all()
+            if not rows:
+                break
+            for row in rows:
+                count_record(row, buckets)
+            last_id = rows[-1]['id']
+        apply_buckets(respondent_type, buckets)
+    db.session.commit()
+
+
+def ensure_built():
+    # Existing databases start with an empty trend table
+    if db.session.execute(select(SentimentTrend.period).limit(1)).first() is not None:
+        return
+    # Only scored responses have buckets
+    if any(db.session.execute(
+        select(model.id).where(model.sentiment_label != 'pending', model.sentiment_polarity.isnot(None)).limit(1)
+    ).first() for model in FEEDBACK_MODELS.values()):
+        rebuild()
@@ -0,0 +1,24 @@
+"""
+Warm-up for gunicorn's preload_app mode (see gunicorn.conf.py).
+
+pandas, NumPy, matplotlib and the sentiment lexicon are imported lazily,
+so a worker that only serves forms never loads them. With PRELOAD_APP on,
+the master loads them once before forking instead; workers then share
+those pages copy-on-write rather than each paying for them on its first
+dashboard request.
+"""
+import gc
+
+
+def warm_up():
+    import analytics  # noqa: F401  (pandas and NumPy)
+    import chart_renderer
+    import sentiment
+
+    # For charts drawn in the worker itself (CHART_RENDER_WORKERS=0)
+    chart_renderer.load_matplotlib()
+    # Loads (or compiles) the configured engine's lexicon
+    sentiment.assess('warm up')
+    # Keep everything loaded so far out of the collector's scans, which
+    # would otherwise touch and un-share those pages in every worker
+    gc.freeze()